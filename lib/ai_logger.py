@@ -0,0 +1,128 @@
+"""
+믿음루프(FaithLoop) - AI 호출 로그 (ai_logs)
+호출마다 DB에 쓰지 않고 메모리 버퍼에 모았다가
+N건 또는 N초마다 백그라운드 스레드에서 bulk insert
+"""
+import atexit
+import threading
+from typing import Optional, List, Dict
+
+import streamlit as st
+from lib.config import get_supabase_client, get_logging_config
+
+
+class AILogBuffer:
+    """
+    ai_logs bulk insert 버퍼
+
+    Args:
+        flush_size: 이 개수만큼 쌓이면 즉시 flush 요청
+        flush_interval: 최대 flush 간격(초)
+        max_buffer: 버퍼 상한 (DB 장애 시 메모리 보호, 초과분은 오래된 것부터 버림)
+    """
+
+    def __init__(self, flush_size: int = 20, flush_interval: float = 10.0, max_buffer: int = 5000):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._records: List[Dict] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ai-log-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def add(self, record: Dict):
+        """로그 1건 추가 (네트워크 호출 없음)"""
+        with self._lock:
+            self._records.append(record)
+            if len(self._records) > self.max_buffer:
+                del self._records[:len(self._records) - self.max_buffer]
+            full = len(self._records) >= self.flush_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """버퍼를 한 번의 insert로 기록, 기록한 건수 반환"""
+        with self._lock:
+            records, self._records = self._records, []
+        if not records:
+            return 0
+        try:
+            client = get_supabase_client()
+            if not client:
+                return 0
+            client.table("ai_logs").insert(records).execute()
+            return len(records)
+        except Exception as e:
+            print(f"[AILog] {len(records)}건 기록 실패: {e}")
+            return 0
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+@st.cache_resource
+def get_ai_log_buffer() -> AILogBuffer:
+    """ai_logs 버퍼 싱글톤"""
+    config = get_logging_config()
+    return AILogBuffer(
+        flush_size=int(config["ai_log_flush_size"]),
+        flush_interval=float(config["ai_log_flush_interval"])
+    )
+
+
+def _current_user_id() -> Optional[str]:
+    """로그인 세션이 있으면 사용자 ID (워커/스크립트는 None)"""
+    try:
+        from lib.config import get_current_user_id
+        return get_current_user_id()
+    except Exception:
+        return None
+
+
+def log_ai_call(
+    action: str,
+    model: Optional[str] = None,
+    input_tokens: Optional[int] = None,
+    output_tokens: Optional[int] = None,
+    latency_ms: Optional[float] = None,
+    cache_hit: bool = False,
+    error: Optional[str] = None,
+    user_id: Optional[str] = None,
+    metadata: Optional[Dict] = None
+):
+    """
+    AI 호출 1건 기록 (버퍼에 추가만 하므로 호출 경로에 DB 왕복 없음)
+
+    Args:
+        action: 호출 종류 ('reflection', 'extract', 'embedding', 'transcription' 등)
+        model: 모델명
+        input_tokens: 입력(prompt) 토큰
+        output_tokens: 출력(completion) 토큰
+        latency_ms: 지연시간(ms)
+        cache_hit: LLM 응답 캐시 적중 여부
+        error: 오류 메시지 (있으면 status='error')
+        user_id: 사용자 ID (없으면 현재 세션)
+        metadata: 호출별 부가 정보 (예: 규칙 우선 라우팅 {"routed": bool, "confidence": float})
+    """
+    if not get_logging_config()["ai_log_enabled"]:
+        return
+    try:
+        get_ai_log_buffer().add({
+            "user_id": user_id or _current_user_id(),
+            "action": action,
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency_ms": int(round(latency_ms)) if latency_ms is not None else None,
+            "cache_hit": cache_hit,
+            "status": "error" if error else "success",
+            "error_message": error[:500] if error else None,
+            "metadata": metadata or {}
+        })
+    except Exception as e:
+        print(f"[AILog] 버퍼 추가 실패: {e}")
@@ -25,6 +25,27 @@ def get_supabase_key() -> str:
         return None
 
 
+def get_supabase_service_key() -> str:
+    """Supabase service role key 반환 (백그라운드 워커 전용, RLS 우회)"""
+    try:
+        return st.secrets["supabase"]["service_role_key"]
+    except KeyError:
+        return None
+
+
+# 워커 프로세스에서만 True (python -m lib.worker가 설정)
+_USE_SERVICE_ROLE = False
+
+
+def use_service_role():
+    """
+    이 프로세스의 Supabase 클라이언트가 service role key를 사용하도록 설정
+    get_supabase_client() 첫 호출 전에 불러야 함 (워커 전용)
+    """
+    global _USE_SERVICE_ROLE
+    _USE_SERVICE_ROLE = True
+
+
 @st.cache_resource
 def get_supabase_client() -> Client:
     """
@@ -32,7 +53,7 @@ def get_supabase_client() -> Client:
     @st.cache_resource로 앱 전체에서 재사용
     """
     url = get_supabase_url()
-    key = get_supabase_key()
+    key = get_supabase_service_key() if _USE_SERVICE_ROLE else get_supabase_key()
     
     if not url or not key:
         return None
@@ -53,6 +74,14 @@ def get_openai_api_key() -> str:
         return None
 
 
+def get_openai_base_url() -> str:
+    """OpenAI 호환 API 주소 반환 (미설정 시 None → 기본 API / OPENAI_BASE_URL 환경변수)"""
+    try:
+        return st.secrets["openai"].get("base_url")
+    except KeyError:
+        return None
+
+
 def get_google_credentials() -> dict:
     """Google OAuth 설정 반환"""
     try:
@@ -79,6 +108,110 @@ def get_app_config() -> dict:
         }
 
 
+def get_cache_config() -> dict:
+    """캐시 설정 반환 (임베딩 캐시, LLM 응답 캐시)"""
+    defaults = {
+        "embedding_db_path": ".cache/embeddings.sqlite3",
+        "embedding_memory_entries": 2048,
+        "embedding_max_entries": 50000,
+        "llm_enabled": True,
+        "llm_db_path": ".cache/llm_responses.sqlite3",
+        "llm_memory_entries": 256,
+        "llm_max_entries": 5000,
+        "llm_ttl_seconds": 86400,
+        "llm_max_temperature": 0.3,
+        "llm_use_supabase": False
+    }
+    try:
+        return {**defaults, **dict(st.secrets["cache"])}
+    except (KeyError, FileNotFoundError):
+        return defaults
+
+
+def get_embedding_config() -> dict:
+    """임베딩 백엔드 설정 반환"""
+    defaults = {
+        # "openai" (기본) / "hashing" (오프라인 테스트/데모용, 명시적으로 지정할 때만)
+        "backend": "openai",
+        "hashing_dimensions": 1536,
+        "hashing_ngram_min": 2,
+        "hashing_ngram_max": 3
+    }
+    try:
+        return {**defaults, **dict(st.secrets["embedding"])}
+    except (KeyError, FileNotFoundError):
+        return defaults
+
+
+def get_rate_limit_config() -> dict:
+    """OpenAI 요청 스케줄러 설정 반환 (응답 헤더 수신 전 기본 한도, 재시도)"""
+    defaults = {
+        "requests_per_minute": 500,
+        "tokens_per_minute": 200000,
+        "max_retries": 5,
+        "backoff_base": 1.0,
+        "backoff_max": 30.0
+    }
+    try:
+        return {**defaults, **dict(st.secrets["rate_limit"])}
+    except (KeyError, FileNotFoundError):
+        return defaults
+
+
+def get_logging_config() -> dict:
+    """AI 호출 로그(ai_logs) 버퍼 설정 반환"""
+    defaults = {
+        "ai_log_enabled": True,
+        "ai_log_flush_size": 20,
+        "ai_log_flush_interval": 10.0
+    }
+    try:
+        return {**defaults, **dict(st.secrets["logging"])}
+    except (KeyError, FileNotFoundError):
+        return defaults
+
+
+def get_extraction_config() -> dict:
+    """체크인 구조화 추출 라우팅 설정 반환"""
+    defaults = {
+        # "llm": 항상 LLM 추출 / "rule_first": 규칙 신뢰도가 높으면 LLM 추출 생략
+        "routing": "llm",
+        "rule_confidence_threshold": 0.75,
+        "rule_max_chars": 500
+    }
+    try:
+        return {**defaults, **dict(st.secrets["extraction"])}
+    except (KeyError, FileNotFoundError):
+        return defaults
+
+
+def get_rules_config() -> dict:
+    """규칙 기반 추출 키워드 설정 반환 (없는 키는 lib.rules 기본값 사용)"""
+    try:
+        return dict(st.secrets["rules"])
+    except (KeyError, FileNotFoundError):
+        return {}
+
+
+def get_media_config() -> dict:
+    """업로드 미디어 전처리 설정 반환"""
+    defaults = {
+        "audio_preprocess": True,
+        "audio_sample_rate": 16000,
+        "audio_format": "mp3",
+        "audio_bitrate": "32k",
+        "keep_original_audio": False,
+        "image_max_long_side": 2048,
+        "image_max_short_side": 768,
+        "image_format": "jpeg",
+        "image_quality": 85
+    }
+    try:
+        return {**defaults, **dict(st.secrets["media"])}
+    except (KeyError, FileNotFoundError):
+        return defaults
+
+
 # === 현재 사용자 ID (MVP: 단일 사용자) ===
 def get_current_user_id() -> str:
     """
@@ -2,80 +2,18 @@
 믿음루프(FaithLoop) - 데모 데이터 생성
 Settings 페이지에서 테스트용 신앙 기록 데이터를 생성/삭제
 """
-import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import streamlit as st
+# extract_by_rules / get_rule_engine은 기존 import 경로(lib.demo_data) 호환을 위해 유지
+from lib.rules import extract_by_rules, get_rule_engine  # noqa: F401
 
 # 데모 데이터 구분 태그
 DEMO_TAG = "__demo__"
 
 
 # ============================================
-# (1) 규칙 기반 Extraction (Checkin.py 로직 복사)
-# ============================================
-
-def extract_by_rules(content: str) -> Dict[str, List[str]]:
-    """
-    규칙 기반으로 텍스트에서 구조화된 정보 추출
-    (pages/2_Checkin.py의 로직과 동일)
-    
-    Args:
-        content: 체크인 내용 텍스트
-    
-    Returns:
-        추출된 정보 딕셔너리
-    """
-    lines = content.strip().split('\n')
-    
-    tasks = []
-    obstacles = []
-    projects = []
-    insights = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # task: '-' 또는 '•'로 시작하는 줄
-        if line.startswith('-') or line.startswith('•') or line.startswith('*'):
-            task_text = line.lstrip('-•* ').strip()
-            if task_text:
-                tasks.append(task_text)
-        
-        # obstacle: '!' 시작 또는 부정적 키워드 포함
-        obstacle_keywords = ['문제', '어려움', '힘들', '막혀', '안됨', '실패', '오류', '버그']
-        if line.startswith('!') or any(kw in line for kw in obstacle_keywords):
-            obstacle_text = line.lstrip('! ').strip()
-            if obstacle_text and obstacle_text not in obstacles:
-                obstacles.append(obstacle_text)
-        
-        # project: '#프로젝트명' 형태
-        project_matches = re.findall(r'#(\w+)', line)
-        for proj in project_matches:
-            if proj not in projects:
-                projects.append(proj)
-        
-        # insight: 인사이트 키워드 포함
-        insight_keywords = ['💡', '인사이트', '배움', '깨달음', '발견', '아이디어']
-        if any(kw in line for kw in insight_keywords):
-            insight_text = line.strip()
-            if insight_text and insight_text not in insights:
-                insights.append(insight_text)
-    
-    return {
-        "tasks": tasks,
-        "obstacles": obstacles,
-        "projects": projects,
-        "insights": insights,
-        "people": [],
-        "emotions": []
-    }
-
-
-# ============================================
-# (2) 데모 데이터 항목 생성
+# (1) 데모 데이터 항목 생성
 # ============================================
 
 def build_demo_items(days: int = 7) -> List[Dict]:
@@ -246,7 +184,7 @@ def build_demo_items(days: int = 7) -> List[Dict]:
 
 
 # ============================================
-# (3) 데모 데이터 삭제
+# (2) 데모 데이터 삭제
 # ============================================
 
 def delete_demo_data() -> Dict[str, Any]:
@@ -374,8 +312,11 @@ def seed_demo_data(
         # B) 데모 항목 생성
         items = build_demo_items(days)
         
+        # 규칙 기반 추출은 전체 항목을 한 번에 처리
+        all_extractions = get_rule_engine().extract_batch([item["content"] for item in items])
+        
         # C) 각 항목 저장
-        for item in items:
+        for item, extractions in zip(items, all_extractions):
             try:
                 # 1) 체크인 저장
                 checkin_data = insert_checkin(
@@ -393,10 +334,7 @@ def seed_demo_data(
                 result["inserted_checkins"] += 1
                 checkin_id = checkin_data.get("id")
                 
-                # 2) 규칙 기반 추출
-                extractions = extract_by_rules(item["content"])
-                
-                # 3) extraction 저장
+                # 2) extraction 저장 (규칙 기반 추출 결과)
                 extraction_result = insert_extraction(
                     source_type="checkin",
                     source_id=checkin_id,
@@ -408,7 +346,7 @@ def seed_demo_data(
                 if extraction_result:
                     result["inserted_extractions"] += 1
                 
-                # 4) RAG 인덱싱 (also_index=True인 경우)
+                # 3) RAG 인덱싱 (also_index=True인 경우)
                 if also_index:
                     try:
                         # 체크인 인덱싱
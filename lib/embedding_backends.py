@@ -0,0 +1,199 @@
+"""
+믿음루프(FaithLoop) - 임베딩 백엔드
+rag.embed / embed_batch가 사용하는 교체 가능한 임베딩 생성기
+- openai: text-embedding-3-small (기본, API 키 필요)
+- hashing: 네트워크 없이 동작하는 결정적 로컬 백엔드 (backend = "hashing"으로 명시할 때만)
+  (한국어 글자 n-gram을 해시로 고정 차원에 투영, NumPy만 사용)
+
+주의: 백엔드마다 벡터 공간이 다르므로 같은 DB에서 섞어 쓰지 말 것
+(memory_embeddings.embedding_model에 행별 모델을 기록하고, rag가 다른 모델과 섞이는 인덱싱/검색을 거부)
+"""
+import zlib
+from abc import ABC, abstractmethod
+from typing import Optional, List, Any, Tuple
+
+import numpy as np
+import streamlit as st
+from lib.config import get_embedding_config
+from lib.embedding_cache import DEFAULT_EMBEDDING_MODEL, DEFAULT_EMBEDDING_DIMENSIONS, normalize_text
+from lib.rate_limiter import PRIORITY_INTERACTIVE
+
+
+class EmbeddingBackend(ABC):
+    """
+    임베딩 백엔드 인터페이스
+
+    Attributes:
+        name: 백엔드 이름 ([embedding] backend 값)
+        model: 캐시 키 / memory_embeddings.embedding_model에 쓰이는 모델 식별자
+        dimensions: 벡터 차원 (memory_embeddings.embedding 컬럼과 같아야 함)
+        cacheable: 임베딩 캐시 사용 여부 (로컬 계산이 캐시 조회보다 싸면 False)
+        similarity_scale: 검색 임계값 배율 (임계값은 OpenAI 코사인 유사도 기준으로 정해져 있음)
+    """
+
+    name = "base"
+    model = ""
+    dimensions = DEFAULT_EMBEDDING_DIMENSIONS
+    cacheable = True
+    similarity_scale = 1.0
+
+    def scale_threshold(self, threshold: float) -> float:
+        """OpenAI 기준 유사도 임계값을 이 백엔드의 유사도 분포에 맞게 변환"""
+        return threshold * self.similarity_scale
+
+    @abstractmethod
+    def embed_batch(
+        self,
+        texts: List[str],
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> List[Optional[List[float]]]:
+        """입력 순서와 같은 벡터 목록 (실패 항목은 None)"""
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI Embeddings API (요청 스케줄러 + 배치 분할은 create_embeddings가 담당)"""
+
+    name = "openai"
+    model = DEFAULT_EMBEDDING_MODEL
+
+    def embed_batch(
+        self,
+        texts: List[str],
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> List[Optional[List[float]]]:
+        from lib.openai_client import create_embeddings
+        return create_embeddings(texts, model=self.model, priority=priority)
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    글자 n-gram 해싱 벡터 (결정적, 네트워크/모델 파일 불필요)
+    - 띄어쓰기가 불규칙한 한국어도 글자 2~3-gram이면 어간이 겹쳐 유사도가 잡힘
+    - crc32로 차원 인덱스와 부호를 정해 충돌 편향을 상쇄한 뒤 L2 정규화
+    - 관련 기록의 유사도가 0.2~0.5 (무관한 줄 p90 ≈ 0.13)로 OpenAI보다 낮아 임계값을 0.35배로 적용
+
+    Args:
+        dimensions: 출력 차원 (DB 컬럼과 맞추려면 1536)
+        ngram_min: 최소 n
+        ngram_max: 최대 n
+    """
+
+    name = "hashing"
+    cacheable = False
+    similarity_scale = 0.35
+
+    def __init__(
+        self,
+        dimensions: int = DEFAULT_EMBEDDING_DIMENSIONS,
+        ngram_min: int = 2,
+        ngram_max: int = 3
+    ):
+        self.dimensions = dimensions
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self.model = f"hashing-char-{ngram_min}-{ngram_max}gram"
+
+    def _ngrams(self, text: str) -> List[str]:
+        text = f" {normalize_text(text).lower()} "
+        return [
+            text[i:i + n]
+            for n in range(self.ngram_min, self.ngram_max + 1)
+            for i in range(len(text) - n + 1)
+        ]
+
+    def embed_one(self, text: str) -> Optional[List[float]]:
+        """텍스트 1건 임베딩 (빈 텍스트는 None)"""
+        if not text or not text.strip():
+            return None
+        grams = self._ngrams(text)
+        hashes = np.fromiter(
+            (zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint32, count=len(grams)
+        )
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(hashes % self.dimensions, weights=signs, minlength=self.dimensions)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return (vector / norm).tolist()
+
+    def embed_batch(
+        self,
+        texts: List[str],
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> List[Optional[List[float]]]:
+        return [self.embed_one(text) for text in texts]
+
+
+EMBEDDING_BACKENDS = {
+    "openai": OpenAIEmbeddingBackend,
+    "hashing": HashingEmbeddingBackend
+}
+
+
+@st.cache_resource
+def get_embedding_backend() -> EmbeddingBackend:
+    """
+    임베딩 백엔드 싱글톤 ([embedding] backend, 기본 openai)
+    OpenAI 키가 없어도 hashing으로 바꾸지 않음 (다른 벡터 공간이 DB에 섞이지 않도록 명시적으로만 사용)
+    """
+    config = get_embedding_config()
+    name = config["backend"]
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"알 수 없는 임베딩 백엔드: {name}")
+    if name == "hashing":
+        return HashingEmbeddingBackend(
+            dimensions=int(config["hashing_dimensions"]),
+            ngram_min=int(config["hashing_ngram_min"]),
+            ngram_max=int(config["hashing_ngram_max"])
+        )
+    return EMBEDDING_BACKENDS[name]()
+
+
+class LocalVectorIndex:
+    """
+    메모리 내 코사인 유사도 인덱스 (Supabase 없이 인덱싱/검색 확인용)
+
+    Args:
+        dimensions: 벡터 차원
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self._ids: List[Any] = []
+        self._blocks: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids: List[Any], vectors: List[Optional[List[float]]]):
+        """벡터 추가 (None 벡터는 건너뜀, 벡터는 정규화되어 있다고 가정)"""
+        pairs = [(i, v) for i, v in zip(ids, vectors) if v is not None]
+        if not pairs:
+            return
+        self._ids.extend(i for i, _ in pairs)
+        self._blocks.append(np.asarray([v for _, v in pairs], dtype=np.float32))
+        self._matrix = None
+
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        threshold: float = 0.0
+    ) -> List[Tuple[Any, float]]:
+        """
+        코사인 유사도 상위 top_k
+
+        Returns:
+            [(id, similarity)] (유사도 내림차순)
+        """
+        if not self._ids:
+            return []
+        if self._matrix is None:
+            self._matrix = np.vstack(self._blocks)
+            self._blocks = [self._matrix]
+        scores = self._matrix @ np.asarray(query_vector, dtype=np.float32)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[i], float(scores[i])) for i in top if scores[i] >= threshold]
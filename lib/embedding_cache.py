@@ -0,0 +1,221 @@
+"""
+믿음루프(FaithLoop) - 임베딩 캐시
+sha256(model + dimensions + 정규화 텍스트) 키 기반 2단 캐시
+- 1단: 프로세스 내 LRU (OrderedDict)
+- 2단: 로컬 SQLite 파일 (크기 상한 + 오래된 항목 제거)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+
+import streamlit as st
+from lib.config import get_cache_config
+
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키용 텍스트 정규화 (NFC + 공백 정리)"""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def make_cache_key(
+    text: str,
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    dimensions: int = DEFAULT_EMBEDDING_DIMENSIONS
+) -> str:
+    """sha256(model + dimensions + 정규화 텍스트)"""
+    raw = f"{model}\x1f{dimensions}\x1f{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    LRU(메모리) + SQLite(디스크) 2단 임베딩 캐시
+
+    Args:
+        db_path: SQLite 파일 경로 (None이면 메모리 캐시만 사용)
+        memory_entries: 메모리 LRU 최대 항목 수
+        max_entries: SQLite 최대 항목 수 (초과 시 오래 사용되지 않은 항목부터 제거)
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        memory_entries: int = 2048,
+        max_entries: int = 50000
+    ):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes_since_evict = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS embedding_cache (
+                        key TEXT PRIMARY KEY,
+                        vector BLOB NOT NULL,
+                        last_access REAL NOT NULL
+                    )"""
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_embedding_cache_access "
+                    "ON embedding_cache(last_access)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] SQLite 비활성화: {e}")
+                self._conn = None
+
+    # --- 메모리 LRU ---
+
+    def _remember(self, key: str, vector: List[float]):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    # --- 조회/저장 ---
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """여러 키를 한 번에 조회 (hit된 키만 반환)"""
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self.stats["memory_hits"] += 1
+                else:
+                    missing.append(key)
+
+            if missing and self._conn is not None:
+                unique = list(dict.fromkeys(missing))
+                rows = []
+                try:
+                    # SQLite 변수 개수 제한 고려하여 나눠서 조회
+                    for i in range(0, len(unique), 500):
+                        part = unique[i:i + 500]
+                        placeholders = ",".join("?" * len(part))
+                        rows.extend(self._conn.execute(
+                            f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})",
+                            part
+                        ).fetchall())
+                    if rows:
+                        now = time.time()
+                        self._conn.executemany(
+                            "UPDATE embedding_cache SET last_access = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows]
+                        )
+                        self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"[EmbeddingCache] 조회 실패: {e}")
+                    rows = []
+
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    self._remember(key, vector)
+                    found[key] = vector
+
+            for key in missing:
+                if key in found:
+                    self.stats["disk_hits"] += 1
+                else:
+                    self.stats["misses"] += 1
+
+        return found
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """단일 키 조회"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """여러 벡터를 한 번에 저장"""
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+            if self._conn is None:
+                return
+            try:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (key, vector, last_access) VALUES (?, ?, ?)",
+                    [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+                )
+                self._conn.commit()
+                self._writes_since_evict += len(items)
+                # 매 쓰기마다 COUNT하지 않도록 일정량마다 상한 검사
+                if self._writes_since_evict >= max(1, self.max_entries // 100):
+                    self._evict()
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] 저장 실패: {e}")
+
+    def put(self, key: str, vector: List[float]):
+        """단일 벡터 저장"""
+        self.put_many({key: vector})
+
+    def _evict(self):
+        """SQLite 항목 수가 상한을 넘으면 오래 사용되지 않은 항목부터 제거"""
+        self._writes_since_evict = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embedding_cache WHERE key IN ("
+                "SELECT key FROM embedding_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._conn.commit()
+            self.stats["evictions"] += overflow
+
+    def size(self) -> Dict[str, int]:
+        """캐시 항목 수 {memory, disk}"""
+        with self._lock:
+            disk = 0
+            if self._conn is not None:
+                try:
+                    disk = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+                except sqlite3.Error:
+                    disk = 0
+            return {"memory": len(self._lru), "disk": disk}
+
+
+@st.cache_resource
+def get_embedding_cache() -> EmbeddingCache:
+    """임베딩 캐시 싱글톤"""
+    config = get_cache_config()
+    return EmbeddingCache(
+        db_path=config.get("embedding_db_path"),
+        memory_entries=int(config.get("embedding_memory_entries", 2048)),
+        max_entries=int(config.get("embedding_max_entries", 50000))
+    )
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """캐시 hit/miss 카운터 (Memory 페이지 표시용)"""
+    cache = get_embedding_cache()
+    stats = dict(cache.stats)
+    stats.update({f"{k}_entries": v for k, v in cache.size().items()})
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,325 @@
+"""
+믿음루프(FaithLoop) - LLM 응답 캐시
+sha256(model + messages + schema + temperature + max_tokens) 키 기반 TTL 캐시
+- 1단: 프로세스 내 LRU (OrderedDict)
+- 2단: 로컬 SQLite 파일 (크기 상한 + 만료 항목 제거)
+- 3단(선택): Supabase llm_response_cache 테이블 (사용자별, 인스턴스 간 공유)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+
+import streamlit as st
+from lib.config import get_cache_config
+
+
+def make_llm_cache_key(
+    model: str,
+    messages: List[dict],
+    json_schema: Optional[Dict] = None,
+    temperature: float = None,
+    max_tokens: Optional[int] = None
+) -> str:
+    """sha256(model + messages + schema + temperature + max_tokens)"""
+    raw = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "schema": json_schema,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        },
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LRU(메모리) + SQLite(디스크) 2단 LLM 응답 캐시 (항목별 TTL)
+
+    Args:
+        db_path: SQLite 파일 경로 (None이면 메모리 캐시만 사용)
+        memory_entries: 메모리 LRU 최대 항목 수
+        max_entries: SQLite 최대 항목 수 (초과 시 오래 사용되지 않은 항목부터 제거)
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        memory_entries: int = 256,
+        max_entries: int = 5000
+    ):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes_since_evict = 0
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(db_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS llm_response_cache (
+                        key TEXT PRIMARY KEY,
+                        entry TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )"""
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_access "
+                    "ON llm_response_cache(last_access)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[LLMCache] SQLite 비활성화: {e}")
+                self._conn = None
+
+    def _remember(self, key: str, expires_at: float, entry: Dict):
+        self._lru[key] = (expires_at, entry)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        캐시 조회
+
+        Returns:
+            (entry, tier) - entry: {"response", "usage"}, tier: 'memory' | 'disk' | None
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._lru.get(key)
+            if cached is not None:
+                expires_at, entry = cached
+                if expires_at > now:
+                    self._lru.move_to_end(key)
+                    return entry, "memory"
+                del self._lru[key]
+
+            if self._conn is None:
+                return None, None
+            try:
+                row = self._conn.execute(
+                    "SELECT entry, expires_at FROM llm_response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None, None
+                if row[1] <= now:
+                    self._conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None, None
+                self._conn.execute(
+                    "UPDATE llm_response_cache SET last_access = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"[LLMCache] 조회 실패: {e}")
+                return None, None
+
+            entry = json.loads(row[0])
+            self._remember(key, row[1], entry)
+            return entry, "disk"
+
+    def put(self, key: str, entry: Dict, ttl_seconds: float):
+        """응답 저장 (ttl_seconds 후 만료)"""
+        now = time.time()
+        expires_at = now + ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, entry)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_response_cache (key, entry, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(entry, ensure_ascii=False), expires_at, now)
+                )
+                self._conn.commit()
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= max(1, self.max_entries // 100):
+                    self._evict()
+            except sqlite3.Error as e:
+                print(f"[LLMCache] 저장 실패: {e}")
+
+    def _evict(self):
+        """만료 항목 삭제 후, 상한을 넘으면 오래 사용되지 않은 항목부터 제거"""
+        self._writes_since_evict = 0
+        self._conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (time.time(),))
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_response_cache WHERE key IN ("
+                "SELECT key FROM llm_response_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+        self._conn.commit()
+
+
+@st.cache_resource
+def get_llm_cache() -> LLMResponseCache:
+    """LLM 응답 캐시 싱글톤"""
+    config = get_cache_config()
+    return LLMResponseCache(
+        db_path=config.get("llm_db_path"),
+        memory_entries=int(config.get("llm_memory_entries", 256)),
+        max_entries=int(config.get("llm_max_entries", 5000))
+    )
+
+
+# hit/miss 및 절약 토큰 집계 (프로세스 단위)
+_stats_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "remote_hits": 0,
+    "saved_prompt_tokens": 0,
+    "saved_completion_tokens": 0
+}
+
+
+def _record(hit: bool, action: str, tier: Optional[str] = None, usage: Optional[Dict] = None):
+    usage = usage or {}
+    with _stats_lock:
+        if not hit:
+            _stats["misses"] += 1
+            return
+        _stats["hits"] += 1
+        if tier == "remote":
+            _stats["remote_hits"] += 1
+        _stats["saved_prompt_tokens"] += usage.get("prompt_tokens", 0)
+        _stats["saved_completion_tokens"] += usage.get("completion_tokens", 0)
+    print(
+        f"[LLMCache] hit ({tier}) {action}: "
+        f"saved {usage.get('prompt_tokens', 0)}+{usage.get('completion_tokens', 0)} tokens"
+    )
+
+
+# ============================================
+# Supabase 캐시 (선택: [cache] llm_use_supabase = true)
+# ============================================
+
+def _remote_user_id() -> Optional[str]:
+    """로그인 세션이 있을 때만 원격 캐시 사용 (워커/스크립트는 로컬만)"""
+    try:
+        from lib.config import get_current_user_id
+        return get_current_user_id()
+    except Exception:
+        return None
+
+
+def _remote_get(key: str) -> Optional[Dict]:
+    from lib.config import get_supabase_client
+    user_id = _remote_user_id()
+    client = get_supabase_client() if user_id else None
+    if not client:
+        return None
+    try:
+        response = (
+            client.table("llm_response_cache")
+            .select("response, usage, expires_at")
+            .eq("user_id", user_id)
+            .eq("cache_key", key)
+            .gt("expires_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+            .limit(1)
+            .execute()
+        )
+    except Exception as e:
+        print(f"[LLMCache] 원격 조회 실패: {e}")
+        return None
+    if not response.data:
+        return None
+    row = response.data[0]
+    return {"response": row["response"], "usage": row.get("usage") or {}}
+
+
+def _remote_put(key: str, model: str, entry: Dict, ttl_seconds: float):
+    from lib.config import get_supabase_client
+    user_id = _remote_user_id()
+    client = get_supabase_client() if user_id else None
+    if not client:
+        return
+    try:
+        client.table("llm_response_cache").upsert(
+            {
+                "user_id": user_id,
+                "cache_key": key,
+                "model": model,
+                "response": entry["response"],
+                "usage": entry.get("usage") or {},
+                "expires_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + ttl_seconds))
+            },
+            on_conflict="user_id,cache_key"
+        ).execute()
+    except Exception as e:
+        print(f"[LLMCache] 원격 저장 실패: {e}")
+
+
+# ============================================
+# openai_client용 진입점
+# ============================================
+
+def should_cache(temperature: float, cache: Optional[bool]) -> bool:
+    """
+    캐시 적용 여부
+    - cache=False: 항상 우회 (bypass)
+    - cache=True: 온도와 무관하게 사용
+    - cache=None: llm_max_temperature 이하일 때만 자동 사용
+    - [cache] llm_enabled = false면 전체 비활성화
+    """
+    config = get_cache_config()
+    if cache is False or not config.get("llm_enabled", True):
+        return False
+    if cache is True:
+        return True
+    return temperature <= float(config.get("llm_max_temperature", 0.3))
+
+
+def lookup(key: str, action: str) -> Optional[Any]:
+    """캐시 조회 (hit이면 응답, 아니면 None) - hit은 절약 토큰과 함께 로그"""
+    entry, tier = get_llm_cache().get(key)
+    if entry is None and get_cache_config().get("llm_use_supabase", False):
+        entry = _remote_get(key)
+        if entry is not None:
+            tier = "remote"
+            get_llm_cache().put(key, entry, float(get_cache_config().get("llm_ttl_seconds", 86400)))
+
+    _record(entry is not None, action, tier, entry.get("usage") if entry else None)
+    return entry["response"] if entry is not None else None
+
+
+def store(key: str, model: str, response: Any, usage: Any = None, ttl_seconds: Optional[float] = None):
+    """응답 저장 (usage는 OpenAI usage 객체 또는 dict)"""
+    config = get_cache_config()
+    ttl = float(ttl_seconds if ttl_seconds is not None else config.get("llm_ttl_seconds", 86400))
+    if usage is not None and not isinstance(usage, dict):
+        usage = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+        }
+    entry = {"response": response, "usage": usage or {}}
+
+    get_llm_cache().put(key, entry, ttl)
+    if config.get("llm_use_supabase", False):
+        _remote_put(key, model, entry, ttl)
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """캐시 hit/miss 및 절약 토큰 (화면 표시용)"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,135 @@
+"""
+믿음루프(FaithLoop) - 미디어 전처리
+업로드/AI 요청 전에 파일 크기를 줄이는 단계
+- 오디오: 모노 + 16kHz 리샘플링 + 저비트레이트 코덱 재인코딩 (pydub)
+- 이미지: Vision 모델 유효 해상도로 축소 + EXIF 제거 + JPEG/WebP 재인코딩 (Pillow)
+"""
+import base64
+import io
+from typing import Optional, Dict, Any
+
+from lib.config import get_media_config
+
+
+AUDIO_CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "m4a": "audio/m4a",
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "webm": "audio/webm",
+    "flac": "audio/flac"
+}
+
+
+def preprocess_audio(audio_bytes: bytes, file_ext: str) -> Optional[Dict[str, Any]]:
+    """
+    오디오를 음성 인식/보관용으로 압축 (모노, 16kHz, 저비트레이트)
+    Whisper는 내부적으로 16kHz 모노로 처리하므로 전사 품질 손실 없음
+
+    Args:
+        audio_bytes: 원본 오디오 바이트
+        file_ext: 원본 확장자 (pydub 디코딩 형식)
+
+    Returns:
+        {"data", "ext", "content_type", "duration_ms", "original_size"}
+        비활성화되었거나 pydub/ffmpeg로 처리할 수 없으면 None (원본 그대로 사용)
+    """
+    config = get_media_config()
+    if not config["audio_preprocess"]:
+        return None
+
+    try:
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=file_ext)
+        audio = audio.set_channels(1).set_frame_rate(int(config["audio_sample_rate"]))
+
+        out_ext = config["audio_format"]
+        buffer = io.BytesIO()
+        audio.export(buffer, format=out_ext, bitrate=config["audio_bitrate"])
+        data = buffer.getvalue()
+    except Exception as e:
+        print(f"[media] 오디오 전처리 생략 (원본 사용): {e}")
+        return None
+
+    # 이미 작은 파일은 재인코딩 결과가 더 클 수 있음
+    if len(data) >= len(audio_bytes):
+        return None
+
+    print(f"[media] 오디오 {len(audio_bytes):,} → {len(data):,} bytes ({len(audio) / 1000:.0f}s)")
+    return {
+        "data": data,
+        "ext": out_ext,
+        "content_type": AUDIO_CONTENT_TYPES.get(out_ext, f"audio/{out_ext}"),
+        "duration_ms": len(audio),
+        "original_size": len(audio_bytes)
+    }
+
+
+IMAGE_CONTENT_TYPES = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "png": "image/png"
+}
+
+
+def prepare_image(image_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """
+    이미지를 Vision 요청/보관용으로 축소
+    - 회전(EXIF Orientation)을 픽셀에 반영한 뒤 EXIF/GPS 등 메타데이터 제거
+    - 긴 변 image_max_long_side, 짧은 변 image_max_short_side 이하로 축소
+      (gpt-4o 계열은 high detail에서도 이 크기로 줄여서 처리하므로 정보 손실 없음)
+
+    Args:
+        image_bytes: 원본 이미지 바이트
+
+    Returns:
+        {"data", "ext", "content_type", "width", "height", "original_size"}
+        Pillow로 열 수 없으면 None (원본 그대로 사용)
+        결과가 원본보다 크더라도 메타데이터 제거/회전 반영을 위해 항상 재인코딩 결과를 반환
+    """
+    config = get_media_config()
+    try:
+        from PIL import Image, ImageOps
+        image = Image.open(io.BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(image)
+
+        long_side = int(config["image_max_long_side"])
+        short_side = int(config["image_max_short_side"])
+        width, height = image.size
+        scale = min(1.0, long_side / max(width, height), short_side / min(width, height))
+        if scale < 1.0:
+            image = image.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.LANCZOS
+            )
+
+        out_format = config["image_format"]
+        if image.mode not in ("RGB", "L"):
+            # JPEG는 투명도를 지원하지 않으므로 흰 배경에 합성
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+
+        buffer = io.BytesIO()
+        # 새 이미지로 저장하므로 exif를 넘기지 않으면 메타데이터가 남지 않음
+        image.save(buffer, format=out_format.upper(), quality=int(config["image_quality"]), optimize=True)
+        data = buffer.getvalue()
+    except Exception as e:
+        print(f"[media] 이미지 전처리 생략 (원본 사용): {e}")
+        return None
+
+    print(f"[media] 이미지 {len(image_bytes):,} → {len(data):,} bytes ({image.width}x{image.height})")
+    return {
+        "data": data,
+        "ext": "jpg" if out_format == "jpeg" else out_format,
+        "content_type": IMAGE_CONTENT_TYPES.get(out_format, f"image/{out_format}"),
+        "width": image.width,
+        "height": image.height,
+        "original_size": len(image_bytes)
+    }
+
+
+def image_data_url(data: bytes, content_type: str) -> str:
+    """이미지 바이트를 Vision 요청에 바로 넣을 수 있는 base64 data URL로 변환"""
+    return f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
@@ -2,11 +2,20 @@
 ReflectOS - OpenAI 클라이언트
 GPT, Embeddings, Whisper(STT), Structured Outputs 통합
 """
+import io
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FuturesTimeout
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from openai import OpenAI
-from lib.config import get_openai_api_key
-from typing import Optional, List, Dict, Any
+from lib.config import get_openai_api_key, get_openai_base_url
+from lib import llm_cache
+from lib.rate_limiter import get_request_scheduler, PRIORITY_INTERACTIVE
+from lib.utils import estimate_tokens
+from lib.ai_logger import log_ai_call
+from typing import Optional, List, Dict, Any, Iterator, Callable
 
 
 @st.cache_resource
@@ -15,14 +24,83 @@ def get_openai_client() -> Optional[OpenAI]:
     api_key = get_openai_api_key()
     if not api_key:
         return None
-    return OpenAI(api_key=api_key)
+    # 재시도는 요청 스케줄러가 담당 (SDK 자체 재시도와 중복 방지)
+    # base_url: 로컬 가짜 서버 등 OpenAI 호환 엔드포인트 (없으면 기본 API)
+    return OpenAI(api_key=api_key, base_url=get_openai_base_url(), max_retries=0)
+
+
+def _messages_tokens(messages: List[dict]) -> int:
+    """메시지 입력 토큰 추정 (이미지 등 텍스트가 아닌 part는 제외)"""
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+        elif isinstance(content, list):
+            total += sum(estimate_tokens(part.get("text", "")) for part in content if isinstance(part, dict))
+    return total
+
+
+def _usage_tokens(usage) -> tuple:
+    """usage 객체에서 (입력, 출력) 토큰 (chat: prompt/completion, embeddings: prompt만)"""
+    if usage is None:
+        return None, None
+    input_tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None)
+    output_tokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None)
+    return input_tokens, output_tokens
+
+
+def _scheduled_create(
+    resource,
+    action: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    estimated_tokens: int = 0,
+    **kwargs
+):
+    """
+    요청 스케줄러를 거쳐 OpenAI API 호출
+    (rate limit 대기 + 429/5xx 재시도 + 응답 헤더로 한도 보정)
+    
+    Args:
+        resource: client.chat.completions / client.embeddings / client.audio.transcriptions
+        action: ai_logs에 기록할 호출 종류 (None이면 호출자가 직접 기록, 예: 스트리밍)
+        priority: PRIORITY_INTERACTIVE 또는 PRIORITY_BACKGROUND
+        estimated_tokens: 예상 토큰 수 (입력 + 최대 출력)
+        **kwargs: create() 인자
+    
+    Returns:
+        create()와 동일한 응답 객체
+    """
+    model = kwargs.get("model", "default")
+    started = time.monotonic()
+    try:
+        response = get_request_scheduler().call(
+            lambda: resource.with_raw_response.create(**kwargs),
+            model=model,
+            estimated_tokens=estimated_tokens,
+            priority=priority
+        )
+    except Exception as e:
+        if action:
+            log_ai_call(action, model, latency_ms=(time.monotonic() - started) * 1000, error=str(e))
+        raise
+    
+    if action:
+        input_tokens, output_tokens = _usage_tokens(getattr(response, "usage", None))
+        log_ai_call(
+            action, model, input_tokens, output_tokens,
+            latency_ms=(time.monotonic() - started) * 1000
+        )
+    return response
 
 
 def chat_completion(
     messages: List[dict],
     model: str = "gpt-4o-mini",
     temperature: float = 0.7,
-    max_tokens: int = 1000
+    max_tokens: int = 1000,
+    cache: Optional[bool] = None,
+    action: str = "chat"
 ) -> Optional[str]:
     """
     ChatGPT 응답 생성
@@ -32,6 +110,8 @@ def chat_completion(
         model: 모델명
         temperature: 창의성 (0.0 ~ 1.0)
         max_tokens: 최대 토큰 수
+        cache: 응답 캐시 (None: 낮은 temperature일 때만, True: 항상, False: 우회)
+        action: ai_logs 호출 종류
     
     Returns:
         응답 텍스트
@@ -42,25 +122,95 @@ def chat_completion(
             st.warning("OpenAI API 키가 설정되지 않았습니다.")
             return None
         
-        response = client.chat.completions.create(
+        cache_key = None
+        if llm_cache.should_cache(temperature, cache):
+            cache_key = llm_cache.make_llm_cache_key(model, messages, None, temperature, max_tokens)
+            cached = llm_cache.lookup(cache_key, action)
+            if cached is not None:
+                log_ai_call(action, model, 0, 0, latency_ms=0, cache_hit=True)
+                return cached
+        
+        response = _scheduled_create(
+            client.chat.completions,
+            action=action,
+            estimated_tokens=_messages_tokens(messages) + max_tokens,
             model=model,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens
         )
         
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        if cache_key and content:
+            llm_cache.store(cache_key, model, content, response.usage)
+        return content
         
     except Exception as e:
         st.error(f"ChatGPT 호출 실패: {e}")
         return None
 
 
+def chat_completion_stream(
+    messages: List[dict],
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+    action: str = "chat_stream"
+) -> Iterator[str]:
+    """
+    ChatGPT 응답을 토큰 단위로 스트리밍 (stream=True)
+    
+    Args:
+        messages: [{"role": "system/user/assistant", "content": "..."}]
+        model: 모델명
+        temperature: 창의성 (0.0 ~ 1.0)
+        max_tokens: 최대 토큰 수
+        action: ai_logs 호출 종류 (스트림이 끝날 때 사용량과 함께 기록)
+    
+    Yields:
+        응답 텍스트 조각 (st.write_stream에 바로 전달 가능)
+    """
+    started = time.monotonic()
+    usage = None
+    try:
+        client = get_openai_client()
+        if not client:
+            st.warning("OpenAI API 키가 설정되지 않았습니다.")
+            return
+        
+        stream = _scheduled_create(
+            client.chat.completions,
+            estimated_tokens=_messages_tokens(messages) + max_tokens,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+        
+        input_tokens, output_tokens = _usage_tokens(usage)
+        log_ai_call(action, model, input_tokens, output_tokens, latency_ms=(time.monotonic() - started) * 1000)
+        
+    except Exception as e:
+        log_ai_call(action, model, latency_ms=(time.monotonic() - started) * 1000, error=str(e))
+        st.error(f"ChatGPT 스트리밍 실패: {e}")
+
+
 def chat_completion_json(
     messages: List[dict],
     json_schema: Dict[str, Any],
     model: str = "gpt-4o-mini",
-    temperature: float = 0.3
+    temperature: float = 0.3,
+    schema_name: str = "extraction_result",
+    cache: Optional[bool] = None,
+    action: Optional[str] = None
 ) -> Optional[Dict]:
     """
     Structured Outputs를 사용한 JSON 응답 생성
@@ -70,33 +220,50 @@ def chat_completion_json(
         json_schema: JSON Schema 정의 (response_format에 사용)
         model: 모델명 (gpt-4o-mini 권장)
         temperature: 낮은 값 권장 (구조화된 출력용)
+        schema_name: response_format 스키마 이름
+        cache: 응답 캐시 (None: 낮은 temperature일 때만, True: 항상, False: 우회)
+        action: ai_logs 호출 종류 (기본값: schema_name)
     
     Returns:
         파싱된 JSON 딕셔너리
     """
+    action = action or schema_name
     try:
         client = get_openai_client()
         if not client:
             st.warning("OpenAI API 키가 설정되지 않았습니다.")
             return None
         
+        cache_key = None
+        if llm_cache.should_cache(temperature, cache):
+            cache_key = llm_cache.make_llm_cache_key(model, messages, json_schema, temperature, None)
+            cached = llm_cache.lookup(cache_key, action)
+            if cached is not None:
+                log_ai_call(action, model, 0, 0, latency_ms=0, cache_hit=True)
+                return cached
+        
         # Structured Outputs 사용 (response_format)
-        response = client.chat.completions.create(
+        response = _scheduled_create(
+            client.chat.completions,
+            action=action,
+            estimated_tokens=_messages_tokens(messages) + estimate_tokens(json.dumps(json_schema)),
             model=model,
             messages=messages,
             temperature=temperature,
             response_format={
                 "type": "json_schema",
                 "json_schema": {
-                    "name": "extraction_result",
+                    "name": schema_name,
                     "strict": True,
                     "schema": json_schema
                 }
             }
         )
         
-        content = response.choices[0].message.content
-        return json.loads(content)
+        data = json.loads(response.choices[0].message.content)
+        if cache_key:
+            llm_cache.store(cache_key, model, data, response.usage)
+        return data
         
     except json.JSONDecodeError as e:
         st.error(f"JSON 파싱 실패: {e}")
@@ -106,12 +273,13 @@ def chat_completion_json(
         return None
 
 
-def ingest_text(raw_text: str) -> Optional[str]:
+def ingest_text(raw_text: str, cache: Optional[bool] = None) -> Optional[str]:
     """
     Ingestor: 원본 텍스트를 정리/정규화
     
     Args:
         raw_text: 사용자가 입력한 원본 텍스트
+        cache: 응답 캐시 (None: 기본 정책, False: 우회)
     
     Returns:
         정리된 clean_text
@@ -123,24 +291,26 @@ def ingest_text(raw_text: str) -> Optional[str]:
         {"role": "user", "content": raw_text}
     ]
     
-    return chat_completion(messages, temperature=0.3, max_tokens=2000)
+    return chat_completion(messages, temperature=0.3, max_tokens=2000, cache=cache, action="ingest")
 
 
-def extract_structured_data(text: str) -> Optional[Dict]:
+def extract_structured_data(text: str, cache: Optional[bool] = None) -> Optional[Dict]:
     """
     Extractor: 텍스트에서 구조화된 정보 추출 (Structured Outputs)
     
     Args:
         text: 분석할 텍스트 (정리된 clean_text 권장)
+        cache: 응답 캐시 (None: 기본 정책, False: 우회)
     
     Returns:
-        추출된 데이터 딕셔너리:
+        추출된 데이터 딕셔너리 (EXTRACTOR_JSON_SCHEMA):
         {
-            "tasks": [...],
+            "gratitudes": [...],
+            "prayer_topics": [...],
+            "scripture_refs": [...],
+            "commitments": [...],
             "obstacles": [...],
-            "projects": [...],
-            "insights": [...],
-            "people": [...],
+            "community_actions": [...],
             "emotions": [...]
         }
     """
@@ -151,13 +321,14 @@ def extract_structured_data(text: str) -> Optional[Dict]:
         {"role": "user", "content": f"다음 체크인에서 정보를 추출해주세요:\n\n{text}"}
     ]
     
-    return chat_completion_json(messages, EXTRACTOR_JSON_SCHEMA, temperature=0.2)
+    return chat_completion_json(messages, EXTRACTOR_JSON_SCHEMA, temperature=0.2, cache=cache, action="extract")
 
 
 def generate_reflection(
     checkin_text: str,
     context: str = None,
-    style: str = "supportive"
+    style: str = "supportive",
+    cache: Optional[bool] = None
 ) -> Optional[str]:
     """
     Reflector: 회고 및 인사이트 생성
@@ -166,6 +337,7 @@ def generate_reflection(
         checkin_text: 현재 체크인 텍스트
         context: 과거 기록 컨텍스트 (RAG 결과)
         style: 응답 스타일 ('supportive', 'analytical', 'motivational')
+        cache: 응답 캐시 (None: 기본 정책, False: 우회)
     
     Returns:
         회고 텍스트
@@ -182,7 +354,64 @@ def generate_reflection(
         {"role": "user", "content": user_message}
     ]
     
-    return chat_completion(messages, temperature=0.7, max_tokens=500)
+    return chat_completion(messages, temperature=0.7, max_tokens=500, cache=cache, action="reflection")
+
+
+def analyze_checkin_fused(
+    raw_text: str,
+    use_ingestor: bool = True,
+    use_reflection: bool = True,
+    context: str = None,
+    cache: Optional[bool] = None
+) -> Optional[Dict]:
+    """
+    Fused: 정리(Ingestor) + 추출(Extractor) + 코멘트(Reflector)를 한 번의 Structured Outputs 호출로
+    
+    Args:
+        raw_text: 사용자 입력 원본 텍스트
+        use_ingestor: clean_text 정리 여부 (False면 원문 사용, 출력 토큰 절약)
+        use_reflection: 코멘트 생성 여부
+        context: 과거 기록 컨텍스트 (RAG 결과, 코멘트에 반영)
+        cache: 응답 캐시 (None: 기본 정책, False: 우회)
+    
+    Returns:
+        {
+            "clean_text": "정리된 텍스트",
+            "extractions": {...EXTRACTOR_JSON_SCHEMA 필드...},
+            "reflection": "코멘트" 또는 None
+        }
+    """
+    from lib.prompts import FUSED_CHECKIN_SYSTEM_PROMPT, FUSED_CHECKIN_JSON_SCHEMA, EXTRACTOR_JSON_SCHEMA
+    
+    options = []
+    if not use_ingestor:
+        options.append("정리 생략")
+    if not use_reflection:
+        options.append("코멘트 생략")
+    
+    user_message = f"신앙 기록:\n{raw_text}"
+    if context and use_reflection:
+        user_message += f"\n\n관련 과거 기록 (코멘트 참고용):\n{context}"
+    if options:
+        user_message += f"\n\n지시: {', '.join(options)}"
+    
+    messages = [
+        {"role": "system", "content": FUSED_CHECKIN_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message}
+    ]
+    
+    data = chat_completion_json(
+        messages, FUSED_CHECKIN_JSON_SCHEMA, temperature=0.3, schema_name="fused_checkin",
+        cache=cache, action="fused_checkin"
+    )
+    if not data:
+        return None
+    
+    return {
+        "clean_text": (data.get("clean_text") or "").strip() or raw_text,
+        "extractions": {key: data.get(key, []) for key in EXTRACTOR_JSON_SCHEMA["properties"]},
+        "reflection": ((data.get("reflection") or "").strip() or None) if use_reflection else None
+    }
 
 
 def generate_weekly_report(checkins: List[Dict]) -> Optional[str]:
@@ -212,7 +441,8 @@ def generate_weekly_report(checkins: List[Dict]) -> Optional[str]:
         {"role": "user", "content": f"이번 주 체크인 기록:\n\n{combined_text}"}
     ]
     
-    return chat_completion(messages, temperature=0.7, max_tokens=1000)
+    # 같은 주를 다시 생성하면 이전 결과 재사용 (TTL 동안)
+    return chat_completion(messages, temperature=0.7, max_tokens=1000, cache=True, action="weekly_report")
 
 
 def suggest_time_blocks(
@@ -248,16 +478,22 @@ def suggest_time_blocks(
 """}
     ]
     
-    return chat_completion_json(messages, PLANNER_JSON_SCHEMA, temperature=0.5)
+    # 같은 할 일 목록이면 이전 제안 재사용 (TTL 동안)
+    return chat_completion_json(messages, PLANNER_JSON_SCHEMA, temperature=0.5, cache=True, action="plan")
 
 
-def create_embedding(text: str, model: str = "text-embedding-3-small") -> Optional[List[float]]:
+def create_embedding(
+    text: str,
+    model: str = "text-embedding-3-small",
+    priority: int = PRIORITY_INTERACTIVE
+) -> Optional[List[float]]:
     """
     텍스트 임베딩 생성 (RAG용)
     
     Args:
         text: 임베딩할 텍스트
         model: 임베딩 모델
+        priority: 요청 우선순위 (인덱싱은 PRIORITY_BACKGROUND)
     
     Returns:
         벡터 (float 리스트)
@@ -267,7 +503,11 @@ def create_embedding(text: str, model: str = "text-embedding-3-small") -> Option
         if not client:
             return None
         
-        response = client.embeddings.create(
+        response = _scheduled_create(
+            client.embeddings,
+            action="embedding",
+            priority=priority,
+            estimated_tokens=estimate_tokens(text),
             model=model,
             input=text
         )
@@ -279,16 +519,82 @@ def create_embedding(text: str, model: str = "text-embedding-3-small") -> Option
         return None
 
 
+# OpenAI Embeddings API 요청당 입력 제한
+EMBEDDING_MAX_INPUTS_PER_REQUEST = 2048
+EMBEDDING_MAX_TOKENS_PER_REQUEST = 300000
+
+
+def create_embeddings(
+    texts: List[str],
+    model: str = "text-embedding-3-small",
+    priority: int = PRIORITY_INTERACTIVE
+) -> List[Optional[List[float]]]:
+    """
+    여러 텍스트를 배치로 임베딩 (요청당 입력 제한까지 한 번에 전송)
+    
+    Args:
+        texts: 임베딩할 텍스트 목록
+        model: 임베딩 모델
+        priority: 요청 우선순위 (인덱싱은 PRIORITY_BACKGROUND)
+    
+    Returns:
+        입력 순서와 같은 벡터 목록 (빈 텍스트/실패한 배치는 None)
+    """
+    results: List[Optional[List[float]]] = [None] * len(texts)
+    
+    client = get_openai_client()
+    if not client:
+        return results
+    
+    # 빈 텍스트는 API가 거부하므로 제외
+    pending = [(i, t) for i, t in enumerate(texts) if t and t.strip()]
+    
+    # 입력 개수/토큰 한도 안에서 배치 구성
+    batches = []
+    batch, batch_tokens = [], 0
+    for i, text in pending:
+        tokens = estimate_tokens(text)
+        if batch and (
+            len(batch) >= EMBEDDING_MAX_INPUTS_PER_REQUEST
+            or batch_tokens + tokens > EMBEDDING_MAX_TOKENS_PER_REQUEST
+        ):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append((i, text))
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    
+    for batch in batches:
+        try:
+            response = _scheduled_create(
+                client.embeddings,
+                action="embedding_batch",
+                priority=priority,
+                estimated_tokens=sum(estimate_tokens(text) for _, text in batch),
+                model=model,
+                input=[text for _, text in batch]
+            )
+            for item in response.data:
+                results[batch[item.index][0]] = item.embedding
+        except Exception as e:
+            st.error(f"임베딩 배치 생성 실패: {e}")
+    
+    return results
+
+
 def transcribe_audio(
     audio_file,
-    language: str = "ko"
+    language: str = "ko",
+    file_name: str = "audio.mp3"
 ) -> Optional[str]:
     """
     음성을 텍스트로 변환 (Whisper)
     
     Args:
-        audio_file: 오디오 파일 객체 (file-like object)
+        audio_file: 오디오 파일 객체 (file-like object) 또는 bytes / memoryview
         language: 언어 코드
+        file_name: bytes로 전달할 때 사용할 파일명 (Whisper가 확장자로 형식을 판별)
     
     Returns:
         변환된 텍스트
@@ -298,7 +604,15 @@ def transcribe_audio(
         if not client:
             return None
         
-        response = client.audio.transcriptions.create(
+        if isinstance(audio_file, (bytes, bytearray, memoryview)):
+            # 임시 파일 없이 메모리 버퍼를 그대로 전송 (bytes는 BytesIO가 복사 없이 공유)
+            buffer = io.BytesIO(audio_file)
+            buffer.name = file_name
+            audio_file = buffer
+        
+        response = _scheduled_create(
+            client.audio.transcriptions,
+            action="transcription",
             model="whisper-1",
             file=audio_file,
             language=language
@@ -311,16 +625,162 @@ def transcribe_audio(
         return None
 
 
+# Whisper 요청 크기 상한(25MB)보다 여유를 둔 값
+WHISPER_MAX_BYTES = 24 * 1024 * 1024
+
+
+def _split_audio_on_silence(
+    audio,
+    max_segment_ms: int,
+    min_segment_ms: int,
+    overlap_ms: int,
+    min_silence_ms: int = 700,
+    silence_offset_db: float = 16.0
+) -> List[tuple]:
+    """
+    침묵 구간 기준으로 오디오를 max_segment_ms 이하 구간으로 나눔
+
+    Returns:
+        [(start_ms, end_ms, overlapped)] - overlapped: 침묵 없이 강제로 잘라
+        다음 구간이 overlap_ms만큼 겹쳐 시작하는지 여부
+    """
+    from pydub.silence import detect_silence
+
+    total_ms = len(audio)
+    silences = detect_silence(
+        audio,
+        min_silence_len=min_silence_ms,
+        silence_thresh=audio.dBFS - silence_offset_db,
+        seek_step=10
+    )
+    # 침묵 구간의 가운데를 자를 후보로 사용
+    cut_points = [(start + end) // 2 for start, end in silences]
+
+    segments = []
+    start = 0
+    while total_ms - start > max_segment_ms:
+        window_end = start + max_segment_ms
+        candidates = [p for p in cut_points if start + min_segment_ms <= p <= window_end]
+        if candidates:
+            cut = candidates[-1]
+            segments.append((start, cut, False))
+            start = cut
+        else:
+            # 긴 침묵이 없으면 강제로 자르고 경계 단어가 잘리지 않도록 겹치게 시작
+            segments.append((start, window_end, True))
+            start = window_end - overlap_ms
+    segments.append((start, total_ms, False))
+    return segments
+
+
+def _merge_transcripts(parts: List[str], overlapped: List[bool], max_overlap_words: int = 30) -> str:
+    """
+    구간별 전사 결과를 순서대로 이어 붙임
+    겹쳐 자른 경계에서는 앞 구간 끝과 뒷 구간 앞의 중복 단어열을 제거
+    """
+    merged: List[str] = []
+    for i, text in enumerate(parts):
+        words = text.split()
+        if i > 0 and overlapped[i - 1] and merged:
+            limit = min(max_overlap_words, len(merged), len(words))
+            for n in range(limit, 0, -1):
+                if merged[-n:] == words[:n]:
+                    words = words[n:]
+                    break
+        merged.extend(words)
+    return " ".join(merged)
+
+
+def transcribe_audio_long(
+    audio_bytes: bytes,
+    file_ext: str = "mp3",
+    language: str = "ko",
+    max_segment_ms: int = 180_000,
+    overlap_ms: int = 2_000,
+    max_workers: int = 16,
+    duration_ms: Optional[int] = None
+) -> Optional[str]:
+    """
+    긴 음성을 침묵 기준으로 나눠 동시에 전사한 뒤 순서대로 합침
+    (전체 소요 시간 ≈ 가장 긴 구간 1개의 전사 시간, 요청 수는 스케줄러가 조절)
+
+    Args:
+        audio_bytes: 원본 오디오 바이트 (bytes / memoryview)
+        file_ext: 원본 확장자 (pydub 디코딩 형식)
+        language: 언어 코드
+        max_segment_ms: 구간 최대 길이(ms)
+        overlap_ms: 침묵 없이 강제로 자를 때 겹치는 길이(ms)
+        max_workers: 동시 전사 요청 수
+        duration_ms: 전처리에서 이미 구한 길이(ms). 짧고 작은 파일은 디코딩 없이 바로 전사
+
+    Returns:
+        변환된 텍스트
+    """
+    fits_single_request = len(audio_bytes) <= WHISPER_MAX_BYTES
+    if fits_single_request and duration_ms is not None and duration_ms <= max_segment_ms:
+        return transcribe_audio(audio_bytes, language=language, file_name=f"audio.{file_ext}")
+
+    try:
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=file_ext)
+    except Exception as e:
+        # pydub/ffmpeg를 쓸 수 없으면 한 번에 전사 (크기 상한 이내일 때만)
+        if not fits_single_request:
+            st.error(f"음성 변환 실패: 파일이 너무 커서 분할이 필요하지만 오디오를 읽을 수 없습니다 ({e})")
+            return None
+        return transcribe_audio(audio_bytes, language=language, file_name=f"audio.{file_ext}")
+
+    if len(audio) <= max_segment_ms and fits_single_request:
+        return transcribe_audio(audio_bytes, language=language, file_name=f"audio.{file_ext}")
+
+    segments = _split_audio_on_silence(
+        audio,
+        max_segment_ms=max_segment_ms,
+        min_segment_ms=max_segment_ms // 3,
+        overlap_ms=overlap_ms
+    )
+
+    def _transcribe_segment(index: int, start_ms: int, end_ms: int) -> Optional[str]:
+        # Whisper는 16kHz 모노로 처리하므로 WAV로 내보내도 품질 손실 없이 크기 상한 이내
+        buffer = io.BytesIO()
+        audio[start_ms:end_ms].set_channels(1).set_frame_rate(16000).export(buffer, format="wav")
+        buffer.name = f"segment_{index:03d}.wav"
+        buffer.seek(0)
+        return transcribe_audio(buffer, language=language)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(segments))) as executor:
+        futures = [
+            _submit_with_ctx(executor, _transcribe_segment, i, start_ms, end_ms)
+            for i, (start_ms, end_ms, _) in enumerate(segments)
+        ]
+        parts = [future.result() for future in futures]
+
+    failed = [i for i, text in enumerate(parts) if text is None]
+    if failed:
+        print(f"[transcribe] {len(segments)}개 구간 중 {len(failed)}개 전사 실패: {failed}")
+        return None
+
+    print(
+        f"[transcribe] {len(audio) / 1000:.0f}s 음성을 {len(segments)}개 구간으로 "
+        f"{time.monotonic() - started:.1f}s에 전사"
+    )
+    return _merge_transcripts(parts, [overlapped for _, _, overlapped in segments])
+
+
 def analyze_image(
     image_url: str,
-    prompt: str = "이 이미지를 설명해주세요."
+    prompt: str = "이 이미지를 설명해주세요.",
+    detail: str = "auto"
 ) -> Optional[str]:
     """
     이미지 분석 (GPT-4 Vision)
     
     Args:
-        image_url: 이미지 URL
+        image_url: 이미지 URL 또는 base64 data URL (lib.media.image_data_url)
+            - data URL이면 OpenAI가 Storage에서 다시 받아오지 않아 지연이 줄어듦
         prompt: 분석 프롬프트
+        detail: 'low' | 'high' | 'auto'
     
     Returns:
         분석 결과 텍스트
@@ -330,17 +790,23 @@ def analyze_image(
         if not client:
             return None
         
-        response = client.chat.completions.create(
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": image_url, "detail": detail}}
+                ]
+            }
+        ]
+        
+        # 이미지 입력 토큰은 해상도에 따라 다르므로 low-detail 기준(약 1,000) 여유를 둠
+        response = _scheduled_create(
+            client.chat.completions,
+            action="image_analysis",
+            estimated_tokens=_messages_tokens(messages) + 1000 + 500,
             model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": image_url}}
-                    ]
-                }
-            ],
+            messages=messages,
             max_tokens=500
         )
         
@@ -353,41 +819,238 @@ def analyze_image(
 
 # === 편의 함수: 체크인 전체 처리 파이프라인 ===
 
-def process_checkin_with_ai(raw_content: str, use_ingestor: bool = True) -> Dict[str, Any]:
+# 단계별 타임아웃 (초) - 초과 시 해당 단계 결과를 버리고 폴백
+PIPELINE_STAGE_TIMEOUTS = {
+    "ingest": 20,
+    "context": 10,
+    "extract": 25,
+    "reflect": 25
+}
+
+
+def _submit_with_ctx(executor: ThreadPoolExecutor, fn: Callable, *args, **kwargs) -> Future:
     """
-    체크인 텍스트 전체 AI 처리 파이프라인
+    현재 Streamlit 세션 컨텍스트를 붙여 스레드 풀에 제출
+    (스레드 안에서도 st.session_state / st.error 사용 가능)
+    """
+    ctx = get_script_run_ctx()
+    
+    def _call():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    
+    return executor.submit(_call)
+
+
+def _wait_stage(future: Optional[Future], deadline: float, stage: str) -> Any:
+    """단계 결과 대기 (deadline 초과/예외 시 None)"""
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FuturesTimeout:
+        print(f"[pipeline] {stage} 타임아웃")
+    except Exception as e:
+        print(f"[pipeline] {stage} 실패: {e}")
+    return None
+
+
+def route_extraction(
+    text: str,
+    threshold: Optional[float] = None,
+    max_chars: Optional[int] = None
+) -> tuple:
+    """
+    규칙 우선 라우팅: 규칙 기반 추출 신뢰도가 임계값 이상이고 짧은 텍스트면 LLM 추출 생략
+    규칙도 LLM Extractor와 같은 스키마(EXTRACTOR_JSON_SCHEMA)로 추출하고, 본문 줄 대부분을
+    그 항목에 배정할 수 있을 때만 라우팅 (글머리표만 있는 체크인은 LLM 추출)
+    라우팅 여부와 관계없이 모든 결정을 ai_logs에 action='extract_route',
+    metadata {"routed", "confidence"}로 기록 (라우팅 비율 집계용)
+    
+    Args:
+        text: 체크인 텍스트
+        threshold: 신뢰도 임계값 (기본 [extraction] rule_confidence_threshold)
+        max_chars: 이보다 긴 텍스트는 항상 LLM 추출 (기본 [extraction] rule_max_chars)
+    
+    Returns:
+        (규칙 추출 결과 또는 None, 신뢰도)
+    """
+    from lib.config import get_extraction_config
+    from lib.rules import extract_schema_by_rules
+    
+    config = get_extraction_config()
+    threshold = float(config["rule_confidence_threshold"] if threshold is None else threshold)
+    max_chars = int(config["rule_max_chars"] if max_chars is None else max_chars)
+    
+    started = time.perf_counter()
+    extractions, confidence = extract_schema_by_rules(text)
+    routed = confidence >= threshold and len(text) <= max_chars
+    
+    log_ai_call(
+        action="extract_route",
+        model="rules",
+        input_tokens=0,
+        output_tokens=0,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        metadata={"routed": routed, "confidence": confidence}
+    )
+    return (extractions if routed else None), confidence
+
+
+def run_checkin_pipeline(
+    raw_content: str,
+    use_ingestor: bool = True,
+    use_reflection: bool = True,
+    context_lookup: Optional[Callable[[str], Optional[str]]] = None,
+    fallback_extractor: Optional[Callable[[str], Dict]] = None,
+    timeouts: Optional[Dict[str, float]] = None,
+    fused: bool = False,
+    rule_first: Optional[bool] = None,
+    cache: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    체크인 AI 파이프라인 (독립 단계 동시 실행)
+    - Ingestor (+ RAG 컨텍스트 조회 동시 진행)
+    - Extractor / Reflector는 clean_text에만 의존하므로 동시 실행
+    - 전체 소요시간 ≈ Ingestor + max(Extractor, Reflector)
+    - fused=True: 컨텍스트 조회 후 analyze_checkin_fused 1회 호출 (타임아웃은 "extract" 값 사용)
+    - rule_first=True: 규칙 기반 추출 신뢰도가 충분하면 LLM 추출(통합 모드 포함)을 생략
     
     Args:
         raw_content: 사용자 입력 원본 텍스트
         use_ingestor: Ingestor로 정리할지 여부
+        use_reflection: Reflector 코멘트 생성 여부
+        context_lookup: 과거 기록 컨텍스트 조회 함수 (text → context), Reflector에 전달
+        fallback_extractor: Extractor 실패/타임아웃 시 사용할 규칙 기반 추출 함수
+        timeouts: 단계별 타임아웃 덮어쓰기 (PIPELINE_STAGE_TIMEOUTS 키)
+        fused: True면 정리/추출/코멘트를 한 번의 호출로 처리
+        rule_first: 규칙 우선 라우팅 여부 (None이면 [extraction] routing 설정)
+        cache: 단계별 LLM 응답 캐시 (None: 기본 정책, False: 우회 - 벤치마크용)
     
     Returns:
         {
             "clean_text": "정리된 텍스트",
             "extractions": {...추출된 데이터...},
-            "reflection": "간단한 코멘트"
+            "extraction_type": "llm_extractor" | "llm_fused" | "rule_first" | "rule_based",
+            "reflection": "간단한 코멘트",
+            "rule_confidence": 규칙 추출 신뢰도 (라우팅을 사용한 경우),
+            "timings": {단계: 초}
         }
     """
+    limits = {**PIPELINE_STAGE_TIMEOUTS, **(timeouts or {})}
     result = {
         "clean_text": raw_content,
         "extractions": None,
-        "reflection": None
+        "extraction_type": "llm_extractor",
+        "reflection": None,
+        "rule_confidence": None,
+        "timings": {}
     }
+    started = time.monotonic()
     
-    # Step 1: Ingestor (선택적)
-    if use_ingestor:
-        clean_text = ingest_text(raw_content)
-        if clean_text:
-            result["clean_text"] = clean_text
+    # Step 0: 규칙 우선 라우팅 (형식이 잘 갖춰진 짧은 체크인은 LLM 추출 생략)
+    if rule_first is None:
+        from lib.config import get_extraction_config
+        rule_first = get_extraction_config()["routing"] == "rule_first"
+    rule_extractions = None
+    if rule_first:
+        rule_extractions, result["rule_confidence"] = route_extraction(raw_content)
+        if rule_extractions is not None:
+            result["extractions"] = rule_extractions
+            result["extraction_type"] = "rule_first"
+            fused = False
     
-    # Step 2: Extractor
-    extractions = extract_structured_data(result["clean_text"])
-    if extractions:
-        result["extractions"] = extractions
+    # 스레드에서 cache_resource 초기화가 겹치지 않도록 미리 생성
+    get_openai_client()
     
-    # Step 3: Reflector (간단한 코멘트)
-    reflection = generate_reflection(result["clean_text"])
-    if reflection:
-        result["reflection"] = reflection
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="checkin-ai")
+    try:
+        # Step 1: Ingestor (선택적) + RAG 컨텍스트 조회 (원본 기준, 동시 진행)
+        context_future = None
+        if use_reflection and context_lookup:
+            context_future = _submit_with_ctx(executor, context_lookup, raw_content)
+            context_deadline = started + limits["context"]
+        
+        if fused:
+            context = _wait_stage(context_future, context_deadline, "context") if context_future else None
+            stage_start = time.monotonic()
+            fused_future = _submit_with_ctx(
+                executor, analyze_checkin_fused, raw_content,
+                use_ingestor=use_ingestor, use_reflection=use_reflection, context=context, cache=cache
+            )
+            fused_result = _wait_stage(fused_future, stage_start + limits["extract"], "fused") or {}
+            result["extraction_type"] = "llm_fused"
+            result["clean_text"] = fused_result.get("clean_text") or raw_content
+            result["extractions"] = fused_result.get("extractions")
+            result["reflection"] = fused_result.get("reflection")
+            result["timings"]["fused"] = time.monotonic() - stage_start
+        
+        else:
+            if use_ingestor:
+                ingest_future = _submit_with_ctx(executor, ingest_text, raw_content, cache=cache)
+                clean_text = _wait_stage(ingest_future, started + limits["ingest"], "ingest")
+                if clean_text:
+                    result["clean_text"] = clean_text
+                result["timings"]["ingest"] = time.monotonic() - started
+            
+            clean_text = result["clean_text"]
+            
+            # Step 2: Extractor / Reflector 동시 실행
+            stage_start = time.monotonic()
+            extract_future = None
+            if rule_extractions is None:
+                extract_future = _submit_with_ctx(executor, extract_structured_data, clean_text, cache=cache)
+            
+            reflect_future = None
+            if use_reflection:
+                def _reflect() -> Optional[str]:
+                    context = _wait_stage(context_future, context_deadline, "context") if context_future else None
+                    return generate_reflection(clean_text, context=context or None, cache=cache)
+                
+                reflect_future = _submit_with_ctx(executor, _reflect)
+            
+            if extract_future is not None:
+                result["extractions"] = _wait_stage(extract_future, stage_start + limits["extract"], "extract")
+                result["timings"]["extract"] = time.monotonic() - stage_start
+            
+            if reflect_future is not None:
+                result["reflection"] = _wait_stage(reflect_future, stage_start + limits["reflect"], "reflect")
+                result["timings"]["reflect"] = time.monotonic() - stage_start
+    finally:
+        # 타임아웃된 단계는 기다리지 않음 (결과는 버려짐)
+        executor.shutdown(wait=False, cancel_futures=True)
     
+    # Step 3: Extractor 실패 시 규칙 기반 폴백
+    if not result["extractions"]:
+        if fallback_extractor is None:
+            from lib.rules import extract_by_rules as fallback_extractor
+        result["extractions"] = fallback_extractor(result["clean_text"])
+        result["extraction_type"] = "rule_based"
+    
+    result["timings"]["total"] = time.monotonic() - started
     return result
+
+
+def process_checkin_with_ai(raw_content: str, use_ingestor: bool = True) -> Dict[str, Any]:
+    """
+    체크인 텍스트 전체 AI 처리 파이프라인
+    (run_checkin_pipeline 래퍼: Extractor/Reflector 동시 실행, 실패 시 규칙 기반 폴백)
+    
+    Args:
+        raw_content: 사용자 입력 원본 텍스트
+        use_ingestor: Ingestor로 정리할지 여부
+    
+    Returns:
+        {
+            "clean_text": "정리된 텍스트",
+            "extractions": {...추출된 데이터...},
+            "reflection": "간단한 코멘트"
+        }
+    """
+    result = run_checkin_pipeline(raw_content, use_ingestor=use_ingestor)
+    return {
+        "clean_text": result["clean_text"],
+        "extractions": result["extractions"],
+        "reflection": result["reflection"]
+    }
@@ -1,6 +1,7 @@
 """
 믿음루프(FaithLoop) - AI 프롬프트 템플릿
 Ingestor / Extractor / Reflector / Planner 역할별 프롬프트 정의
+(Fused: Ingestor + Extractor + Reflector 1회 호출 버전)
 """
 
 # ============================================
@@ -90,6 +91,40 @@ EXTRACTOR_JSON_SCHEMA = {
 }
 
 
+# ============================================
+# FUSED - 정리 + 추출 + 코멘트를 한 번의 호출로 (Structured Outputs)
+# ============================================
+
+FUSED_CHECKIN_SYSTEM_PROMPT = """당신은 신앙 기록 정리/분석/코칭을 함께 하는 도우미입니다.
+사용자의 신앙 기록(감사/기도/말씀/적용/방해요인)을 한 번에 처리합니다.
+
+1. clean_text: 오타/문법/공백만 정리한 원문 (요약 금지, 의미 100% 보존, 이모지 유지)
+   - "정리 생략" 지시가 있으면 빈 문자열
+2. 추출 항목 (gratitudes, prayer_topics, scripture_refs, commitments, obstacles, community_actions, emotions)
+   - 명시적으로 언급된 것만, 추측 금지, 빈 배열도 포함, 각 항목은 한 문장 이내
+   - scripture_refs는 사용자가 직접 언급한 구절만 (새 구절 생성/인용 금지)
+3. reflection: 따뜻하고 판단하지 않는 3-5문장 코멘트
+   - 감사 패턴, 결단 격려, 방해요인 인식, 다음 작은 실천 제안
+   - "코멘트 생략" 지시가 있으면 빈 문자열"""
+
+FUSED_CHECKIN_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "clean_text": {
+            "type": "string",
+            "description": "정리된 원문 (정리 생략 시 빈 문자열)"
+        },
+        **EXTRACTOR_JSON_SCHEMA["properties"],
+        "reflection": {
+            "type": "string",
+            "description": "3-5문장 코멘트 (코멘트 생략 시 빈 문자열)"
+        }
+    },
+    "required": ["clean_text", *EXTRACTOR_JSON_SCHEMA["required"], "reflection"],
+    "additionalProperties": False
+}
+
+
 # ============================================
 # REFLECTOR - 신앙 성장 코멘트 생성
 # ============================================
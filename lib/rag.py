@@ -2,101 +2,230 @@
 ReflectOS - RAG (Retrieval Augmented Generation)
 벡터 검색 기반 기억 조회 및 컨텍스트 생성
 """
+import re
+import json
+import numpy as np
 import streamlit as st
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from lib.config import get_supabase_client, get_current_user_id
-from lib.openai_client import create_embedding
-from lib.utils import DEMO_TAG
+from lib.embedding_backends import get_embedding_backend
+from lib.rate_limiter import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from lib.embedding_cache import get_embedding_cache, make_cache_key
+from lib.utils import DEMO_TAG, estimate_tokens, content_hash
 
 
 # ============================================
 # 임베딩 함수
 # ============================================
 
-def embed(text: str) -> Optional[List[float]]:
+def embed(text: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[List[float]]:
     """
-    텍스트를 벡터 임베딩으로 변환
+    텍스트를 벡터 임베딩으로 변환 (임베딩 캐시 우선)
     
     Args:
         text: 임베딩할 텍스트
+        priority: 요청 우선순위 (검색은 대화형, 인덱싱은 백그라운드)
     
     Returns:
-        1536차원 벡터 (OpenAI text-embedding-3-small)
+        1536차원 벡터 (기본 OpenAI text-embedding-3-small, [embedding] backend 설정)
     """
-    return create_embedding(text)
+    return embed_batch([text], priority=priority)[0]
 
 
-# ============================================
-# 메모리 청크 저장
-# ============================================
+def embed_batch(
+    texts: List[str],
+    priority: int = PRIORITY_INTERACTIVE
+) -> List[Optional[List[float]]]:
+    """
+    여러 텍스트를 한 번의 요청(배치)으로 임베딩
+    캐시에 있는 텍스트는 제외하고 나머지만 임베딩 백엔드에 요청
+    
+    Args:
+        texts: 임베딩할 텍스트 목록
+        priority: 요청 우선순위 (검색은 대화형, 인덱싱은 백그라운드)
+    
+    Returns:
+        입력 순서와 같은 벡터 목록 (실패 항목은 None)
+    """
+    backend = get_embedding_backend()
+    if not backend.cacheable:
+        return backend.embed_batch(texts, priority=priority)
+    
+    cache = get_embedding_cache()
+    keys = [make_cache_key(t, backend.model, backend.dimensions) for t in texts]
+    cached = cache.get_many(keys)
+    
+    # 캐시 miss만 중복 없이 요청
+    miss_keys = list(dict.fromkeys(k for k in keys if k not in cached))
+    if miss_keys:
+        key_to_text = dict(zip(keys, texts))
+        vectors = backend.embed_batch([key_to_text[k] for k in miss_keys], priority=priority)
+        fresh = {k: v for k, v in zip(miss_keys, vectors) if v}
+        cache.put_many(fresh)
+        cached.update(fresh)
+    
+    return [cached.get(k) for k in keys]
 
-def save_memory_chunk(
-    source_type: str,
-    source_id: str,
-    content: str,
-    chunk_index: int = 0,
-    metadata: Dict = None,
-    user_id: str = None
-) -> Optional[Dict]:
+
+def check_embedding_backend(client=None) -> bool:
     """
-    memory_chunks 테이블에 텍스트 조각 저장
-    중복 방지: checkin은 단일 유지 정책 적용
+    저장된 임베딩과 현재 임베딩 백엔드의 모델이 같은지 확인
+    다른 모델의 벡터가 있으면 인덱싱/검색을 거부 (벡터 공간이 달라 유사도가 의미 없음)
+    확인 결과는 세션에 모델별로 기억해 검색마다 왕복하지 않음
     
     Args:
-        source_type: 소스 타입 ('checkin', 'extraction', 'calendar', 'plan')
-        source_id: 소스 레코드 ID
-        content: 텍스트 내용
-        chunk_index: 긴 텍스트 분할 시 순서
-        metadata: 추가 메타데이터
-        user_id: 사용자 ID
+        client: Supabase 클라이언트 (없으면 기본 클라이언트)
     
     Returns:
-        저장된 chunk 레코드
+        같은 모델만 있거나 저장된 임베딩이 없으면 True
     """
+    backend = get_embedding_backend()
+    if st.session_state.get("embedding_model_verified") == backend.model:
+        return True
+    
     try:
-        client = get_supabase_client()
+        client = client or get_supabase_client()
         if not client:
-            return None
-        
-        user_id = user_id or get_current_user_id()
-        
-        # 중복 방지: checkin인 경우 기존 chunk 확인
-        if source_type == "checkin":
-            existing = client.table("memory_chunks").select("id, content").eq(
-                "user_id", user_id
-            ).eq("source_type", source_type).eq("source_id", source_id).eq(
-                "chunk_index", chunk_index
-            ).execute()
-            
-            rows = existing.data or []
-            if rows:
-                # content가 같으면 기존 row 반환 (삽입 X)
-                if rows[0].get("content") == content:
-                    return rows[0]
-                # content가 다르면 삭제 후 새로 삽입
-                client.table("memory_chunks").delete().eq(
-                    "user_id", user_id
-                ).eq("source_type", source_type).eq("source_id", source_id).eq(
-                    "chunk_index", chunk_index
-                ).execute()
-        
-        data = {
-            "user_id": user_id,
-            "source_type": source_type,
-            "source_id": source_id,
-            "content": content,
-            "chunk_index": chunk_index,
-            "metadata": metadata or {},
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
-        response = client.table("memory_chunks").insert(data).execute()
-        return response.data[0] if response.data else None
-        
+            return False
+        response = client.table("memory_embeddings").select("embedding_model").neq(
+            "embedding_model", backend.model
+        ).limit(1).execute()
     except Exception as e:
-        st.error(f"메모리 청크 저장 실패: {e}")
-        return None
+        st.error(f"임베딩 모델 확인 실패 (migration 014 적용 여부 확인): {e}")
+        return False
+    
+    if response.data:
+        st.error(
+            f"저장된 임베딩 모델({response.data[0]['embedding_model']})과 현재 임베딩 백엔드"
+            f"({backend.model})가 다릅니다. [embedding] backend를 되돌리거나 임베딩을 초기화한 뒤 다시 인덱싱하세요."
+        )
+        return False
+    
+    st.session_state["embedding_model_verified"] = backend.model
+    return True
+
+
+# ============================================
+# 청킹 (토큰 예산 기반)
+# ============================================
+
+CHUNK_MAX_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 60
+
+# 문장 경계: 종결부호 뒤 공백, 또는 줄바꿈
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?。…])\s+|\n+')
+
+
+def _pack_pieces(pieces: List[str], separator: str, max_tokens: int) -> List[str]:
+    """
+    조각을 순서대로 이어 붙여 토큰 예산 이내의 묶음 생성 (조각별 토큰을 누적, O(n))
+    조각 비용은 estimate_tokens(조각 + 구분자) + 1 → 내림 오차를 덮는 상한이라 묶음이 예산을 넘지 않음
+    """
+    parts = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece + separator) + 1
+        if current and current_tokens + tokens > max_tokens:
+            parts.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        parts.append(separator.join(current))
+    return parts
+
+
+def _split_long_sentence(sentence: str, max_tokens: int) -> List[str]:
+    """
+    토큰 예산을 넘는 한 문장을 공백(단어) 경계로 분할
+    (구두점 없는 긴 음성 전사 대응, 단어 하나가 예산을 넘을 때만 글자 단위로 자름)
+    """
+    parts = []
+    words: List[str] = []
+    for word in sentence.split():
+        if estimate_tokens(word) + 1 > max_tokens:
+            parts.extend(_pack_pieces(words, " ", max_tokens))
+            parts.extend(_pack_pieces(list(word), "", max_tokens))
+            words = []
+        else:
+            words.append(word)
+    parts.extend(_pack_pieces(words, " ", max_tokens))
+    return parts
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> List[str]:
+    """
+    문장 단위 + 토큰 예산으로 텍스트 분할 (인접 청크 간 문장 overlap)
+    
+    Args:
+        text: 분할할 텍스트 (체크인 + 음성 전사/이미지 분석 포함)
+        max_tokens: 청크당 최대 토큰 수 (estimate_tokens 기준)
+        overlap_tokens: 이전 청크 끝에서 다음 청크로 이어 붙일 토큰 수
+    
+    Returns:
+        청크 목록 (짧은 텍스트는 1개)
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    
+    sentences = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if estimate_tokens(sentence) > max_tokens:
+            sentences.extend(_split_long_sentence(sentence, max_tokens))
+        else:
+            sentences.append(sentence)
+    
+    # 문장 비용은 _pack_pieces와 같이 구분자("\n")와 내림 오차(+1)까지 포함 → 청크가 예산을 넘지 않음
+    def sentence_cost(sentence: str) -> int:
+        return estimate_tokens(sentence + "\n") + 1
+    
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    
+    for sentence in sentences:
+        tokens = sentence_cost(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            
+            # overlap: 직전 청크의 마지막 문장들을 예산 안에서 이어 붙임
+            overlap: List[str] = []
+            overlap_size = 0
+            for prev in reversed(current):
+                prev_tokens = sentence_cost(prev)
+                if overlap_size + prev_tokens > overlap_tokens or overlap_size + prev_tokens + tokens > max_tokens:
+                    break
+                overlap.insert(0, prev)
+                overlap_size += prev_tokens
+            current, current_tokens = overlap, overlap_size
+        
+        current.append(sentence)
+        current_tokens += tokens
+    
+    if current:
+        chunks.append("\n".join(current))
+    
+    return chunks
+
+
+# ============================================
+# 메모리 청크 저장
+# ============================================
+
+# memory_chunks / memory_embeddings 유니크 제약 컬럼 (멱등 upsert 키)
+MEMORY_CONFLICT_COLUMNS = "user_id,source_type,source_id,chunk_index,content_hash"
 
 
 def save_memory_embedding(
@@ -107,8 +236,10 @@ def save_memory_embedding(
     user_id: str = None
 ) -> Optional[Dict]:
     """
-    memory_embeddings 테이블에 벡터 임베딩 저장
-    중복 방지: checkin은 단일 유지, extraction은 동일 content만 스킵
+    memory_embeddings 테이블에 단일 벡터 임베딩 저장 (content_hash 기준 멱등 upsert)
+    동일 content만 스킵하고 이전 내용은 누적 유지 (extraction 등 비청크 소스용)
+    checkin은 청크 단위 교체가 필요하므로 save_chunked_memory(replace_memory_chunks RPC)만 사용
+    (재저장 시 임베딩은 캐시에서 가져오므로 OpenAI 호출 없음)
     
     Args:
         source_type: 소스 타입
@@ -118,41 +249,28 @@ def save_memory_embedding(
         user_id: 사용자 ID
     
     Returns:
-        저장된 embedding 레코드
+        저장된 embedding 레코드 (이미 있으면 요청 데이터)
+    
+    Raises:
+        ValueError: source_type이 'checkin'인 경우
     """
+    if source_type == "checkin":
+        raise ValueError("checkin 임베딩은 save_chunked_memory로 저장하세요 (청크 단위 교체)")
+    
     try:
         client = get_supabase_client()
         if not client:
             return None
         
-        user_id = user_id or get_current_user_id()
+        if not check_embedding_backend(client):
+            return None
         
-        # 중복 방지: 기존 rows 조회
-        existing = client.table("memory_embeddings").select("id, content").eq(
-            "user_id", user_id
-        ).eq("source_type", source_type).eq("source_id", source_id).execute()
-        
-        rows = existing.data or []
-        
-        if source_type == "checkin":
-            # checkin: 동일 content면 반환, 다르면 삭제 후 삽입
-            for row in rows:
-                if row.get("content") == content:
-                    return row  # 동일 content, 스킵
-            # 기존 것 삭제 (content가 다르거나 새로 삽입)
-            if rows:
-                client.table("memory_embeddings").delete().eq(
-                    "user_id", user_id
-                ).eq("source_type", source_type).eq("source_id", source_id).execute()
-        else:
-            # extraction 등: 동일 content면 스킵, 없으면 삽입 (삭제 X)
-            for row in rows:
-                if row.get("content") == content:
-                    return row  # 동일 content, 스킵
+        user_id = user_id or get_current_user_id()
+        digest = content_hash(content)
         
         # 임베딩이 없으면 생성
         if embedding is None:
-            embedding = embed(content)
+            embedding = embed(content, priority=PRIORITY_BACKGROUND)
             if not embedding:
                 return None
         
@@ -161,12 +279,18 @@ def save_memory_embedding(
             "source_type": source_type,
             "source_id": source_id,
             "content": content,
+            "chunk_index": 0,
+            "content_hash": digest,
             "embedding": embedding,
+            "embedding_model": get_embedding_backend().model,
             "created_at": datetime.utcnow().isoformat()
         }
         
-        response = client.table("memory_embeddings").insert(data).execute()
-        return response.data[0] if response.data else None
+        response = client.table("memory_embeddings").upsert(
+            data, on_conflict=MEMORY_CONFLICT_COLUMNS, ignore_duplicates=True
+        ).execute()
+        
+        return response.data[0] if response.data else data
         
     except Exception as e:
         st.error(f"임베딩 저장 실패: {e}")
@@ -177,42 +301,123 @@ def save_memory_embedding(
 # 체크인 인덱싱 (통합 함수)
 # ============================================
 
+def _build_chunk_rows(
+    source_type: str,
+    source_id: str,
+    chunks: List[str],
+    embeddings: List[List[float]],
+    metadata: Dict,
+    user_id: str
+) -> tuple:
+    """청크/임베딩 insert용 row 목록 생성 (metadata는 첫 청크에만)"""
+    now = datetime.utcnow().isoformat()
+    model = get_embedding_backend().model
+    chunk_rows = []
+    embedding_rows = []
+    for index, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+        base = {
+            "user_id": user_id,
+            "source_type": source_type,
+            "source_id": source_id,
+            "content": chunk,
+            "chunk_index": index,
+            "content_hash": content_hash(chunk),
+            "created_at": now
+        }
+        chunk_rows.append({**base, "metadata": (metadata or {}) if index == 0 else {}})
+        embedding_rows.append({**base, "embedding": embedding, "embedding_model": model})
+    return chunk_rows, embedding_rows
+
+
+def save_chunked_memory(
+    source_type: str,
+    source_id: str,
+    content: str,
+    metadata: Dict = None,
+    user_id: str = None
+) -> bool:
+    """
+    긴 텍스트를 청크로 나누어 memory_chunks/memory_embeddings에 저장
+    - 청크 전체를 한 번의 배치로 임베딩 (캐시 hit은 OpenAI 호출 없음)
+    - replace_memory_chunks RPC 1회로 upsert + stale 청크 삭제
+    
+    Args:
+        source_type: 소스 타입
+        source_id: 소스 레코드 ID
+        content: 원본 텍스트
+        metadata: 첫 청크에 저장할 메타데이터
+        user_id: 사용자 ID
+    
+    Returns:
+        성공 여부
+    """
+    client = get_supabase_client()
+    if not client or not check_embedding_backend(client):
+        return False
+    
+    user_id = user_id or get_current_user_id()
+    chunks = chunk_text(content)
+    if not chunks:
+        return True
+    
+    embeddings = embed_batch(chunks, priority=PRIORITY_BACKGROUND)
+    if not all(embeddings):
+        return False
+    
+    chunk_rows, embedding_rows = _build_chunk_rows(
+        source_type, source_id, chunks, embeddings, metadata, user_id
+    )
+    payload = [
+        {
+            "chunk_index": chunk_row["chunk_index"],
+            "content": chunk_row["content"],
+            "content_hash": chunk_row["content_hash"],
+            "metadata": chunk_row["metadata"],
+            "embedding": embedding_row["embedding"],
+            "embedding_model": embedding_row["embedding_model"]
+        }
+        for chunk_row, embedding_row in zip(chunk_rows, embedding_rows)
+    ]
+    
+    client.rpc("replace_memory_chunks", {
+        "p_user_id": user_id,
+        "p_source_type": source_type,
+        "p_source_id": source_id,
+        "chunks": payload
+    }).execute()
+    return True
+
+
 def index_checkin(
     checkin_id: str, 
     content: str,
-    extractions: Dict = None
+    extractions: Dict = None,
+    user_id: str = None
 ) -> bool:
     """
     체크인 내용을 RAG 인덱스에 추가
-    - memory_chunks에 텍스트 저장
-    - memory_embeddings에 벡터 저장
+    - 토큰 예산 기준으로 청크 분할 (음성 전사/이미지 분석이 붙은 긴 기록 대응)
+    - memory_chunks에 텍스트 저장 (chunk_index 순서)
+    - memory_embeddings에 청크별 벡터 저장
     
     Args:
         checkin_id: 체크인 ID
         content: 체크인 내용
         extractions: 추출된 데이터 (tasks, obstacles 등)
+        user_id: 사용자 ID (워커처럼 세션이 없을 때 필수)
     
     Returns:
         성공 여부
     """
     try:
-        # 1. memory_chunks에 원본 텍스트 저장
-        chunk = save_memory_chunk(
+        return save_chunked_memory(
             source_type="checkin",
             source_id=checkin_id,
             content=content,
-            metadata={"extractions": extractions} if extractions else {}
+            metadata={"extractions": extractions} if extractions else {},
+            user_id=user_id
         )
         
-        # 2. memory_embeddings에 벡터 저장
-        embedding_result = save_memory_embedding(
-            source_type="checkin",
-            source_id=checkin_id,
-            content=content
-        )
-        
-        return chunk is not None and embedding_result is not None
-        
     except Exception as e:
         st.error(f"체크인 인덱싱 실패: {e}")
         return False
@@ -221,7 +426,8 @@ def index_checkin(
 def index_extraction(
     checkin_id: str,
     extraction_type: str,
-    data: Dict
+    data: Dict,
+    user_id: str = None
 ) -> bool:
     """
     추출 데이터(tasks, obstacles 등)를 별도 인덱싱
@@ -230,6 +436,7 @@ def index_extraction(
         checkin_id: 연결된 체크인 ID
         extraction_type: 추출 타입
         data: 추출된 데이터
+        user_id: 사용자 ID (워커처럼 세션이 없을 때 필수)
     
     Returns:
         성공 여부
@@ -255,7 +462,8 @@ def index_extraction(
         return save_memory_embedding(
             source_type="extraction",
             source_id=checkin_id,
-            content=content
+            content=content,
+            user_id=user_id
         ) is not None
         
     except Exception as e:
@@ -263,6 +471,87 @@ def index_extraction(
         return False
 
 
+# ============================================
+# 일괄 인덱싱 (백필/동기화용)
+# ============================================
+
+BULK_INDEX_BATCH_SIZE = 100
+
+
+def bulk_index_checkins(
+    checkins: List[Dict],
+    user_id: str = None,
+    batch_size: int = BULK_INDEX_BATCH_SIZE,
+    progress_callback=None
+) -> int:
+    """
+    여러 체크인을 배치 임베딩 + 리스트 upsert로 한 번에 인덱싱
+    (index_checkin을 체크인마다 호출하는 대신 배치당 3회 왕복, 긴 체크인은 청크 분할)
+    
+    Args:
+        checkins: [{id, content, extractions(선택)}] 목록 (아직 인덱싱되지 않은 체크인)
+        user_id: 사용자 ID
+        batch_size: 배치당 체크인 수 (임베딩 요청 1회 + upsert 2회)
+        progress_callback: 배치 완료마다 호출되는 함수 (done, total)
+    
+    Returns:
+        인덱싱에 성공한 체크인 수
+    """
+    try:
+        client = get_supabase_client()
+        if not client or not check_embedding_backend(client):
+            return 0
+        
+        user_id = user_id or get_current_user_id()
+        
+        items = [c for c in checkins if (c.get("content") or "").strip()]
+        indexed = 0
+        
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            
+            # 배치 내 모든 체크인의 청크를 한 번에 임베딩
+            batch_chunks = [chunk_text(c["content"]) for c in batch]
+            flat_embeddings = embed_batch(
+                [chunk for chunks in batch_chunks for chunk in chunks], priority=PRIORITY_BACKGROUND
+            )
+            
+            chunk_rows = []
+            embedding_rows = []
+            offset = 0
+            for checkin, chunks in zip(batch, batch_chunks):
+                embeddings = flat_embeddings[offset:offset + len(chunks)]
+                offset += len(chunks)
+                if not all(embeddings):
+                    continue
+                extractions = checkin.get("extractions")
+                checkin_chunk_rows, checkin_embedding_rows = _build_chunk_rows(
+                    "checkin", checkin["id"], chunks, embeddings,
+                    {"extractions": extractions} if extractions else {}, user_id
+                )
+                chunk_rows.extend(checkin_chunk_rows)
+                embedding_rows.extend(checkin_embedding_rows)
+                indexed += 1
+            
+            if embedding_rows:
+                # 이미 인덱싱된 청크는 무시 (재실행/동시 동기화에 안전)
+                client.table("memory_chunks").upsert(
+                    chunk_rows, on_conflict=MEMORY_CONFLICT_COLUMNS, ignore_duplicates=True
+                ).execute()
+                client.table("memory_embeddings").upsert(
+                    embedding_rows, on_conflict=MEMORY_CONFLICT_COLUMNS, ignore_duplicates=True
+                ).execute()
+            
+            if progress_callback:
+                progress_callback(min(start + batch_size, len(items)), len(items))
+        
+        return indexed
+        
+    except Exception as e:
+        st.error(f"일괄 인덱싱 실패: {e}")
+        return 0
+
+
 # ============================================
 # 유사도 검색
 # ============================================
@@ -272,7 +561,9 @@ def similarity_search(
     top_k: int = 5,
     threshold: float = 0.7,
     source_type_filter: str = None,
-    exclude_demo: bool = False
+    exclude_demo: bool = False,
+    mode: str = "vector",
+    include_embeddings: bool = False
 ) -> List[Dict]:
     """
     유사 기억 검색 (pgvector 코사인 유사도)
@@ -280,16 +571,19 @@ def similarity_search(
     Args:
         query: 검색 쿼리
         top_k: 최대 결과 수
-        threshold: 최소 유사도 (0.0 ~ 1.0)
+        threshold: 최소 유사도 (0.0 ~ 1.0, OpenAI 임베딩 기준 - 백엔드별 similarity_scale 적용)
         source_type_filter: 소스 타입 필터 (선택)
         exclude_demo: True면 데모 데이터 기반 결과 제외
+        mode: 'vector' (코사인 유사도) 또는 'hybrid' (트라이그램 lexical + vector, RRF 결합)
+        include_embeddings: True면 결과에 embedding 포함 (MMR 컨텍스트 선택용)
     
     Returns:
         유사한 메모리 목록 [{id, source_type, source_id, content, similarity, created_at}]
+        (hybrid 모드는 score, vector_rank, lexical_rank 추가)
     """
     try:
         client = get_supabase_client()
-        if not client:
+        if not client or not check_embedding_backend(client):
             return []
         
         user_id = get_current_user_id()
@@ -300,52 +594,26 @@ def similarity_search(
             return []
         
         # pgvector 유사도 검색 (RPC 함수 호출)
-        response = client.rpc(
-            "search_memories",
-            {
-                "query_embedding": query_embedding,
-                "match_count": top_k,
-                "match_threshold": threshold,
-                "user_id_filter": user_id
-            }
-        ).execute()
-        
-        results = response.data or []
+        # source_type/데모 제외 필터는 RPC 내부에서 LIMIT 전에 적용
+        params = {
+            "query_embedding": query_embedding,
+            "match_count": top_k,
+            # 임계값은 OpenAI 유사도 기준 → 백엔드 유사도 분포에 맞게 변환
+            "match_threshold": get_embedding_backend().scale_threshold(threshold),
+            "user_id_filter": user_id,
+            "source_types": [source_type_filter] if source_type_filter else None,
+            "exclude_tags": [DEMO_TAG] if exclude_demo else None,
+            "include_embeddings": include_embeddings
+        }
         
-        # source_type 필터 적용 (RPC에서 지원 안하면 클라이언트에서)
-        if source_type_filter:
-            results = [r for r in results if r.get("source_type") == source_type_filter]
+        if mode == "hybrid":
+            # 성경 구절/이름/태그 같은 정확 일치를 lexical 순위로 보완
+            params["query_text"] = query
+            response = client.rpc("search_memories_hybrid", params).execute()
+        else:
+            response = client.rpc("search_memories", params).execute()
         
-        # exclude_demo 필터 적용
-        if exclude_demo and results:
-            # checkin/extraction의 source_id(=checkin_id) 수집
-            ids = list({
-                r.get("source_id") for r in results 
-                if r.get("source_type") in ("checkin", "extraction")
-            })
-            
-            if ids:
-                # 해당 checkin들의 tags 조회
-                resp = client.table("checkins").select("id, tags").eq(
-                    "user_id", user_id
-                ).in_("id", ids).execute()
-                
-                # 데모 태그 포함된 checkin_id 집합
-                demo_ids = {
-                    row["id"] for row in (resp.data or [])
-                    if DEMO_TAG in (row.get("tags") or [])
-                }
-                
-                # 데모 기반 결과 제외
-                results = [
-                    r for r in results 
-                    if not (
-                        r.get("source_type") in ("checkin", "extraction") 
-                        and r.get("source_id") in demo_ids
-                    )
-                ]
-        
-        return results
+        return response.data or []
         
     except Exception as e:
         st.error(f"유사도 검색 실패: {e}")
@@ -360,10 +628,113 @@ search_memories = similarity_search
 # 컨텍스트 구성
 # ============================================
 
+CONTEXT_MAX_TOKENS = 1500
+MMR_LAMBDA = 0.7
+
+
+def _format_memory_entry(index: int, memory: Dict, include_metadata: bool = True) -> str:
+    """컨텍스트에 들어갈 기억 1건 문자열"""
+    content = memory.get("content", "")
+    source_type = memory.get("source_type", "unknown")
+    created_at = str(memory.get("created_at", ""))[:10]  # 날짜만
+    similarity = memory.get("similarity") or 0
+    
+    if include_metadata:
+        return f"\n{index}. [{created_at}] ({source_type}, 유사도: {similarity:.2f})\n   {content}"
+    return f"\n{index}. {content}"
+
+
+def _parse_embedding(value) -> Optional[np.ndarray]:
+    """RPC가 반환한 embedding('[0.1,...]' 문자열 또는 리스트)을 정규화된 벡터로 변환"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    vector = np.asarray(value, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def select_context_memories(
+    memories: List[Dict],
+    top_k: int = 5,
+    max_tokens: int = CONTEXT_MAX_TOKENS,
+    mmr_lambda: float = MMR_LAMBDA,
+    include_metadata: bool = True
+) -> List[Dict]:
+    """
+    컨텍스트에 넣을 기억 선택
+    1. 같은 source_id는 관련도가 가장 높은 1건만 유지 (checkin + extraction 중복 제거)
+    2. MMR(maximal marginal relevance)로 관련도는 높고 서로 겹치지 않는 기억 우선
+    3. 토큰 예산(estimate_tokens) 안에서만 선택
+    
+    Args:
+        memories: 검색 결과 (include_embeddings=True면 MMR에 벡터 사용)
+        top_k: 최대 선택 수
+        max_tokens: 컨텍스트 토큰 예산
+        mmr_lambda: 관련도 가중치 (1.0이면 순수 관련도 순)
+        include_metadata: build_context와 같은 형식으로 토큰 추정
+    
+    Returns:
+        선택된 기억 목록 (선택 순서)
+    """
+    if not memories:
+        return []
+    
+    # 하이브리드 결과는 RRF score, 벡터 결과는 similarity를 관련도로 사용
+    max_score = max((m.get("score") or 0) for m in memories)
+    
+    def relevance(memory: Dict) -> float:
+        if max_score:
+            return (memory.get("score") or 0) / max_score
+        return memory.get("similarity") or 0
+    
+    # 1. source_id 기준 중복 제거
+    best_by_source: Dict[str, Dict] = {}
+    for memory in memories:
+        key = memory.get("source_id") or memory.get("id")
+        if key not in best_by_source or relevance(memory) > relevance(best_by_source[key]):
+            best_by_source[key] = memory
+    
+    candidates = [
+        (memory, relevance(memory), _parse_embedding(memory.get("embedding")))
+        for memory in best_by_source.values()
+    ]
+    
+    # 2~3. MMR 탐욕 선택 + 토큰 예산
+    selected = []
+    selected_vectors = []
+    used_tokens = 0
+    
+    while candidates and len(selected) < top_k:
+        def mmr_score(candidate) -> float:
+            _, rel, vector = candidate
+            redundancy = 0.0
+            if vector is not None and selected_vectors:
+                redundancy = max(float(vector @ other) for other in selected_vectors)
+            return mmr_lambda * rel - (1 - mmr_lambda) * redundancy
+        
+        best = max(candidates, key=mmr_score)
+        candidates.remove(best)
+        memory, _, vector = best
+        
+        tokens = estimate_tokens(_format_memory_entry(len(selected) + 1, memory, include_metadata))
+        if used_tokens + tokens > max_tokens:
+            continue  # 예산 초과 기억은 건너뛰고 더 짧은 후보 시도
+        
+        selected.append(memory)
+        used_tokens += tokens
+        if vector is not None:
+            selected_vectors.append(vector)
+    
+    return selected
+
+
 def build_context(
     memories: List[Dict],
     max_chars: int = 4000,
-    include_metadata: bool = True
+    include_metadata: bool = True,
+    max_tokens: int = None
 ) -> str:
     """
     검색된 기억을 LLM 컨텍스트 문자열로 구성
@@ -372,6 +743,7 @@ def build_context(
         memories: 검색된 기억 목록
         max_chars: 최대 문자 수
         include_metadata: 날짜/타입 메타데이터 포함 여부
+        max_tokens: 지정 시 문자 수 대신 토큰 수(estimate_tokens)로 제한
     
     Returns:
         컨텍스트 문자열
@@ -383,22 +755,15 @@ def build_context(
     current_length = 0
     
     for i, memory in enumerate(memories, 1):
-        content = memory.get("content", "")
-        source_type = memory.get("source_type", "unknown")
-        created_at = str(memory.get("created_at", ""))[:10]  # 날짜만
-        similarity = memory.get("similarity", 0)
-        
-        if include_metadata:
-            entry = f"\n{i}. [{created_at}] ({source_type}, 유사도: {similarity:.2f})\n   {content}"
-        else:
-            entry = f"\n{i}. {content}"
+        entry = _format_memory_entry(i, memory, include_metadata)
+        size = estimate_tokens(entry) if max_tokens else len(entry)
         
-        if current_length + len(entry) > max_chars:
+        if current_length + size > (max_tokens or max_chars):
             context_parts.append("\n... (더 많은 기억이 있음)")
             break
         
         context_parts.append(entry)
-        current_length += len(entry)
+        current_length += size
     
     return "".join(context_parts)
 
@@ -421,7 +786,8 @@ def get_sources_info(memories: List[Dict]) -> List[Dict]:
             "source_id": memory.get("source_id"),
             "date": str(memory.get("created_at", ""))[:10],
             "preview": memory.get("content", "")[:100] + "...",
-            "similarity": memory.get("similarity", 0)
+            "similarity": memory.get("similarity", 0),
+            "lexical_match": memory.get("lexical_rank") is not None
         })
     
     return sources
@@ -431,11 +797,54 @@ def get_sources_info(memories: List[Dict]) -> List[Dict]:
 # RAG 기반 답변 생성
 # ============================================
 
+def _retrieve_context(
+    query: str,
+    top_k: int,
+    threshold: float,
+    exclude_demo: bool,
+    mode: str
+) -> tuple:
+    """검색 → 중복 제거/MMR 선택 → 토큰 예산 컨텍스트 구성"""
+    # MMR로 고를 여유분까지 후보 조회 (벡터 포함)
+    candidates = similarity_search(
+        query, top_k=top_k * 2, threshold=threshold, exclude_demo=exclude_demo,
+        mode=mode, include_embeddings=True
+    )
+    memories = select_context_memories(candidates, top_k=top_k, max_tokens=CONTEXT_MAX_TOKENS)
+    context = build_context(memories, max_tokens=CONTEXT_MAX_TOKENS)
+    return memories, context
+
+
+def get_reflection_context(
+    text: str,
+    top_k: int = 3,
+    threshold: float = 0.6,
+    exclude_demo: bool = True
+) -> Optional[str]:
+    """
+    체크인 Reflector용 과거 기록 컨텍스트 (검색 결과 없으면 None)
+    
+    Args:
+        text: 현재 체크인 텍스트
+        top_k: 참고할 과거 기록 수
+        threshold: 유사도 임계값
+        exclude_demo: True면 데모 데이터 제외
+    
+    Returns:
+        컨텍스트 문자열
+    """
+    memories, context = _retrieve_context(
+        text, top_k=top_k, threshold=threshold, exclude_demo=exclude_demo, mode="vector"
+    )
+    return context if memories else None
+
+
 def generate_rag_answer(
     query: str,
     top_k: int = 5,
     threshold: float = 0.6,
-    exclude_demo: bool = False
+    exclude_demo: bool = False,
+    mode: str = "vector"
 ) -> Dict[str, Any]:
     """
     RAG 파이프라인: 검색 → 컨텍스트 구성 → 답변 생성
@@ -445,6 +854,7 @@ def generate_rag_answer(
         top_k: 검색 결과 수
         threshold: 유사도 임계값
         exclude_demo: True면 데모 데이터 기반 결과 제외
+        mode: 검색 모드 ('vector' 또는 'hybrid')
     
     Returns:
         {
@@ -456,11 +866,8 @@ def generate_rag_answer(
     from lib.openai_client import chat_completion
     from lib.prompts import RAG_INSIGHT_PROMPT
     
-    # 1. 유사 기억 검색
-    memories = similarity_search(query, top_k=top_k, threshold=threshold, exclude_demo=exclude_demo)
-    
-    # 2. 컨텍스트 구성
-    context = build_context(memories)
+    # 1~2. 유사 기억 검색 + 컨텍스트 구성
+    memories, context = _retrieve_context(query, top_k, threshold, exclude_demo, mode)
     sources = get_sources_info(memories)
     
     # 3. 답변 생성
@@ -472,7 +879,7 @@ def generate_rag_answer(
             {"role": "user", "content": f"질문: {query}\n\n{context}"}
         ]
         
-        answer = chat_completion(messages, temperature=0.7, max_tokens=800)
+        answer = chat_completion(messages, temperature=0.7, max_tokens=800, action="rag_answer")
         
         if not answer:
             answer = "답변 생성에 실패했습니다. 다시 시도해주세요."
@@ -485,6 +892,59 @@ def generate_rag_answer(
     }
 
 
+def stream_rag_answer(
+    query: str,
+    top_k: int = 5,
+    threshold: float = 0.6,
+    exclude_demo: bool = False,
+    mode: str = "vector"
+) -> Dict[str, Any]:
+    """
+    RAG 파이프라인 (스트리밍): 검색과 컨텍스트 구성은 즉시 수행하고,
+    답변은 토큰 단위로 생성되는 iterator로 반환
+    
+    Args:
+        query: 사용자 질문
+        top_k: 검색 결과 수
+        threshold: 유사도 임계값
+        exclude_demo: True면 데모 데이터 기반 결과 제외
+        mode: 검색 모드 ('vector' 또는 'hybrid')
+    
+    Returns:
+        {
+            "answer_stream": 답변 조각 iterator (st.write_stream용),
+            "sources": [...소스 정보...],
+            "context": "사용된 컨텍스트",
+            "memories_count": 검색된 기억 수
+        }
+    """
+    from lib.openai_client import chat_completion_stream
+    from lib.prompts import RAG_INSIGHT_PROMPT
+    
+    # 1~2. 유사 기억 검색 + 컨텍스트 구성 (스트리밍 전에 완료 → 출처를 먼저 표시 가능)
+    memories, context = _retrieve_context(query, top_k, threshold, exclude_demo, mode)
+    sources = get_sources_info(memories)
+    
+    # 3. 답변 스트림
+    if not memories:
+        answer_stream = iter(["관련된 기억을 찾지 못했습니다. 더 많은 체크인을 기록하면 더 좋은 답변을 드릴 수 있어요!"])
+    else:
+        messages = [
+            {"role": "system", "content": RAG_INSIGHT_PROMPT},
+            {"role": "user", "content": f"질문: {query}\n\n{context}"}
+        ]
+        answer_stream = chat_completion_stream(
+            messages, temperature=0.7, max_tokens=800, action="rag_answer_stream"
+        )
+    
+    return {
+        "answer_stream": answer_stream,
+        "sources": sources,
+        "context": context,
+        "memories_count": len(memories)
+    }
+
+
 # 별칭 (기존 호환성)
 def generate_insight(query: str, context: str) -> Optional[str]:
     """컨텍스트 기반 인사이트 생성 (기존 호환성)"""
@@ -496,4 +956,4 @@ def generate_insight(query: str, context: str) -> Optional[str]:
         {"role": "user", "content": f"질문: {query}\n\n{context}"}
     ]
     
-    return chat_completion(messages, temperature=0.7)
+    return chat_completion(messages, temperature=0.7, action="rag_insight")
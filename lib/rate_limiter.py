@@ -0,0 +1,243 @@
+"""
+믿음루프(FaithLoop) - OpenAI 요청 스케줄러
+- 모델별 토큰 버킷 2개 (분당 요청 수 / 분당 토큰 수), 응답 헤더(x-ratelimit-*)로 한도 보정
+- 429 / 5xx / 연결 오류는 지수 backoff + jitter로 재시도 (retry-after 헤더 우선)
+- 우선순위: 대화형(체크인 코멘트, 검색) 요청이 백그라운드(인덱싱)보다 먼저 버킷을 사용
+"""
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import openai
+import streamlit as st
+from lib.config import get_rate_limit_config
+
+
+# 우선순위 클래스 (숫자가 작을수록 먼저)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """x-ratelimit-reset-* 헤더 값('1s', '6m0s', '120ms')을 초 단위로 변환"""
+    if not value:
+        return None
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    matches = _DURATION_RE.findall(value)
+    if not matches:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in matches)
+
+
+class TokenBucket:
+    """
+    분당 한도 토큰 버킷 (lock은 호출자가 관리)
+
+    Args:
+        per_minute: 분당 허용량 (버킷 용량)
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount를 꺼낼 수 있을 때까지 남은 시간(초), 0이면 즉시 가능"""
+        self._refill()
+        amount = min(amount, self.capacity)  # 용량보다 큰 요청도 결국 통과하도록
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float]):
+        """서버가 알려준 한도/잔량으로 보정"""
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class RequestScheduler:
+    """
+    프로세스 공유 OpenAI 요청 스케줄러
+
+    Args:
+        requests_per_minute: 모델별 기본 분당 요청 한도 (헤더 수신 전 사용)
+        tokens_per_minute: 모델별 기본 분당 토큰 한도
+        max_retries: 429/5xx 재시도 횟수
+        backoff_base: 첫 재시도 대기(초)
+        backoff_max: 최대 재시도 대기(초)
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200000,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._waiting: Dict[int, int] = {}
+        # 파이프라인/전사 스레드가 동시에 갱신하므로 _count로만 변경, 읽을 때는 snapshot()
+        self.stats = {"requests": 0, "retries": 0, "throttled_seconds": 0.0}
+
+    def _count(self, name: str, amount: float = 1):
+        with self._cond:
+            self.stats[name] += amount
+
+    def snapshot(self) -> Dict[str, float]:
+        """통계 복사본 (requests, retries, throttled_seconds)"""
+        with self._cond:
+            return dict(self.stats)
+
+    def _buckets_for(self, model: str) -> Dict[str, TokenBucket]:
+        if model not in self._buckets:
+            self._buckets[model] = {
+                "requests": TokenBucket(self.requests_per_minute),
+                "tokens": TokenBucket(self.tokens_per_minute)
+            }
+        return self._buckets[model]
+
+    def _acquire(self, model: str, tokens: int, priority: int):
+        """버킷에 여유가 생길 때까지 대기 (더 높은 우선순위 대기자가 있으면 양보)"""
+        started = time.monotonic()
+        with self._cond:
+            self._waiting[priority] = self._waiting.get(priority, 0) + 1
+            try:
+                while True:
+                    ahead = any(n for p, n in self._waiting.items() if p < priority)
+                    if not ahead:
+                        buckets = self._buckets_for(model)
+                        wait = max(
+                            buckets["requests"].wait_time(1),
+                            buckets["tokens"].wait_time(tokens)
+                        )
+                        if wait <= 0:
+                            buckets["requests"].take(1)
+                            buckets["tokens"].take(tokens)
+                            break
+                    else:
+                        wait = 0.5
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+        self._count("throttled_seconds", time.monotonic() - started)
+
+    def _update_from_headers(self, model: str, headers):
+        """x-ratelimit-limit/remaining-* 헤더로 버킷 한도 보정"""
+        def _num(name: str) -> Optional[float]:
+            try:
+                value = headers.get(name)
+                return float(value) if value is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        with self._cond:
+            buckets = self._buckets_for(model)
+            buckets["requests"].sync(
+                _num("x-ratelimit-limit-requests"), _num("x-ratelimit-remaining-requests")
+            )
+            buckets["tokens"].sync(
+                _num("x-ratelimit-limit-tokens"), _num("x-ratelimit-remaining-tokens")
+            )
+            self._cond.notify_all()
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """retry-after / x-ratelimit-reset-* 헤더 우선, 없으면 지수 backoff + jitter"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        hinted = None
+        try:
+            hinted = float(headers.get("retry-after")) if headers.get("retry-after") else None
+        except (TypeError, ValueError):
+            hinted = None
+        if hinted is None:
+            hinted = parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or \
+                parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+
+        backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = backoff * (0.5 + random.random())
+        return max(delay, hinted or 0.0)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+    def call(
+        self,
+        request: Callable[[], Any],
+        model: str,
+        estimated_tokens: int = 0,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Any:
+        """
+        요청 실행 (rate limit 대기 → 호출 → 헤더로 한도 보정, 실패 시 재시도)
+
+        Args:
+            request: with_raw_response로 호출하는 함수 (raw 응답 반환)
+            model: 한도를 구분할 모델명
+            estimated_tokens: 예상 토큰 수 (입력 + max_tokens)
+            priority: PRIORITY_INTERACTIVE 또는 PRIORITY_BACKGROUND
+
+        Returns:
+            파싱된 응답 (raw.parse())
+        """
+        attempt = 0
+        while True:
+            self._acquire(model, estimated_tokens, priority)
+            try:
+                raw = request()
+            except Exception as e:
+                if not self._is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, e)
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                if headers is not None:
+                    self._update_from_headers(model, headers)
+                print(f"[RateLimiter] {model} 재시도 {attempt + 1}/{self.max_retries} ({delay:.1f}s 후): {e}")
+                self._count("retries")
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            self._count("requests")
+            self._update_from_headers(model, raw.headers)
+            return raw.parse()
+
+
+@st.cache_resource
+def get_request_scheduler() -> RequestScheduler:
+    """요청 스케줄러 싱글톤 (앱 프로세스 전체 공유)"""
+    config = get_rate_limit_config()
+    return RequestScheduler(
+        requests_per_minute=int(config["requests_per_minute"]),
+        tokens_per_minute=int(config["tokens_per_minute"]),
+        max_retries=int(config["max_retries"]),
+        backoff_base=float(config["backoff_base"]),
+        backoff_max=float(config["backoff_max"])
+    )
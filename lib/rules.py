@@ -0,0 +1,324 @@
+"""
+믿음루프(FaithLoop) - 규칙 기반 추출 엔진
+체크인 페이지 / 데모 데이터 / 파이프라인 폴백이 공유하는 단일 구현
+- 카테고리별 키워드를 하나의 정규식(alternation)으로 컴파일
+- 줄마다 키워드 목록을 any()로 도는 대신 컴파일된 정규식을 map으로 적용
+- extract_batch: 여러 텍스트의 줄을 모아 한 번에 처리 (백필/데모 시딩용)
+- extract_schema: LLM Extractor와 같은 신앙 기록 스키마로 추출 (규칙 우선 라우팅용)
+"""
+import re
+from itertools import repeat
+from typing import Dict, List, Optional, Iterable, Tuple, Union
+
+import streamlit as st
+from lib.config import get_rules_config
+from lib.prompts import EXTRACTOR_JSON_SCHEMA
+
+
+DEFAULT_OBSTACLE_KEYWORDS = ['문제', '어려움', '힘들', '막혀', '안됨', '실패', '오류', '버그']
+DEFAULT_INSIGHT_KEYWORDS = ['💡', '인사이트', '배움', '깨달음', '발견', '아이디어']
+
+# task: '-', '•', '*'로 시작하는 줄 / obstacle: '!'로 시작하는 줄 (줄 앞 공백 허용, match로 적용)
+_TASK_LINE_RE = re.compile(r'\s*[-•*]')
+_OBSTACLE_LINE_RE = re.compile(r'\s*!')
+_PROJECT_RE = re.compile(r'#(\w+)')
+
+
+# ============================================
+# 신앙 기록 스키마 규칙 (규칙 우선 라우팅)
+# ============================================
+
+# LLM Extractor와 같은 항목 집합 - 라우팅된 체크인도 같은 형태로 저장
+EXTRACTOR_FIELDS = tuple(EXTRACTOR_JSON_SCHEMA["required"])
+
+# 제목 줄 ("1) 오늘 감사:", "기도제목:") → 구역 항목 (앞쪽 키워드 우선)
+_SECTION_RE = re.compile(r'^(?:\d+[).]\s*)?([^:]{1,20}):$')
+DEFAULT_SECTION_KEYWORDS = [
+    ("방해", "obstacles"),
+    ("감사", "gratitudes"),
+    ("기도", "prayer_topics"),
+    ("말씀", "scripture_refs"),
+    ("묵상", "scripture_refs"),
+    ("적용", "commitments"),
+    ("결단", "commitments"),
+    ("공동체", "community_actions"),
+    ("봉사", "community_actions")
+]
+_BRACKET_LINE_RE = re.compile(r'^\[.*\]$')
+_ITEM_PREFIX_RE = re.compile(r'^[-•*→!]+\s*')
+_QUOTE_CHARS = ('"', "'", '“', '‘')
+
+_BIBLE_BOOKS = [
+    "창세기", "출애굽기", "레위기", "민수기", "신명기", "여호수아", "사사기", "룻기",
+    "사무엘상", "사무엘하", "열왕기상", "열왕기하", "역대상", "역대하", "에스라", "느헤미야",
+    "에스더", "욥기", "시편", "잠언", "전도서", "아가", "이사야", "예레미야", "예레미야애가",
+    "에스겔", "다니엘", "호세아", "요엘", "아모스", "오바댜", "요나", "미가", "나훔", "하박국",
+    "스바냐", "학개", "스가랴", "말라기", "마태복음", "마가복음", "누가복음", "요한복음",
+    "사도행전", "로마서", "고린도전서", "고린도후서", "갈라디아서", "에베소서", "빌립보서",
+    "골로새서", "데살로니가전서", "데살로니가후서", "디모데전서", "디모데후서", "디도서",
+    "빌레몬서", "히브리서", "야고보서", "베드로전서", "베드로후서", "요한일서", "요한이서",
+    "요한삼서", "유다서", "요한계시록"
+]
+# "이사야 41:10", "빌립보서 4:6-7", "시편 23편" (장/절 숫자가 있어야 구절로 인식)
+_SCRIPTURE_RE = re.compile(
+    "((?:" + "|".join(sorted(_BIBLE_BOOKS, key=len, reverse=True)) + r")\s*\d+(?:편|장)?(?:\s*:\s*\d+(?:\s*-\s*\d+)?)?)"
+)
+DEFAULT_COMMITMENT_PATTERN = r'^\s*→|결단|다짐|하기로|겠다'
+DEFAULT_COMMUNITY_KEYWORDS = ['예배', '소그룹', '목장', '셀모임', '구역모임', '기도회', '봉사', '교제', '성가대']
+# 구역 밖 줄을 항목에 배정하는 패턴 (앞쪽 항목 우선)
+DEFAULT_UNSECTIONED_PATTERNS = {
+    "gratitudes": r'감사',
+    "prayer_topics": r'기도제목|위해\s*기도|(?:을|를)\s*위해\s*$'
+}
+
+
+def _known_field(field: str, setting: str) -> bool:
+    """설정의 항목 이름이 LLM Extractor 스키마에 있는지 확인 (없으면 경고 후 무시)"""
+    if field in EXTRACTOR_FIELDS:
+        return True
+    print(f"[Rules] {setting}: 알 수 없는 항목 '{field}' 무시")
+    return False
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> Optional["re.Pattern"]:
+    """키워드 목록을 하나의 정규식으로 컴파일 (긴 키워드 우선)"""
+    keywords = sorted({kw for kw in keywords if kw}, key=len, reverse=True)
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+class RuleEngine:
+    """
+    규칙 기반 추출기 (tasks / obstacles / projects / insights, 규칙 우선 라우팅용 신앙 기록 스키마)
+
+    Args:
+        obstacle_keywords: 방해요인 키워드 (None이면 기본값)
+        insight_keywords: 인사이트 키워드 (None이면 기본값)
+        section_keywords: 제목 줄 키워드 → 스키마 항목 ({키워드: 항목} 또는 (키워드, 항목) 목록, None이면 기본값)
+        community_keywords: 공동체 활동 키워드 (None이면 기본값)
+        commitment_pattern: 결단/적용 줄 정규식 (None이면 기본값)
+        unsectioned_patterns: 구역 밖 줄의 스키마 항목 → 정규식 (None이면 기본값)
+    """
+
+    def __init__(
+        self,
+        obstacle_keywords: Optional[List[str]] = None,
+        insight_keywords: Optional[List[str]] = None,
+        section_keywords: Optional[Union[Dict[str, str], List[Tuple[str, str]]]] = None,
+        community_keywords: Optional[List[str]] = None,
+        commitment_pattern: Optional[str] = None,
+        unsectioned_patterns: Optional[Dict[str, str]] = None
+    ):
+        self.obstacle_keywords = list(obstacle_keywords if obstacle_keywords is not None else DEFAULT_OBSTACLE_KEYWORDS)
+        self.insight_keywords = list(insight_keywords if insight_keywords is not None else DEFAULT_INSIGHT_KEYWORDS)
+        self._obstacle_re = _keyword_pattern(self.obstacle_keywords)
+        self._insight_re = _keyword_pattern(self.insight_keywords)
+
+        if section_keywords is None:
+            section_keywords = DEFAULT_SECTION_KEYWORDS
+        elif hasattr(section_keywords, "items"):
+            section_keywords = section_keywords.items()
+        if unsectioned_patterns is None:
+            unsectioned_patterns = DEFAULT_UNSECTIONED_PATTERNS
+        self.section_keywords = [
+            (keyword, field) for keyword, field in section_keywords
+            if _known_field(field, "section_keywords")
+        ]
+        self.community_keywords = list(community_keywords if community_keywords is not None else DEFAULT_COMMUNITY_KEYWORDS)
+        self.commitment_pattern = commitment_pattern if commitment_pattern is not None else DEFAULT_COMMITMENT_PATTERN
+        self.unsectioned_patterns = {
+            field: pattern for field, pattern in unsectioned_patterns.items()
+            if _known_field(field, "unsectioned_patterns")
+        }
+        self._community_re = _keyword_pattern(self.community_keywords)
+        self._commitment_re = re.compile(self.commitment_pattern) if self.commitment_pattern else None
+        self._unsectioned_res = [
+            (field, re.compile(pattern)) for field, pattern in self.unsectioned_patterns.items()
+        ]
+
+    def extract_batch(self, contents: List[str]) -> List[Dict[str, List[str]]]:
+        """
+        여러 텍스트를 한 번에 추출 (모든 줄에 컴파일된 정규식을 C 레벨 map으로 적용)
+
+        Args:
+            contents: 체크인 내용 텍스트 리스트
+
+        Returns:
+            텍스트별 추출 결과 리스트 (입력 순서 유지)
+        """
+        lines: List[str] = []
+        owners: List[int] = []
+        for i, content in enumerate(contents):
+            content_lines = (content or "").strip().split('\n')
+            lines.extend(content_lines)
+            owners.extend([i] * len(content_lines))
+
+        no_match = repeat(None)
+        rows = zip(
+            range(len(lines)),
+            map(_TASK_LINE_RE.match, lines),
+            map(_OBSTACLE_LINE_RE.match, lines),
+            map(self._obstacle_re.search, lines) if self._obstacle_re else no_match,
+            map(self._insight_re.search, lines) if self._insight_re else no_match,
+            map(_PROJECT_RE.findall, lines)
+        )
+
+        results = [
+            {"tasks": [], "obstacles": [], "projects": [], "insights": [], "people": [], "emotions": []}
+            for _ in contents
+        ]
+
+        for index, task, bang, obstacle, insight, projects in rows:
+            if not (task or bang or obstacle or insight or projects):
+                continue
+            result = results[owners[index]]
+            line = lines[index].strip()
+            if task:
+                task_text = line.lstrip('-•* ').strip()
+                if task_text:
+                    result["tasks"].append(task_text)
+            if bang or obstacle:
+                obstacle_text = line.lstrip('! ').strip()
+                if obstacle_text and obstacle_text not in result["obstacles"]:
+                    result["obstacles"].append(obstacle_text)
+            for project in projects:
+                if project not in result["projects"]:
+                    result["projects"].append(project)
+            if insight and line not in result["insights"]:
+                result["insights"].append(line)
+
+        return results
+
+    def extract(self, content: str) -> Dict[str, List[str]]:
+        """텍스트 1건 추출"""
+        return self.extract_batch([content])[0]
+
+    def _section_field(self, title: str) -> Optional[str]:
+        """제목 줄 텍스트 → 스키마 항목 (해당 없으면 None: 이후 줄은 키워드로만 배정)"""
+        for keyword, field in self.section_keywords:
+            if keyword in title:
+                return field
+        return None
+
+    def extract_schema(self, content: str) -> Tuple[Dict[str, List[str]], float]:
+        """
+        규칙 우선 라우팅용: LLM Extractor와 같은 스키마(EXTRACTOR_JSON_SCHEMA)로 추출
+        - "1) 오늘 감사:" 같은 제목 줄로 구역을 정하고, 구역 안의 줄을 해당 항목에 배정
+        - 구역 밖 줄은 키워드(감사/위해/방해 키워드)로만 배정
+        - 말씀 구절 / '→'·결단 표현 / 공동체 활동은 구역과 무관하게 추가로 인식
+
+        Args:
+            content: 체크인 내용 텍스트
+
+        Returns:
+            (추출 결과, 신뢰도) - 신뢰도(0~1)는 다음 신호의 가중 합
+            - 배정률 (0.7): 본문 줄 중 스키마 항목에 배정된 줄의 비율
+            - 형식 (0.2): 글머리표 / 제목 줄 구역 / #태그가 있는 줄의 비율
+            - 키워드 밀도 (0.1): 구절·결단·공동체·감사·기도 키워드가 걸린 줄의 비율
+        """
+        result = {field: [] for field in EXTRACTOR_FIELDS}
+        section = None
+        body_lines = 0
+        covered_lines = 0
+        formatted_lines = 0
+        keyword_lines = 0
+
+        def add(field: str, item: str):
+            if item and item not in result[field]:
+                result[field].append(item)
+
+        for raw_line in (content or "").strip().split('\n'):
+            line = raw_line.strip()
+            if not line or _BRACKET_LINE_RE.match(line):
+                continue
+            heading = _SECTION_RE.match(line)
+            if heading:
+                section = self._section_field(heading.group(1))
+                continue
+
+            body_lines += 1
+            text = _ITEM_PREFIX_RE.sub('', line).strip()
+            covered = False
+            formatted_lines += bool(section or text != line or _PROJECT_RE.search(line))
+
+            refs = _SCRIPTURE_RE.findall(line)
+            for ref in refs:
+                add("scripture_refs", re.sub(r'\s+', ' ', ref))
+            if refs or (section == "scripture_refs" and line[:1] in _QUOTE_CHARS):
+                # 구절 본문 인용 줄은 구절 참조에 포함된 것으로 봄
+                covered = True
+            keyword_hit = bool(refs)
+
+            if self._commitment_re and self._commitment_re.search(line):
+                add("commitments", text)
+                covered = keyword_hit = True
+            elif section and section != "scripture_refs":
+                add(section, text)
+                covered = True
+            elif section is None:
+                for field, pattern in self._unsectioned_res:
+                    if pattern.search(line):
+                        add(field, text)
+                        covered = keyword_hit = True
+                        break
+                if not covered and (_OBSTACLE_LINE_RE.match(raw_line) or
+                                    (self._obstacle_re and self._obstacle_re.search(line))):
+                    add("obstacles", line.lstrip('! ').strip())
+                    covered = keyword_hit = True
+
+            if self._community_re and self._community_re.search(line):
+                add("community_actions", text)
+                keyword_hit = True
+
+            covered_lines += covered
+            keyword_lines += keyword_hit
+
+        if not body_lines or not any(result.values()):
+            return result, 0.0
+        confidence = (
+            0.7 * covered_lines / body_lines
+            + 0.2 * formatted_lines / body_lines
+            + 0.1 * keyword_lines / body_lines
+        )
+        return result, round(confidence, 3)
+
+
+@st.cache_resource
+def get_rule_engine() -> RuleEngine:
+    """규칙 엔진 싱글톤 ([rules] 설정의 키워드/패턴 반영)"""
+    config = get_rules_config()
+    return RuleEngine(
+        obstacle_keywords=config.get("obstacle_keywords"),
+        insight_keywords=config.get("insight_keywords"),
+        section_keywords=config.get("section_keywords"),
+        community_keywords=config.get("community_keywords"),
+        commitment_pattern=config.get("commitment_pattern"),
+        unsectioned_patterns=config.get("unsectioned_patterns")
+    )
+
+
+def extract_by_rules(content: str) -> Dict[str, List[str]]:
+    """
+    규칙 기반으로 텍스트에서 구조화된 정보 추출
+
+    Args:
+        content: 체크인 내용 텍스트
+
+    Returns:
+        추출된 정보 딕셔너리 (tasks, obstacles, projects, insights, people, emotions)
+    """
+    return get_rule_engine().extract(content)
+
+
+def extract_schema_by_rules(content: str) -> Tuple[Dict[str, List[str]], float]:
+    """
+    규칙 기반으로 LLM Extractor 스키마(EXTRACTOR_JSON_SCHEMA) 항목 추출
+
+    Args:
+        content: 체크인 내용 텍스트
+
+    Returns:
+        (추출 결과, 신뢰도) - 스키마 항목에 배정되지 않은 본문 줄이 있으면 신뢰도가 낮아짐
+    """
+    return get_rule_engine().extract_schema(content)
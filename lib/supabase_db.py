@@ -2,7 +2,7 @@
 ReflectOS - Supabase DB CRUD 헬퍼
 각 테이블별 기본 CRUD 함수 제공
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 import streamlit as st
 from lib.config import get_supabase_client, get_current_user_id
@@ -190,7 +190,7 @@ def insert_extraction(
     Args:
         source_type: 소스 타입 ('checkin', 'artifact', 'calendar')
         source_id: 소스 레코드 ID
-        extraction_type: 추출 타입 ('rule_based', 'llm_extractor', 'keywords' 등)
+        extraction_type: 추출 타입 ('rule_based', 'rule_first', 'llm_extractor', 'llm_fused', 'keywords' 등)
         data: 추출된 데이터 (JSON)
         user_id: 사용자 ID
         created_at: 생성 시간 (옵션, 없으면 현재 시간)
@@ -234,6 +234,41 @@ def get_extractions_by_source(source_type: str, source_id: str) -> List[Dict]:
         return []
 
 
+# in.(...) 필터 1회당 ID 수 (UUID 100개 ≈ 3.8KB, URL 길이 제한 이내)
+EXTRACTION_FETCH_CHUNK_SIZE = 100
+
+
+def get_extractions_for_sources(source_type: str, source_ids: List[str]) -> List[Dict]:
+    """
+    여러 소스의 extraction을 한 번에 조회 (소스마다 select하는 왕복 제거)
+
+    Args:
+        source_type: 소스 타입 ('checkin', 'artifact', 'calendar')
+        source_ids: 소스 레코드 ID 리스트 (URL 길이 때문에 청크 단위로 in_ 조회)
+
+    Returns:
+        extraction 레코드 리스트 (청크 내 created_at 오름차순)
+    """
+    try:
+        client = _get_client()
+        ids = list(dict.fromkeys(source_ids))
+        rows = []
+        for start in range(0, len(ids), EXTRACTION_FETCH_CHUNK_SIZE):
+            response = (
+                client.table("extractions")
+                .select("*")
+                .eq("source_type", source_type)
+                .in_("source_id", ids[start:start + EXTRACTION_FETCH_CHUNK_SIZE])
+                .order("created_at")
+                .execute()
+            )
+            rows.extend(response.data or [])
+        return rows
+    except Exception as e:
+        st.error(f"Extraction 조회 실패: {e}")
+        return []
+
+
 # ============================================
 # artifacts 테이블 (멀티모달 첨부파일)
 # ============================================
@@ -384,6 +419,177 @@ def insert_plan_block(
         return None
 
 
+# ============================================
+# jobs 테이블 (백그라운드 작업 큐)
+# ============================================
+
+def enqueue_job(
+    job_type: str,
+    payload: Dict,
+    user_id: str = None,
+    max_attempts: int = 5
+) -> Optional[Dict]:
+    """
+    백그라운드 작업 등록 (처리는 python -m lib.worker)
+    
+    Args:
+        job_type: 작업 타입 ('index_checkin')
+        payload: 작업 입력 (JSON)
+        user_id: 사용자 ID
+        max_attempts: 최대 시도 횟수
+    
+    Returns:
+        등록된 job 레코드
+    """
+    try:
+        client = _get_client()
+        user_id = user_id or _get_user_id()
+        
+        data = {
+            "user_id": user_id,
+            "job_type": job_type,
+            "payload": payload,
+            "max_attempts": max_attempts
+        }
+        
+        response = client.table("jobs").insert(data).execute()
+        return response.data[0] if response.data else None
+    except Exception as e:
+        st.error(f"작업 등록 실패: {e}")
+        return None
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """작업 상태 조회"""
+    try:
+        client = _get_client()
+        response = (
+            client.table("jobs")
+            .select("id, job_type, status, attempts, max_attempts, last_error, created_at, updated_at")
+            .eq("id", job_id)
+            .single()
+            .execute()
+        )
+        return response.data
+    except Exception as e:
+        return None
+
+
+# ============================================
+# weekly_reports 테이블 (저장된 주간 리포트)
+# ============================================
+
+def get_weekly_report(
+    start_date: str,
+    end_date: str,
+    exclude_demo: bool = True,
+    user_id: str = None
+) -> Optional[Dict]:
+    """
+    저장된 주간 리포트 조회 (유니크 키 인덱스 1회 읽기)
+    
+    Args:
+        start_date: 시작일 (YYYY-MM-DD)
+        end_date: 종료일 (YYYY-MM-DD)
+        exclude_demo: 데모 데이터 제외 여부 (리포트 키의 일부)
+        user_id: 사용자 ID
+    
+    Returns:
+        weekly_reports 레코드 (없으면 None)
+    """
+    try:
+        client = _get_client()
+        user_id = user_id or _get_user_id()
+        
+        response = (
+            client.table("weekly_reports")
+            .select("*")
+            .eq("user_id", user_id)
+            .eq("start_date", start_date)
+            .eq("end_date", end_date)
+            .eq("exclude_demo", exclude_demo)
+            .limit(1)
+            .execute()
+        )
+        return response.data[0] if response.data else None
+    except Exception as e:
+        return None
+
+
+def upsert_weekly_report(
+    start_date: str,
+    end_date: str,
+    exclude_demo: bool,
+    report: Dict,
+    input_hash: str,
+    source_checkins: List[Dict] = None,
+    user_id: str = None
+) -> Optional[Dict]:
+    """
+    주간 리포트 저장 (같은 기간/데모 설정이면 덮어씀)
+    
+    Args:
+        start_date: 시작일 (YYYY-MM-DD)
+        end_date: 종료일 (YYYY-MM-DD)
+        exclude_demo: 데모 데이터 제외 여부
+        report: generate_weekly_report_json 결과
+        input_hash: 입력 체크인/추출 해시 (utils.report_input_hash)
+        source_checkins: 근거 표시용 체크인 요약
+        user_id: 사용자 ID
+    
+    Returns:
+        저장된 weekly_reports 레코드
+    """
+    try:
+        client = _get_client()
+        user_id = user_id or _get_user_id()
+        
+        data = {
+            "user_id": user_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "exclude_demo": exclude_demo,
+            "report": report,
+            "source_checkins": source_checkins or [],
+            "input_hash": input_hash
+        }
+        
+        response = (
+            client.table("weekly_reports")
+            .upsert(data, on_conflict="user_id,start_date,end_date,exclude_demo")
+            .execute()
+        )
+        return response.data[0] if response.data else None
+    except Exception as e:
+        st.error(f"주간 리포트 저장 실패: {e}")
+        return None
+
+
+# ============================================
+# ai_logs 통계 (관리자)
+# ============================================
+
+def get_ai_log_stats(days: int = 7) -> Optional[List[Dict]]:
+    """
+    action별 AI 호출 통계 (ai_log_stats RPC, 관리자 전용 - 권한 검사는 RPC가 수행)
+    
+    Args:
+        days: 최근 며칠
+    
+    Returns:
+        [{action, calls, errors, cache_hits, p50_ms, p95_ms, input_tokens, output_tokens, routed}]
+        (관리자가 아니거나 조회 실패 시 None - 빈 결과와 구분)
+    """
+    try:
+        client = _get_client()
+        since = (datetime.utcnow() - timedelta(days=days)).isoformat()
+        response = client.rpc("ai_log_stats", {"since": since}).execute()
+        return response.data or []
+    except Exception as e:
+        print(f"[AIUsage] ai_log_stats 조회 실패: {e}")
+        return None
+
+
 # ============================================
 # memory_chunks 테이블 (RAG용)
 # ============================================
@@ -3,8 +3,11 @@ ReflectOS - Supabase Storage 헬퍼
 이미지/오디오 파일 업로드 및 관리
 """
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from lib.config import get_supabase_client, get_current_user_id
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import Optional
+import threading
 import uuid
 from datetime import datetime
 
@@ -69,6 +72,38 @@ def upload_file(
         return None
 
 
+@st.cache_resource
+def _get_upload_executor() -> ThreadPoolExecutor:
+    """백그라운드 업로드용 스레드 풀 (앱 프로세스 공유)"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="storage-upload")
+
+
+def upload_file_async(
+    file_data: bytes,
+    file_name: str,
+    content_type: str,
+    folder: str = "uploads"
+) -> Future:
+    """
+    파일 업로드를 백그라운드로 시작 (AI 요청 등과 동시에 진행)
+    
+    Args:
+        upload_file과 동일
+    
+    Returns:
+        Future - result()가 storage_path (실패 시 None)
+    """
+    ctx = get_script_run_ctx()
+    
+    def _upload():
+        # 세션 컨텍스트를 붙여야 get_current_user_id / st.error 사용 가능
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return upload_file(file_data, file_name, content_type, folder)
+    
+    return _get_upload_executor().submit(_upload)
+
+
 def get_public_url(storage_path: str) -> Optional[str]:
     """
     파일의 공개 URL 반환
@@ -4,6 +4,8 @@ ReflectOS - 유틸리티 함수
 """
 from datetime import datetime, timedelta
 from typing import List, Optional
+import hashlib
+import json
 import re
 
 # 데모 데이터 구분 태그 상수
@@ -57,6 +59,29 @@ def estimate_tokens(text: str) -> int:
     return int(korean_chars * 1.5 + english_words * 1.3 + len(text) * 0.1)
 
 
+def content_hash(text: str) -> str:
+    """텍스트 sha256 hex (DB의 encode(sha256(convert_to(content, 'UTF8')), 'hex')와 동일)"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def report_input_hash(checkins: List[dict], extractions: List[dict]) -> str:
+    """
+    주간 리포트 입력 해시 (리포트에 쓰이는 필드만, ID 순 정렬 → 조회 순서와 무관)
+    체크인 내용/기분/태그/날짜나 추출 데이터가 바뀌거나 기록이 추가/삭제되면 값이 달라짐
+    """
+    payload = {
+        "checkins": sorted(
+            [c.get("id"), c.get("created_at"), c.get("mood"), c.get("content"), c.get("tags")]
+            for c in checkins
+        ),
+        "extractions": sorted(
+            [e.get("id"), e.get("source_id"), e.get("data")]
+            for e in extractions
+        )
+    }
+    return content_hash(json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str))
+
+
 def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
     """텍스트를 지정 길이로 자르기"""
     if len(text) <= max_length:
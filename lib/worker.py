@@ -0,0 +1,180 @@
+"""
+믿음루프(FaithLoop) - 백그라운드 작업 워커
+jobs 테이블을 폴링하여 자동 인덱싱 등 느린 작업을 요청 경로 밖에서 처리
+
+사용법:
+    python -m lib.worker                 # 계속 실행 (폴링)
+    python -m lib.worker --once          # 현재 대기 작업만 처리 후 종료
+
+필수 조건:
+    - .streamlit/secrets.toml의 [supabase] service_role_key (RLS 우회)
+    - OpenAI API 키 (임베딩 생성)
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Callable, Optional
+
+from lib.config import get_supabase_client, get_supabase_service_key, use_service_role
+
+
+# 재시도 backoff (초): BASE * 2^(attempts-1), 최대 MAX, ±50% jitter
+RETRY_BACKOFF_BASE = 5
+RETRY_BACKOFF_MAX = 600
+
+# 작업 선점 후 이 시간(초) 안에 끝나지 않으면 죽은 워커로 보고 다시 선점
+LOCK_TIMEOUT_SECONDS = 600
+
+
+# ============================================
+# 작업 핸들러
+# ============================================
+
+def _handle_index_checkin(job: Dict) -> bool:
+    """
+    체크인 자동 인덱싱 (Checkin 페이지 저장 시 등록)
+
+    payload: {checkin_id, content, extractions, extraction_type}
+    """
+    from lib.rag import index_checkin, index_extraction
+
+    payload = job.get("payload") or {}
+    user_id = job["user_id"]
+    checkin_id = payload["checkin_id"]
+    extractions = payload.get("extractions") or {}
+
+    ok_checkin = index_checkin(checkin_id, payload.get("content", ""), extractions, user_id=user_id)
+
+    ok_extraction = True
+    if extractions and any(extractions.values()):
+        ok_extraction = index_extraction(
+            checkin_id, payload.get("extraction_type", "rule_based"), extractions, user_id=user_id
+        )
+
+    return ok_checkin and ok_extraction
+
+
+JOB_HANDLERS: Dict[str, Callable[[Dict], bool]] = {
+    "index_checkin": _handle_index_checkin,
+}
+
+
+# ============================================
+# 큐 처리
+# ============================================
+
+def retry_delay(attempts: int) -> float:
+    """지수 backoff + jitter (동시에 실패한 작업들이 한꺼번에 재시도하지 않도록)"""
+    delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * (0.5 + random.random())
+
+
+def claim_jobs(client, worker_id: str, batch_size: int) -> list:
+    """claim_jobs RPC로 작업 선점 (FOR UPDATE SKIP LOCKED)"""
+    response = client.rpc("claim_jobs", {
+        "worker_id": worker_id,
+        "batch_size": batch_size,
+        "lock_timeout_seconds": LOCK_TIMEOUT_SECONDS
+    }).execute()
+    return response.data or []
+
+
+def _finish_job(client, job: Dict, error: Optional[str] = None):
+    """작업 결과 기록 (실패 시 backoff 후 pending으로 되돌리거나 failed 처리)"""
+    if error is None:
+        update = {"status": "done", "last_error": None, "locked_at": None, "locked_by": None}
+    elif job["attempts"] >= job["max_attempts"]:
+        update = {"status": "failed", "last_error": error, "locked_at": None, "locked_by": None}
+    else:
+        run_after = datetime.utcnow() + timedelta(seconds=retry_delay(job["attempts"]))
+        update = {
+            "status": "pending",
+            "last_error": error,
+            "run_after": run_after.isoformat(),
+            "locked_at": None,
+            "locked_by": None
+        }
+    client.table("jobs").update(update).eq("id", job["id"]).execute()
+
+
+def process_job(client, job: Dict) -> bool:
+    """
+    작업 1건 실행
+
+    Returns:
+        성공 여부
+    """
+    handler = JOB_HANDLERS.get(job["job_type"])
+    error = None
+    if handler is None:
+        error = f"알 수 없는 작업 타입: {job['job_type']}"
+        job = {**job, "attempts": job["max_attempts"]}  # 재시도 무의미
+    else:
+        try:
+            if not handler(job):
+                error = "작업 처리 실패 (일부 단계 실패)"
+        except Exception as e:
+            error = str(e)
+
+    _finish_job(client, job, error)
+    return error is None
+
+
+def run_once(client, worker_id: str, batch_size: int = 5) -> int:
+    """
+    대기 작업을 한 번 선점하여 처리
+
+    Returns:
+        처리한 작업 수
+    """
+    jobs = claim_jobs(client, worker_id, batch_size)
+    for job in jobs:
+        ok = process_job(client, job)
+        status = "done" if ok else f"retry/failed (attempt {job['attempts']}/{job['max_attempts']})"
+        print(f"[worker] {job['job_type']} {job['id']}: {status}")
+    return len(jobs)
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="믿음루프 백그라운드 작업 워커")
+    parser.add_argument("--once", action="store_true", help="대기 작업만 처리하고 종료")
+    parser.add_argument("--batch-size", type=int, default=5, help="한 번에 선점할 작업 수")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="대기 작업이 없을 때 폴링 간격(초)")
+    args = parser.parse_args()
+
+    if not get_supabase_service_key():
+        print("❌ 오류: [supabase] service_role_key가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    use_service_role()
+    client = get_supabase_client()
+    if not client:
+        print("❌ 오류: Supabase 클라이언트를 초기화할 수 없습니다.")
+        sys.exit(1)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"🔧 워커 시작: {worker_id}")
+
+    try:
+        while True:
+            try:
+                processed = run_once(client, worker_id, args.batch_size)
+            except Exception as e:
+                print(f"[worker] 큐 조회 실패: {e}")
+                processed = 0
+
+            if args.once and processed == 0:
+                break
+            if processed == 0:
+                time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        print("👋 워커 종료")
+
+
+if __name__ == "__main__":
+    main()
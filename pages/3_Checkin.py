@@ -7,11 +7,6 @@ Step 4: 음성 STT
 Step 5: 이미지 Vision
 """
 import streamlit as st
-import re
-from typing import Dict, List, Optional
-from datetime import datetime
-import tempfile
-import os
 
 st.set_page_config(page_title="오늘의 기록 - 믿음루프", page_icon="✍️", layout="wide")
 
@@ -30,57 +25,8 @@ if "auto_index_on_save" not in st.session_state:
     st.session_state["auto_index_on_save"] = bool(_settings.get("auto_index_on_save", False))
 
 
-# === 규칙 기반 Extraction (폴백용) ===
-def extract_by_rules(content: str) -> Dict[str, List[str]]:
-    """
-    규칙 기반으로 텍스트에서 구조화된 정보 추출
-    """
-    lines = content.strip().split('\n')
-    
-    tasks = []
-    obstacles = []
-    projects = []
-    insights = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # task: '-' 또는 '•'로 시작하는 줄
-        if line.startswith('-') or line.startswith('•') or line.startswith('*'):
-            task_text = line.lstrip('-•* ').strip()
-            if task_text:
-                tasks.append(task_text)
-        
-        # obstacle: '!' 시작 또는 부정적 키워드 포함
-        obstacle_keywords = ['문제', '어려움', '힘들', '막혀', '안됨', '실패', '오류', '버그']
-        if line.startswith('!') or any(kw in line for kw in obstacle_keywords):
-            obstacle_text = line.lstrip('! ').strip()
-            if obstacle_text and obstacle_text not in obstacles:
-                obstacles.append(obstacle_text)
-        
-        # project: '#프로젝트명' 형태
-        project_matches = re.findall(r'#(\w+)', line)
-        for proj in project_matches:
-            if proj not in projects:
-                projects.append(proj)
-        
-        # insight: 인사이트 키워드 포함
-        insight_keywords = ['💡', '인사이트', '배움', '깨달음', '발견', '아이디어']
-        if any(kw in line for kw in insight_keywords):
-            insight_text = line.strip()
-            if insight_text and insight_text not in insights:
-                insights.append(insight_text)
-    
-    return {
-        "tasks": tasks,
-        "obstacles": obstacles,
-        "projects": projects,
-        "insights": insights,
-        "people": [],
-        "emotions": []
-    }
+# === 규칙 기반 Extraction (폴백용, lib.rules 공용 엔진) ===
+from lib.rules import extract_by_rules
 
 
 st.title("✍️ 오늘의 기록")
@@ -104,6 +50,18 @@ with st.sidebar:
     )
     
     if use_ai_extraction:
+        analysis_mode = st.radio(
+            "분석 모드",
+            options=["단계별", "통합"],
+            horizontal=True,
+            help="단계별: 정리/추출/코멘트를 각각 호출 · 통합: 한 번의 호출로 모두 처리 (더 빠르고 저렴)"
+        )
+        from lib.config import get_extraction_config
+        use_rule_first = st.checkbox(
+            "규칙 우선 추출",
+            value=get_extraction_config()["routing"] == "rule_first",
+            help="감사/기도제목/말씀/방해요인 구역으로 잘 정리된 짧은 체크인은 LLM 추출 없이 규칙으로 처리"
+        )
         use_ingestor = st.checkbox(
             "텍스트 정리 (Ingestor)",
             value=False,
@@ -114,12 +72,39 @@ with st.sidebar:
             value=True,
             help="체크인에 대한 짧은 AI 코멘트"
         )
+        use_reflection_context = st.checkbox(
+            "과거 기록 참고",
+            value=True,
+            disabled=not generate_reflection,
+            help="인덱싱된 과거 기록을 검색하여 AI 코멘트에 반영"
+        )
     else:
+        use_rule_first = False
         use_ingestor = False
         generate_reflection = False
+        use_reflection_context = False
     
     st.divider()
     st.caption("💡 LLM 미사용 시 규칙 기반으로 추출")
+    
+    # 마지막 자동 인덱싱 작업 상태
+    if st.session_state.get("last_index_job_id"):
+        from lib.supabase_db import get_job
+        _job = get_job(st.session_state["last_index_job_id"])
+        if _job:
+            _job_labels = {
+                "pending": "⏳ 대기 중",
+                "running": "🔄 처리 중",
+                "done": "✅ 완료",
+                "failed": "❌ 실패"
+            }
+            st.caption(f"🧠 자동 인덱싱: {_job_labels.get(_job['status'], _job['status'])}")
+            if _job["status"] == "pending" and _job.get("last_error"):
+                st.caption(f"재시도 예정 ({_job['attempts']}/{_job['max_attempts']}): {_job['last_error']}")
+            elif _job["status"] == "failed":
+                st.caption(f"오류: {_job.get('last_error')}")
+            if _job["status"] in ("pending", "running"):
+                st.button("🔄 상태 새로고침", key="refresh_index_job")
 
 
 st.divider()
@@ -214,27 +199,23 @@ with st.form("checkin_form"):
             if use_ai_extraction:
                 with st.spinner("🤖 AI가 분석 중..."):
                     try:
-                        from lib.openai_client import (
-                            ingest_text, 
-                            extract_structured_data,
-                            generate_reflection as gen_reflection
-                        )
-                        
-                        # Ingestor (선택적)
-                        if use_ingestor:
-                            ingested = ingest_text(combined_content)
-                            if ingested:
-                                clean_text = ingested
-                        
-                        # Extractor (Structured Outputs)
-                        llm_extractions = extract_structured_data(clean_text)
-                        if llm_extractions:
-                            extractions = llm_extractions
-                            extraction_type = "llm_extractor"
+                        from lib.openai_client import run_checkin_pipeline
+                        from lib.rag import get_reflection_context
                         
-                        # Reflector (선택적)
-                        if generate_reflection:
-                            ai_reflection = gen_reflection(clean_text)
+                        # Ingestor → (Extractor ∥ Reflector), 과거 기록 조회는 Ingestor와 동시 진행
+                        pipeline = run_checkin_pipeline(
+                            combined_content,
+                            use_ingestor=use_ingestor,
+                            use_reflection=generate_reflection,
+                            context_lookup=get_reflection_context if use_reflection_context else None,
+                            fallback_extractor=extract_by_rules,
+                            fused=(analysis_mode == "통합"),
+                            rule_first=use_rule_first
+                        )
+                        clean_text = pipeline["clean_text"]
+                        extractions = pipeline["extractions"]
+                        extraction_type = pipeline["extraction_type"]
+                        ai_reflection = pipeline["reflection"]
                         
                     except ImportError as e:
                         st.warning(f"⚠️ OpenAI 모듈 로드 실패: {e}")
@@ -291,32 +272,25 @@ with st.form("checkin_form"):
                     st.balloons()
                     
                     # === 자동 인덱싱 (토글 ON일 때만) ===
+                    # 저장 경로에서는 작업만 등록, 임베딩/DB 쓰기는 워커(python -m lib.worker)가 처리
                     if st.session_state.get("auto_index_on_save", False):
-                        from lib.config import get_openai_api_key
-                        if not get_openai_api_key():
-                            st.warning("⚠️ OpenAI API 키가 없어 자동 인덱싱을 건너뜁니다.")
+                        from lib.supabase_db import enqueue_job
+                        job = enqueue_job(
+                            job_type="index_checkin",
+                            payload={
+                                # checkin 인덱싱: clean_text 우선(멀티모달/ingestor 반영)
+                                "checkin_id": checkin_id,
+                                "content": clean_text,
+                                "extractions": extractions,
+                                "extraction_type": extraction_type
+                            },
+                            user_id=user_id
+                        )
+                        if job:
+                            st.session_state["last_index_job_id"] = job.get("id")
+                            st.info("🧠 자동 인덱싱 작업이 등록되었습니다 (잠시 후 Memory에서 검색 가능)")
                         else:
-                            with st.spinner("🧠 자동 인덱싱 중..."):
-                                try:
-                                    from lib.rag import index_checkin, index_extraction
-                                    
-                                    # checkin 인덱싱: clean_text 우선(멀티모달/ingestor 반영)
-                                    ok_checkin = index_checkin(checkin_id, clean_text, extractions)
-                                    
-                                    # extraction 인덱싱: 추출값이 비어있지 않을 때만
-                                    ok_extraction = True
-                                    try:
-                                        if extractions and any(extractions.values()):
-                                            ok_extraction = index_extraction(checkin_id, extraction_type, extractions)
-                                    except Exception:
-                                        ok_extraction = False
-                                    
-                                    if ok_checkin and ok_extraction:
-                                        st.info("✅ 자동 인덱싱 완료 (Memory에서 즉시 검색 가능)")
-                                    else:
-                                        st.warning("⚠️ 자동 인덱싱 일부 실패 (체크인은 저장됨). 필요시 Memory에서 수동 동기화하세요.")
-                                except Exception as e:
-                                    st.warning(f"⚠️ 자동 인덱싱 오류 (체크인은 저장됨): {e}")
+                            st.warning("⚠️ 자동 인덱싱 작업 등록 실패 (체크인은 저장됨). 필요시 Memory에서 수동 동기화하세요.")
                     
                     # 세션 상태 초기화
                     st.session_state.transcribed_text = ""
@@ -416,60 +390,66 @@ with tab_audio:
         # 오디오 미리보기
         st.audio(audio_file, format=f"audio/{audio_file.type.split('/')[-1] if audio_file.type else 'mpeg'}")
         
+        from lib.config import get_media_config
+        keep_original_audio = st.checkbox(
+            "원본 파일도 보관",
+            value=bool(get_media_config()["keep_original_audio"]),
+            key="keep_original_audio",
+            help="기본적으로 모노 16kHz로 압축한 파일만 저장합니다"
+        )
+        
         if st.button("🎯 음성 → 텍스트 변환", key="transcribe_btn"):
             with st.spinner("🔄 음성을 텍스트로 변환 중..."):
                 try:
                     from lib.openai_client import get_openai_client
-                    from lib.supabase_storage import upload_file
+                    from lib.supabase_storage import upload_file_async
+                    from lib.media import AUDIO_CONTENT_TYPES, preprocess_audio
                     
                     # 파일 정보 추출
                     file_name = audio_file.name
                     file_ext = file_name.split('.')[-1].lower() if '.' in file_name else 'mp3'
-                    audio_bytes = audio_file.getvalue()
+                    audio_bytes = audio_file.getvalue()  # 업로드 버퍼 그대로 사용 (임시 파일 없음)
+                    content_type = audio_file.type or AUDIO_CONTENT_TYPES.get(file_ext, 'audio/mpeg')
                     
-                    # MIME type 매핑
-                    mime_type_map = {
-                        'mp3': 'audio/mpeg',
-                        'm4a': 'audio/m4a',
-                        'wav': 'audio/wav',
-                        'ogg': 'audio/ogg',
-                        'webm': 'audio/webm',
-                        'flac': 'audio/flac'
-                    }
-                    content_type = audio_file.type or mime_type_map.get(file_ext, 'audio/mpeg')
+                    # 0. 전처리 (모노 16kHz 저비트레이트, 실패 시 원본 사용)
+                    processed = preprocess_audio(audio_bytes, file_ext)
+                    original_upload = None
+                    duration = None
+                    duration_ms = None
+                    if processed:
+                        if keep_original_audio:
+                            original_upload = upload_file_async(
+                                file_data=audio_bytes,
+                                file_name=file_name,
+                                content_type=content_type,
+                                folder="audio-files"
+                            )
+                        audio_bytes = processed["data"]
+                        file_ext = processed["ext"]
+                        content_type = processed["content_type"]
+                        duration_ms = processed["duration_ms"]
+                        duration = round(duration_ms / 1000, 1)
                     
-                    # 1. Supabase Storage에 업로드
-                    storage_path = upload_file(
+                    # 1. Supabase Storage 업로드는 백그라운드로 시작 (전사와 같은 버퍼 사용)
+                    upload_future = upload_file_async(
                         file_data=audio_bytes,
-                        file_name=file_name,
+                        file_name=f"{file_name.rsplit('.', 1)[0]}.{file_ext}",
                         content_type=content_type,
                         folder="audio-files"
                     )
                     
-                    # 2. OpenAI Whisper로 전사 (tempfile 사용하여 실제 파일로 저장 후 전달)
+                    # 2. OpenAI Whisper로 전사 (긴 녹음은 침묵 기준으로 나눠 동시 전사)
                     client = get_openai_client()
                     transcribed = None
                     if not client:
                         st.error("OpenAI API 키가 설정되지 않았습니다.")
                     else:
-                        # 임시 파일 생성 (확장자 포함)
-                        with tempfile.NamedTemporaryFile(suffix=f'.{file_ext}', delete=False) as tmp_file:
-                            tmp_file.write(audio_bytes)
-                            tmp_path = tmp_file.name
-                        
-                        try:
-                            # 임시 파일을 열어서 OpenAI API에 전달
-                            with open(tmp_path, 'rb') as audio_file:
-                                response = client.audio.transcriptions.create(
-                                    model="whisper-1",
-                                    file=audio_file,
-                                    language="ko"
-                                )
-                                transcribed = response.text
-                        finally:
-                            # 임시 파일 삭제
-                            if os.path.exists(tmp_path):
-                                os.remove(tmp_path)
+                        from lib.openai_client import transcribe_audio_long
+                        transcribed = transcribe_audio_long(
+                            audio_bytes, file_ext=file_ext, language="ko", duration_ms=duration_ms
+                        )
+                    storage_path = upload_future.result()
+                    original_storage_path = original_upload.result() if original_upload else None
                     
                     if transcribed:
                         st.session_state.transcribed_text = transcribed
@@ -478,11 +458,13 @@ with tab_audio:
                         st.session_state.uploaded_artifacts.append({
                             "type": "audio",
                             "storage_path": storage_path,
-                            "original_name": audio_file.name,
+                            "original_name": file_name,
                             "file_size": len(audio_bytes),
                             "metadata": {
                                 "transcription": transcribed,
-                                "duration": None
+                                "duration": duration,
+                                "original_storage_path": original_storage_path,
+                                "original_size": processed["original_size"] if processed else len(audio_bytes)
                             }
                         })
                         
@@ -538,23 +520,36 @@ with tab_image:
             with st.spinner("🔄 이미지 분석 중..."):
                 try:
                     from lib.openai_client import analyze_image
-                    from lib.supabase_storage import upload_file
-                    import base64
+                    from lib.supabase_storage import upload_file_async
+                    from lib.media import prepare_image, image_data_url
                     
-                    # 1. Supabase Storage에 업로드
                     file_bytes = image_file.getvalue()
+                    file_name = image_file.name
                     content_type = image_file.type or "image/jpeg"
                     
-                    storage_path = upload_file(
+                    # 0. 전처리 (Vision 유효 해상도로 축소 + EXIF 제거, 실패 시 원본 사용)
+                    prepared = prepare_image(file_bytes)
+                    image_meta = {}
+                    if prepared:
+                        file_bytes = prepared["data"]
+                        file_name = f"{file_name.rsplit('.', 1)[0]}.{prepared['ext']}"
+                        content_type = prepared["content_type"]
+                        image_meta = {
+                            "width": prepared["width"],
+                            "height": prepared["height"],
+                            "original_size": prepared["original_size"]
+                        }
+                    
+                    # 1. Supabase Storage 업로드는 백그라운드로 시작
+                    upload_future = upload_file_async(
                         file_data=file_bytes,
-                        file_name=image_file.name,
+                        file_name=file_name,
                         content_type=content_type,
                         folder="image-files"
                     )
                     
-                    # 2. Base64로 인코딩하여 Vision API 호출
-                    base64_image = base64.b64encode(file_bytes).decode('utf-8')
-                    image_url = f"data:{content_type};base64,{base64_image}"
+                    # 2. 축소한 이미지를 data URL로 바로 Vision API에 전달 (업로드와 동시 진행)
+                    image_url = image_data_url(file_bytes, content_type)
                     
                     # 분석 프롬프트
                     analysis_prompt = """이 이미지에서 다음을 추출해주세요:
@@ -565,6 +560,7 @@ with tab_image:
 간결하게 요점만 정리해주세요."""
                     
                     analysis_result = analyze_image(image_url, analysis_prompt)
+                    storage_path = upload_future.result()
                     
                     if analysis_result:
                         st.session_state.image_analysis = analysis_result
@@ -576,7 +572,8 @@ with tab_image:
                             "original_name": image_file.name,
                             "file_size": len(file_bytes),
                             "metadata": {
-                                "analysis": analysis_result
+                                "analysis": analysis_result,
+                                **image_meta
                             }
                         })
                         
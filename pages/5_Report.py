@@ -26,12 +26,22 @@ with st.sidebar:
         value=st.session_state.get("exclude_demo", True)
     )
     st.session_state["exclude_demo"] = exclude_demo
+    regenerate = st.checkbox(
+        "🔄 새로 생성 (캐시 무시)",
+        value=False,
+        help="같은 주의 이전 리포트를 재사용하지 않고 다시 생성합니다"
+    )
 
 
 # === 주간 리포트 생성 함수 ===
-def generate_weekly_report_json(checkins: List[Dict], extractions: List[Dict]) -> Optional[Dict]:
+def generate_weekly_report_json(
+    checkins: List[Dict],
+    extractions: List[Dict],
+    use_cache: bool = True
+) -> Optional[Dict]:
     """
     주간 데이터를 분석하여 구조화된 리포트 생성
+    (use_cache=False면 LLM 응답 캐시를 우회하여 새로 생성)
     
     Returns:
         {
@@ -121,7 +131,10 @@ def generate_weekly_report_json(checkins: List[Dict], extractions: List[Dict]) -
 """}
     ]
     
-    result = chat_completion_json(messages, report_schema, temperature=0.7)
+    # 같은 주/같은 기록이면 이전 리포트 재사용 (TTL 동안)
+    result = chat_completion_json(
+        messages, report_schema, temperature=0.7, cache=use_cache, action="weekly_report_json"
+    )
     
     if result:
         # 통계 추가
@@ -198,48 +211,80 @@ with col2:
 st.session_state.rpt_start = start_date
 st.session_state.rpt_end = end_date
 
+# 리포트 키: weekly_reports 테이블의 (start_date, end_date, exclude_demo)
+report_key = (start_date.isoformat(), end_date.isoformat(), exclude_demo)
+
+
+# === 저장된 리포트 불러오기 (기간/데모 설정이 바뀔 때만 1회 조회) ===
+if st.session_state.get("weekly_report_key") != report_key:
+    from lib.supabase_db import get_weekly_report
+
+    saved = get_weekly_report(*report_key)
+    st.session_state.weekly_report_key = report_key
+    st.session_state.weekly_report = saved["report"] if saved else None
+    st.session_state.report_checkins = saved.get("source_checkins", []) if saved else []
+    st.session_state.weekly_report_hash = saved["input_hash"] if saved else None
+    st.session_state.weekly_report_saved_at = saved.get("updated_at") if saved else None
+
 
 # === 리포트 생성 ===
 if st.button("📝 리포트 생성", use_container_width=True, type="primary"):
     with st.spinner("📊 주간 데이터를 분석 중..."):
         try:
-            from lib.supabase_db import get_checkins_date_range
-            from lib.config import get_supabase_client, get_current_user_id
-            
-            client = get_supabase_client()
-            user_id = get_current_user_id()
-            
+            from lib.supabase_db import get_checkins_date_range, get_extractions_for_sources, upsert_weekly_report
+            from lib.utils import report_input_hash
+
             # 체크인 조회
             checkins = get_checkins_date_range(
                 start_date=start_date.isoformat(),
                 end_date=end_date.isoformat(),
-                exclude_demo=st.session_state.get("exclude_demo", True)
+                exclude_demo=exclude_demo
             )
             
             if not checkins:
                 st.warning(f"⚠️ {start_date} ~ {end_date} 기간에 체크인 기록이 없습니다.")
             else:
-                # extractions 조회
-                checkin_ids = [c["id"] for c in checkins]
-                extractions = []
-                
-                for cid in checkin_ids:
-                    try:
-                        ext_response = client.table("extractions").select("*").eq("source_id", cid).execute()
-                        if ext_response.data:
-                            extractions.extend(ext_response.data)
-                    except:
-                        pass
-                
-                # 리포트 생성
-                report = generate_weekly_report_json(checkins, extractions)
+                # extractions 조회 (체크인 ID 전체를 in_ 쿼리로 한 번에)
+                extractions = get_extractions_for_sources("checkin", [c["id"] for c in checkins])
+
+                # 입력 해시가 저장된 리포트와 같으면 LLM 호출 없이 재사용
+                input_hash = report_input_hash(checkins, extractions)
                 
-                if report:
-                    st.session_state.weekly_report = report
-                    st.session_state.report_checkins = checkins
-                    st.success("✅ 리포트 생성 완료!")
+                if (
+                    not regenerate
+                    and st.session_state.get("weekly_report")
+                    and st.session_state.get("weekly_report_hash") == input_hash
+                ):
+                    st.success("✅ 기록이 바뀌지 않아 저장된 리포트를 표시합니다.")
                 else:
-                    st.error("리포트 생성에 실패했습니다.")
+                    # 리포트 생성
+                    report = generate_weekly_report_json(checkins, extractions, use_cache=not regenerate)
+                    
+                    if report:
+                        # 근거 표시용 체크인 요약 (다시 열 때 체크인 재조회 불필요)
+                        source_checkins = [
+                            {
+                                "id": c["id"],
+                                "created_at": c.get("created_at", ""),
+                                "mood": c.get("mood", "neutral"),
+                                "content": c.get("content", "")[:200],
+                                "tags": c.get("tags", [])
+                            }
+                            for c in checkins
+                        ]
+                        saved = upsert_weekly_report(
+                            *report_key,
+                            report=report,
+                            input_hash=input_hash,
+                            source_checkins=source_checkins
+                        )
+                        st.session_state.weekly_report = report
+                        st.session_state.report_checkins = source_checkins
+                        st.session_state.weekly_report_hash = input_hash
+                        st.session_state.weekly_report_saved_at = saved.get("updated_at") if saved else None
+                        st.success("✅ 리포트 생성 완료!")
+                    else:
+                        st.error("리포트 생성에 실패했습니다.")
                     
         except ImportError as e:
             st.error(f"모듈 로드 실패: {e}")
@@ -255,7 +300,12 @@ if st.session_state.get("weekly_report"):
     checkins = st.session_state.get("report_checkins", [])
     
     st.subheader(f"📋 주간 성장 리포트")
-    st.caption(f"{start_date} ~ {end_date}")
+    saved_at = st.session_state.get("weekly_report_saved_at")
+    if saved_at:
+        from lib.utils import format_datetime
+        st.caption(f"{start_date} ~ {end_date} · 저장: {format_datetime(saved_at)}")
+    else:
+        st.caption(f"{start_date} ~ {end_date}")
     
     # 요약
     st.markdown(f"### 💬 이번 주 핵심 주제")
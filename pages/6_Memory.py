@@ -39,6 +39,12 @@ with st.sidebar:
         help="이 값 이상의 유사도만 표시"
     )
     
+    hybrid_search = st.checkbox(
+        "하이브리드 검색",
+        value=True,
+        help="의미 검색에 키워드 일치(성경 구절, 이름, 태그)를 함께 반영"
+    )
+    
     show_context = st.checkbox(
         "컨텍스트 표시",
         value=False,
@@ -99,80 +105,90 @@ if st.session_state.get("show_examples"):
 
 # === 검색 실행 ===
 if search_btn and search_query:
-    with st.spinner("🔄 기억을 검색하고 답변을 생성 중..."):
-        try:
-            from lib.rag import generate_rag_answer, similarity_search, get_sources_info
-            
-            # RAG 파이프라인 실행
-            result = generate_rag_answer(
+    try:
+        from lib.rag import stream_rag_answer
+        
+        # RAG 파이프라인 실행 (검색까지만 대기, 답변은 스트리밍)
+        with st.spinner("🔄 기억을 검색 중..."):
+            result = stream_rag_answer(
                 query=search_query,
                 top_k=top_k,
                 threshold=threshold,
-                exclude_demo=st.session_state.get("exclude_demo", True)
+                exclude_demo=st.session_state.get("exclude_demo", True),
+                mode="hybrid" if hybrid_search else "vector"
             )
-            
-            # === 답변 표시 ===
+        
+        # === 답변 표시 (자리만 먼저 확보, 출처 표시 후 스트리밍) ===
+        st.divider()
+        st.subheader("💬 AI 답변")
+        
+        answer_container = st.container()
+        
+        # === 소스(출처) 표시 ===
+        if result["sources"]:
             st.divider()
-            st.subheader("💬 AI 답변")
-            
-            st.markdown(result["answer"])
+            st.subheader(f"📚 참조한 기억 ({result['memories_count']}개)")
             
-            # === 소스(출처) 표시 ===
-            if result["sources"]:
-                st.divider()
-                st.subheader(f"📚 참조한 기억 ({result['memories_count']}개)")
-                
-                for i, source in enumerate(result["sources"], 1):
-                    with st.container():
-                        col1, col2, col3 = st.columns([1, 4, 1])
-                        
-                        with col1:
-                            # 소스 타입 아이콘
-                            type_icons = {
-                                "checkin": "✍️",
-                                "extraction": "📋",
-                                "calendar": "📅",
-                                "plan": "📝"
-                            }
-                            icon = type_icons.get(source["source_type"], "📄")
-                            st.markdown(f"### {icon}")
-                            st.caption(source["date"])
-                        
-                        with col2:
-                            st.markdown(f"**{source['source_type'].upper()}**")
-                            st.markdown(source["preview"])
-                        
-                        with col3:
+            for i, source in enumerate(result["sources"], 1):
+                with st.container():
+                    col1, col2, col3 = st.columns([1, 4, 1])
+                    
+                    with col1:
+                        # 소스 타입 아이콘
+                        type_icons = {
+                            "checkin": "✍️",
+                            "extraction": "📋",
+                            "calendar": "📅",
+                            "plan": "📝"
+                        }
+                        icon = type_icons.get(source["source_type"], "📄")
+                        st.markdown(f"### {icon}")
+                        st.caption(source["date"])
+                    
+                    with col2:
+                        st.markdown(f"**{source['source_type'].upper()}**")
+                        st.markdown(source["preview"])
+                    
+                    with col3:
+                        if source["similarity"] or not source.get("lexical_match"):
                             similarity_pct = source["similarity"] * 100
                             st.metric("유사도", f"{similarity_pct:.0f}%")
-                        
-                        # 원문 보기 버튼
-                        if st.button(f"📖 원문 보기", key=f"view_source_{i}"):
-                            st.session_state[f"show_full_{i}"] = True
-                        
-                        if st.session_state.get(f"show_full_{i}"):
-                            # 전체 내용 조회 (체크인인 경우)
-                            if source["source_type"] == "checkin":
-                                try:
-                                    from lib.supabase_db import get_checkin
-                                    checkin = get_checkin(source["source_id"])
-                                    if checkin:
-                                        with st.expander("전체 내용", expanded=True):
-                                            st.markdown(checkin.get("content", ""))
-                                            st.caption(f"기분: {checkin.get('mood', '-')} | 태그: {', '.join(checkin.get('tags', []))}")
-                                except:
-                                    pass
-            
-            # === 컨텍스트 표시 (선택적) ===
-            if show_context and result.get("context"):
-                with st.expander("🔍 AI가 참조한 컨텍스트"):
-                    st.code(result["context"], language=None)
-            
-        except ImportError as e:
-            st.error(f"모듈 로드 실패: {e}")
-            st.info("lib/rag.py, lib/openai_client.py가 필요합니다.")
-        except Exception as e:
-            st.error(f"검색 중 오류 발생: {e}")
+                        else:
+                            st.metric("키워드", "일치")
+                    
+                    # 원문 보기 버튼
+                    if st.button(f"📖 원문 보기", key=f"view_source_{i}"):
+                        st.session_state[f"show_full_{i}"] = True
+                    
+                    if st.session_state.get(f"show_full_{i}"):
+                        # 전체 내용 조회 (체크인인 경우)
+                        if source["source_type"] == "checkin":
+                            try:
+                                from lib.supabase_db import get_checkin
+                                checkin = get_checkin(source["source_id"])
+                                if checkin:
+                                    with st.expander("전체 내용", expanded=True):
+                                        st.markdown(checkin.get("content", ""))
+                                        st.caption(f"기분: {checkin.get('mood', '-')} | 태그: {', '.join(checkin.get('tags', []))}")
+                            except:
+                                pass
+        
+        # === 컨텍스트 표시 (선택적) ===
+        if show_context and result.get("context"):
+            with st.expander("🔍 AI가 참조한 컨텍스트"):
+                st.code(result["context"], language=None)
+        
+        # === 답변 스트리밍 (첫 토큰부터 바로 표시) ===
+        with answer_container:
+            answer = st.write_stream(result["answer_stream"])
+            if not answer:
+                st.markdown("답변 생성에 실패했습니다. 다시 시도해주세요.")
+        
+    except ImportError as e:
+        st.error(f"모듈 로드 실패: {e}")
+        st.info("lib/rag.py, lib/openai_client.py가 필요합니다.")
+    except Exception as e:
+        st.error(f"검색 중 오류 발생: {e}")
 
 
 st.divider()
@@ -190,6 +206,15 @@ try:
         # 통계 조회
         checkins_count = client.table("checkins").select("id", count="exact").eq("user_id", user_id).execute()
         embeddings_count = client.table("memory_embeddings").select("id", count="exact").eq("user_id", user_id).execute()
+        # 청크 단위 행이므로 체크인당 1행인 chunk_index = 0만 세어 인덱싱된 체크인 수 계산
+        indexed_count = (
+            client.table("memory_embeddings")
+            .select("id", count="exact")
+            .eq("user_id", user_id)
+            .eq("source_type", "checkin")
+            .eq("chunk_index", 0)
+            .execute()
+        )
         
         col1, col2, col3 = st.columns(3)
         
@@ -200,7 +225,7 @@ try:
         with col3:
             # 인덱싱 비율
             if checkins_count.count and checkins_count.count > 0:
-                ratio = (embeddings_count.count or 0) / checkins_count.count * 100
+                ratio = min((indexed_count.count or 0) / checkins_count.count * 100, 100)
                 st.metric("인덱싱 비율", f"{ratio:.0f}%")
             else:
                 st.metric("인덱싱 비율", "-")
@@ -224,6 +249,35 @@ except Exception as e:
         st.metric("인덱싱 비율", "-")
 
 
+# === 임베딩 캐시 현황 ===
+try:
+    from lib.embedding_cache import get_cache_stats
+    
+    cache_stats = get_cache_stats()
+    
+    st.caption("🗂️ 임베딩 캐시 (재검색/재인덱싱 시 OpenAI 호출 생략)")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("캐시 적중", f"{cache_stats['memory_hits'] + cache_stats['disk_hits']}회")
+    with col2:
+        st.metric("캐시 미스", f"{cache_stats['misses']}회")
+    with col3:
+        st.metric("적중률", f"{cache_stats['hit_rate'] * 100:.0f}%")
+    with col4:
+        st.metric("저장된 벡터", f"{cache_stats['disk_entries'] or cache_stats['memory_entries']}개")
+    
+    from lib.llm_cache import get_llm_cache_stats
+    
+    llm_stats = get_llm_cache_stats()
+    if llm_stats["hits"] + llm_stats["misses"]:
+        st.caption(
+            f"💬 LLM 응답 캐시: 적중 {llm_stats['hits']}회 / 미스 {llm_stats['misses']}회 "
+            f"(절약 토큰 입력 {llm_stats['saved_prompt_tokens']:,} · 출력 {llm_stats['saved_completion_tokens']:,})"
+        )
+except Exception:
+    pass
+
+
 # === 수동 동기화 ===
 st.divider()
 st.subheader("🔄 기억 동기화")
@@ -233,7 +287,7 @@ if st.button("📥 신앙 기록 동기화", use_container_width=True):
     with st.spinner("동기화 중..."):
         try:
             from lib.config import get_supabase_client, get_current_user_id
-            from lib.rag import index_checkin
+            from lib.rag import bulk_index_checkins
             
             client = get_supabase_client()
             user_id = get_current_user_id()
@@ -253,12 +307,13 @@ if st.button("📥 신앙 기록 동기화", use_container_width=True):
                     st.info("✅ 모든 신앙 기록이 이미 동기화되어 있습니다.")
                 else:
                     progress = st.progress(0)
-                    success_count = 0
                     
-                    for i, checkin in enumerate(new_checkins):
-                        if index_checkin(checkin["id"], checkin["content"]):
-                            success_count += 1
-                        progress.progress((i + 1) / len(new_checkins))
+                    # 배치 임베딩 + 리스트 insert로 일괄 인덱싱
+                    success_count = bulk_index_checkins(
+                        new_checkins,
+                        user_id=user_id,
+                        progress_callback=lambda done, total: progress.progress(done / total)
+                    )
                     
                     st.success(f"✅ {success_count}/{len(new_checkins)}개 신앙 기록 동기화 완료!")
                     st.rerun()
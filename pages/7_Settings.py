@@ -344,7 +344,11 @@ try:
     
     # OpenAI 키 없을 때 안내
     if not get_openai_api_key():
-        st.warning("OpenAI API 키가 없으면 자동 인덱싱이 동작하지 않습니다. (Settings 상단 OpenAI 상태를 확인하세요)")
+        from lib.config import get_embedding_config
+        if get_embedding_config()["backend"] == "openai":
+            st.warning("OpenAI API 키가 없으면 자동 인덱싱이 동작하지 않습니다. (Settings 상단 OpenAI 상태를 확인하세요)")
+        else:
+            st.info("[embedding] backend = \"hashing\": 로컬 해싱 임베딩으로 인덱싱/검색합니다. (오프라인용, 의미 검색 품질은 낮음)")
         
 except Exception as e:
     st.error(f"AI 자동화 설정 로드 오류: {e}")
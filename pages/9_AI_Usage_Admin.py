@@ -0,0 +1,87 @@
+"""
+믿음루프(FaithLoop) - AI 사용량 (관리자 전용)
+ai_logs 기반 action별 p50/p95 지연시간, 토큰 사용량, 캐시 적중, 오류
+URL 직접 접근: /AI_Usage_Admin
+"""
+import streamlit as st
+
+st.set_page_config(page_title="AI 사용량 - 믿음루프", page_icon="📈", layout="wide")
+
+# 로그인 체크
+if "user" not in st.session_state or st.session_state.get("user") is None:
+    st.warning("🔐 로그인이 필요합니다.")
+    st.stop()
+
+from lib.supabase_db import get_ai_log_stats
+
+st.title("📈 AI 사용량")
+st.caption("AI 호출별 지연시간과 토큰 사용량 (ai_logs, 최대 수 초 지연 반영)")
+
+days = st.selectbox("기간", options=[1, 7, 30], index=1, format_func=lambda d: f"최근 {d}일")
+
+# 관리자 체크는 ai_log_stats RPC가 DB에서 수행 (실패하면 데이터 없이 접근 거부)
+stats = get_ai_log_stats(days)
+
+if stats is None:
+    st.error("🚫 관리자만 접근할 수 있습니다.")
+    st.stop()
+
+if not stats:
+    st.info("기록된 AI 호출이 없습니다.")
+    st.stop()
+
+# === 요약 ===
+total_calls = sum(row["calls"] for row in stats)
+total_errors = sum(row["errors"] for row in stats)
+total_cache_hits = sum(row["cache_hits"] for row in stats)
+total_input = sum(row["input_tokens"] for row in stats)
+total_output = sum(row["output_tokens"] for row in stats)
+
+# 규칙 우선 라우팅 비율: LLM 추출을 생략한 결정 / 전체 라우팅 결정 (action='extract_route')
+route_row = next((row for row in stats if row["action"] == "extract_route"), {})
+route_decisions = route_row.get("calls", 0)
+rule_routed = route_row.get("routed") or 0
+
+col1, col2, col3, col4, col5 = st.columns(5)
+with col1:
+    st.metric("총 호출", f"{total_calls:,}회")
+with col2:
+    st.metric("오류율", f"{total_errors / total_calls * 100:.1f}%")
+with col3:
+    st.metric("캐시 적중", f"{total_cache_hits:,}회")
+with col4:
+    st.metric("토큰 (입력/출력)", f"{total_input:,} / {total_output:,}")
+with col5:
+    st.metric(
+        "규칙 우선 추출",
+        f"{rule_routed / route_decisions * 100:.0f}%" if route_decisions else "-",
+        help="규칙 우선 라우팅을 거친 체크인 중 LLM 추출 없이 규칙으로 처리된 비율"
+    )
+
+st.divider()
+
+# === action별 상세 ===
+st.subheader("📋 호출 종류별")
+
+import pandas as pd
+
+df = pd.DataFrame([
+    {
+        "호출 종류": row["action"],
+        "호출 수": row["calls"],
+        "p50 (ms)": round(row["p50_ms"]) if row["p50_ms"] is not None else None,
+        "p95 (ms)": round(row["p95_ms"]) if row["p95_ms"] is not None else None,
+        "입력 토큰": row["input_tokens"],
+        "출력 토큰": row["output_tokens"],
+        "캐시 적중": row["cache_hits"],
+        "오류": row["errors"]
+    }
+    for row in stats
+])
+st.dataframe(df, use_container_width=True, hide_index=True)
+
+st.markdown("#### ⏱️ 지연시간 (p50 / p95)")
+st.bar_chart(df.set_index("호출 종류")[["p50 (ms)", "p95 (ms)"]])
+
+st.markdown("#### 🪙 토큰 사용량")
+st.bar_chart(df.set_index("호출 종류")[["입력 토큰", "출력 토큰"]])
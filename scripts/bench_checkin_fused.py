@@ -0,0 +1,172 @@
+"""
+체크인 AI 분석 벤치마크: 단계별(3회 호출) vs 통합(fused, 1회 호출)
+데모 코퍼스(lib/demo_data.build_demo_items)로 지연시간/토큰/추출 일치도를 비교합니다.
+
+사용법:
+    python scripts/bench_checkin_fused.py
+    python scripts/bench_checkin_fused.py --repeat 3 --no-ingestor
+
+필수 조건:
+    - .streamlit/secrets.toml의 [openai] api_key (실제 API 호출, 비용 발생)
+
+추출 품질은 단계별 결과를 기준으로 한 필드별 F1(정규화 문자열 일치)로 표시합니다.
+"""
+import argparse
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# 프로젝트 루트 디렉토리를 Python 경로에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from lib.demo_data import build_demo_items  # noqa: E402
+from lib.rules import extract_by_rules  # noqa: E402
+from lib.openai_client import get_openai_client, run_checkin_pipeline  # noqa: E402
+from lib.prompts import EXTRACTOR_JSON_SCHEMA  # noqa: E402
+from lib.rate_limiter import get_request_scheduler  # noqa: E402
+
+FIELDS = list(EXTRACTOR_JSON_SCHEMA["properties"])
+
+
+class UsageRecorder:
+    """요청 스케줄러의 call()을 감싸 usage 집계 (모든 OpenAI 호출이 스케줄러를 거침)"""
+
+    def __init__(self, scheduler):
+        self._lock = threading.Lock()
+        self._call = scheduler.call
+        scheduler.call = self._wrapped
+        self.reset()
+
+    def _wrapped(self, *args, **kwargs):
+        response = self._call(*args, **kwargs)
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            self.calls += 1
+            if usage:
+                self.prompt_tokens += usage.prompt_tokens
+                self.completion_tokens += usage.completion_tokens
+        return response
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+
+def _normalize(item: str) -> str:
+    return re.sub(r"[\s\"'“”.,!?~]+", "", item).lower()
+
+
+def field_f1(reference: List[str], candidate: List[str]) -> float:
+    """정규화 문자열 기준 F1 (부분 포함도 일치로 인정)"""
+    ref = [_normalize(x) for x in reference if x.strip()]
+    cand = [_normalize(x) for x in candidate if x.strip()]
+    if not ref and not cand:
+        return 1.0
+    if not ref or not cand:
+        return 0.0
+    match = lambda a, b: a == b or a in b or b in a  # noqa: E731
+    precision = sum(any(match(c, r) for r in ref) for c in cand) / len(cand)
+    recall = sum(any(match(r, c) for c in cand) for r in ref) / len(ref)
+    return 0.0 if precision + recall == 0 else 2 * precision * recall / (precision + recall)
+
+
+def run_mode(recorder: UsageRecorder, content: str, fused: bool, use_ingestor: bool) -> Dict:
+    """한 모드로 체크인 1건 처리, 지연시간/토큰 측정"""
+    recorder.reset()
+    started = time.perf_counter()
+    result = run_checkin_pipeline(
+        content,
+        use_ingestor=use_ingestor,
+        use_reflection=True,
+        fallback_extractor=extract_by_rules,
+        fused=fused,
+        cache=False  # --repeat로 같은 텍스트를 다시 보내므로 캐시 적중이 지연시간에 섞이지 않게
+    )
+    return {
+        "latency": time.perf_counter() - started,
+        "calls": recorder.calls,
+        "prompt_tokens": recorder.prompt_tokens,
+        "completion_tokens": recorder.completion_tokens,
+        "extraction_type": result["extraction_type"],
+        "extractions": result["extractions"] or {},
+        "has_reflection": bool(result["reflection"])
+    }
+
+
+def _summary(rows: List[Dict]) -> Dict:
+    latencies = sorted(r["latency"] for r in rows)
+    n = len(rows)
+    return {
+        "p50": latencies[n // 2],
+        "mean": sum(latencies) / n,
+        "calls": sum(r["calls"] for r in rows) / n,
+        "prompt": sum(r["prompt_tokens"] for r in rows) / n,
+        "completion": sum(r["completion_tokens"] for r in rows) / n,
+        "fallbacks": sum(r["extraction_type"] == "rule_based" for r in rows),
+        "reflections": sum(r["has_reflection"] for r in rows)
+    }
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="체크인 단계별 vs 통합 분석 벤치마크")
+    parser.add_argument("--repeat", type=int, default=1, help="데모 코퍼스 반복 횟수")
+    parser.add_argument("--no-ingestor", action="store_true", help="clean_text 정리 생략")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("체크인 AI 분석 벤치마크 (단계별 vs 통합)")
+    print("=" * 60)
+
+    try:
+        client = get_openai_client()
+    except FileNotFoundError:
+        client = None
+    if not client:
+        print("❌ 오류: OpenAI API 키가 설정되지 않았습니다.")
+        sys.exit(1)
+    recorder = UsageRecorder(get_request_scheduler())
+
+    corpus = [item["content"] for item in build_demo_items()] * args.repeat
+    use_ingestor = not args.no_ingestor
+    staged_rows, fused_rows = [], []
+    f1_by_field = {field: [] for field in FIELDS}
+
+    for i, content in enumerate(corpus, start=1):
+        staged = run_mode(recorder, content, fused=False, use_ingestor=use_ingestor)
+        fused = run_mode(recorder, content, fused=True, use_ingestor=use_ingestor)
+        staged_rows.append(staged)
+        fused_rows.append(fused)
+        for field in FIELDS:
+            f1_by_field[field].append(
+                field_f1(staged["extractions"].get(field, []), fused["extractions"].get(field, []))
+            )
+        print(f"  [{i}/{len(corpus)}] 단계별 {staged['latency']:.2f}s / 통합 {fused['latency']:.2f}s")
+
+    print()
+    print(f"{'모드':<8} {'p50(s)':>8} {'평균(s)':>8} {'호출':>6} {'입력토큰':>9} {'출력토큰':>9} {'폴백':>5} {'코멘트':>6}")
+    print("-" * 70)
+    for label, rows in (("단계별", staged_rows), ("통합", fused_rows)):
+        m = _summary(rows)
+        print(
+            f"{label:<8} {m['p50']:>8.2f} {m['mean']:>8.2f} {m['calls']:>6.1f} "
+            f"{m['prompt']:>9.0f} {m['completion']:>9.0f} {m['fallbacks']:>5} {m['reflections']:>6}"
+        )
+
+    print()
+    print("추출 일치도 (단계별 기준 F1)")
+    for field, scores in f1_by_field.items():
+        print(f"  {field:<18} {sum(scores) / len(scores):.3f}")
+    overall = [s for scores in f1_by_field.values() for s in scores]
+    print(f"  {'전체':<18} {sum(overall) / len(overall):.3f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+청킹 벤치마크: lib.rag.chunk_text 처리 속도와 토큰 예산 준수 여부 검사
+데모 기록 / 반복 문장 / 구두점 없는 음성 전사 / 공백 없는 긴 문자열을 여러 예산으로 분할해
+모든 청크가 estimate_tokens 기준 max_tokens 이하인지 확인합니다 (위반 시 종료 코드 1).
+
+사용법:
+    python scripts/bench_chunking.py
+    python scripts/bench_chunking.py --repeat 50
+
+외부 API / DB 호출 없음
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# 프로젝트 루트 디렉토리를 Python 경로에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from lib.demo_data import build_demo_items  # noqa: E402
+from lib.rag import chunk_text, CHUNK_MAX_TOKENS  # noqa: E402
+from lib.utils import estimate_tokens  # noqa: E402
+
+
+def build_samples() -> Dict[str, str]:
+    """예산 경계를 건드리는 입력 모음"""
+    demo = "\n\n".join(item["content"] for item in build_demo_items())
+    return {
+        "데모 기록 x5": "\n\n".join([demo] * 5),
+        "짧은 문장 반복": "오늘 감사합니다. " * 300,
+        "구두점 없는 전사": "오늘 아침에 가족과 함께 기도하고 말씀을 읽었습니다 " * 400,
+        "영문 혼합": "Today I prayed for my family. 말씀 묵상 시간이 좋았습니다. " * 200,
+        "공백 없는 문자열": "가" * 12000
+    }
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="청킹 벤치마크")
+    parser.add_argument("--repeat", type=int, default=10, help="입력별 반복 횟수")
+    args = parser.parse_args()
+
+    samples = build_samples()
+    budgets = [CHUNK_MAX_TOKENS, 200, 64]
+
+    print("=" * 72)
+    print(f"청킹 벤치마크 (예산 {budgets})")
+    print("=" * 72)
+    print(f"{'입력':<16} {'글자':>8} {'예산':>6} {'청크':>6} {'최대 토큰':>10} {'ms/회':>9}")
+    print("-" * 72)
+
+    violations: List[str] = []
+    for label, text in samples.items():
+        for budget in budgets:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                chunks = chunk_text(text, max_tokens=budget, overlap_tokens=min(60, budget // 4))
+            elapsed_ms = (time.perf_counter() - started) * 1000 / args.repeat
+
+            largest = max(estimate_tokens(chunk) for chunk in chunks)
+            if largest > budget:
+                violations.append(f"{label} (예산 {budget}): {largest}토큰")
+            print(f"{label:<16} {len(text):>8,} {budget:>6} {len(chunks):>6} {largest:>10} {elapsed_ms:>9.2f}")
+
+    print()
+    print(f"예산 초과 청크: {len(violations)}건 {violations}")
+    print("=" * 72)
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+로컬 스택 종단 간 벤치마크: 가짜 OpenAI + 가짜 PostgREST 서버로 앱 코드 경로의 지연시간 측정
+실제 API / DB 없이 노트북에서 결정적으로 프로파일링할 수 있습니다.
+
+측정 경로:
+    - 체크인 AI 파이프라인 (단계별 / 통합 / 규칙 우선)
+    - 체크인 저장 + RAG 인덱싱 (insert_checkin → index_checkin)
+    - 유사도 검색 (vector / hybrid)
+    - 주간 리포트 입력 조회 (get_checkins_date_range + 추출 결과)
+
+사용법:
+    python scripts/bench_local_stack.py
+    python scripts/bench_local_stack.py --openai-latency-ms 400 --ms-per-output-token 15 --db-latency-ms 20
+
+두 가짜 서버는 빈 포트에서 스레드로 실행되며, 임시 디렉토리의
+.streamlit/secrets.toml이 앱 설정을 그 주소로 돌립니다.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+# 프로젝트 루트 디렉토리를 Python 경로에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import fake_openai_server  # noqa: E402
+import fake_postgrest_server  # noqa: E402
+
+
+def start_in_thread(server) -> str:
+    """serve_forever를 데몬 스레드로 실행하고 주소 반환"""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def write_secrets(workdir: Path, supabase_url: str, openai_url: str):
+    """앱 설정을 가짜 서버로 돌리는 secrets.toml 작성"""
+    secrets_dir = workdir / ".streamlit"
+    secrets_dir.mkdir(parents=True, exist_ok=True)
+    (secrets_dir / "secrets.toml").write_text(
+        "[supabase]\n"
+        f'url = "{supabase_url}"\n'
+        'key = "fake-anon-key"\n\n'
+        "[openai]\n"
+        'api_key = "sk-fake"\n'
+        f'base_url = "{openai_url}/v1"\n\n'
+        "[embedding]\n"
+        'backend = "openai"\n\n'
+        "[cache]\n"
+        "llm_enabled = false\n",
+        encoding="utf-8"
+    )
+
+
+def timed(fn: Callable, repeat: int) -> List[float]:
+    """fn을 repeat회 실행한 지연시간 목록(ms)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(len(ordered) * 0.95)) - 1)],
+        "mean": statistics.fmean(ordered)
+    }
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="로컬 스택 종단 간 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5, help="경로별 반복 횟수")
+    parser.add_argument("--days", type=int, default=7, help="시딩할 데모 기록 일수")
+    parser.add_argument("--openai-latency-ms", type=float, default=200, help="OpenAI 요청당 고정 지연(ms)")
+    parser.add_argument("--ms-per-output-token", type=float, default=5, help="출력 토큰당 지연(ms)")
+    parser.add_argument("--db-latency-ms", type=float, default=10, help="DB 요청당 왕복 지연(ms)")
+    args = parser.parse_args()
+
+    openai_server = fake_openai_server.make_server(
+        port=0, latency_ms=args.openai_latency_ms, ms_per_output_token=args.ms_per_output_token
+    )
+    db_server = fake_postgrest_server.make_server(port=0, latency_ms=args.db_latency_ms)
+    openai_url = start_in_thread(openai_server)
+    supabase_url = start_in_thread(db_server)
+
+    workdir = Path(tempfile.mkdtemp(prefix="faithloop-bench-"))
+    write_secrets(workdir, supabase_url, openai_url)
+    os.chdir(workdir)
+
+    import streamlit as st
+    from lib.demo_data import build_demo_items
+    from lib.openai_client import run_checkin_pipeline
+    from lib.rag import index_checkin, similarity_search
+    from lib.rules import extract_by_rules
+    from lib.supabase_db import insert_checkin, insert_extraction, get_checkins_date_range, \
+        get_extractions_for_sources
+
+    user_id = str(uuid.uuid4())
+    st.session_state["user"] = SimpleNamespace(id=user_id)
+
+    items = build_demo_items(days=args.days)
+    contents = [item["content"] for item in items]
+    # LLM 캐시는 secrets([cache] llm_enabled = false)와 cache=False로 이중 비활성화 → 모든 호출이 실제 왕복
+    counter = iter(range(10 ** 9))
+
+    def next_sample() -> str:
+        return contents[next(counter) % len(contents)]
+
+    print("=" * 64)
+    print("로컬 스택 벤치마크")
+    print(f"  OpenAI: {openai_url} (요청 {args.openai_latency_ms:.0f}ms + 토큰당 {args.ms_per_output_token:.0f}ms)")
+    print(f"  PostgREST: {supabase_url} (요청 {args.db_latency_ms:.0f}ms)")
+    print("=" * 64)
+
+    # 데모 기록 시딩 (저장 + 추출 + 인덱싱)
+    seeded = []
+
+    def seed_one(item: Dict):
+        checkin = insert_checkin(item["content"], tags=item["tags"], created_at=item["created_at"])
+        insert_extraction("checkin", checkin["id"], "rule_based", extract_by_rules(item["content"]))
+        index_checkin(checkin["id"], item["content"])
+        seeded.append(checkin)
+
+    index_samples = [timed(lambda item=item: seed_one(item), 1)[0] for item in items]
+
+    start_date = (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+    end_date = datetime.now().strftime("%Y-%m-%d")
+
+    searched = []
+
+    def search(mode: str):
+        searched.append(len(similarity_search("기도 제목", threshold=0.1, mode=mode)))
+
+    def report_inputs():
+        checkins = get_checkins_date_range(start_date, end_date)
+        get_extractions_for_sources("checkin", [c["id"] for c in checkins])
+
+    results = {
+        "체크인 저장+인덱싱": index_samples,
+        "파이프라인 단계별": timed(lambda: run_checkin_pipeline(next_sample(), rule_first=False, cache=False), args.repeat),
+        "파이프라인 통합": timed(lambda: run_checkin_pipeline(next_sample(), fused=True, rule_first=False, cache=False), args.repeat),
+        "파이프라인 규칙 우선": timed(lambda: run_checkin_pipeline(next_sample(), rule_first=True, cache=False), args.repeat),
+        "검색 vector": timed(lambda: search("vector"), args.repeat),
+        "검색 hybrid": timed(lambda: search("hybrid"), args.repeat),
+        "리포트 입력 조회": timed(report_inputs, args.repeat)
+    }
+
+    print(f"{'경로':<20} {'p50(ms)':>10} {'p95(ms)':>10} {'평균(ms)':>10}")
+    print("-" * 54)
+    for label, samples in results.items():
+        stats = summarize(samples)
+        print(f"{label:<20} {stats['p50']:>10.1f} {stats['p95']:>10.1f} {stats['mean']:>10.1f}")
+
+    print()
+    print(f"시딩한 체크인: {len(seeded)}건, 임베딩 행: {len(db_server.db.tables['memory_embeddings'])}건, "
+          f"검색 결과 수: {searched}")
+    print("OpenAI 호출:", dict(openai_server.state.calls))
+    print("PostgREST 호출:")
+    for route, count in sorted(db_server.db.calls.items(), key=lambda pair: -pair[1]):
+        print(f"  {route:<50} {count:>5}")
+    print("=" * 64)
+
+    openai_server.shutdown()
+    db_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+오프라인 임베딩/검색 벤치마크 (hashing 백엔드 + 메모리 인덱스)
+네트워크 없이 데모 코퍼스를 수천 건 인덱싱하고 검색 지연시간과 자기 검색 정확도를 측정합니다.
+
+사용법:
+    python scripts/bench_offline_search.py
+    python scripts/bench_offline_search.py --records 10000 --queries 500
+
+외부 API / DB 호출 없음
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# 프로젝트 루트 디렉토리를 Python 경로에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from lib.demo_data import build_demo_items  # noqa: E402
+from lib.embedding_backends import HashingEmbeddingBackend, LocalVectorIndex  # noqa: E402
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="오프라인 임베딩/검색 벤치마크")
+    parser.add_argument("--records", type=int, default=5000, help="인덱싱할 기록 수")
+    parser.add_argument("--queries", type=int, default=200, help="검색 질의 수")
+    parser.add_argument("--seed", type=int, default=42, help="코퍼스 생성 시드")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lines = [
+        line.strip() for item in build_demo_items() for line in item["content"].split("\n")
+        if len(line.strip()) > 8
+    ]
+    # 데모 줄을 무작위로 조합해 서로 다른 기록 생성
+    record_lines = [rng.sample(lines, 4) for _ in range(args.records)]
+    records = [" ".join(parts) for parts in record_lines]
+
+    backend = HashingEmbeddingBackend()
+    index = LocalVectorIndex(backend.dimensions)
+
+    print("=" * 60)
+    print(f"오프라인 임베딩/검색 벤치마크 ({backend.model}, {backend.dimensions}차원)")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    vectors = backend.embed_batch(records)
+    embed_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index.add(list(range(len(records))), vectors)
+    index.search(vectors[0], top_k=1)  # 행렬 구성 포함
+    build_time = time.perf_counter() - started
+
+    # 자기 검색: 기록의 문장 3개(순서 섞음)만으로 원래 기록을 1위로 찾는지
+    targets = rng.sample(range(len(records)), min(args.queries, len(records)))
+    hits = 0
+    started = time.perf_counter()
+    for target in targets:
+        query = " ".join(rng.sample(record_lines[target], 3))
+        results = index.search(backend.embed_one(query), top_k=5)
+        hits += bool(results) and results[0][0] == target
+    query_time = time.perf_counter() - started
+
+    print(f"임베딩: {len(records):,}건 {embed_time:.2f}s ({len(records) / embed_time:,.0f}건/초)")
+    print(f"인덱스 구성: {build_time * 1000:.0f}ms")
+    print(f"검색: {len(targets)}회 평균 {query_time / len(targets) * 1000:.2f}ms (임베딩 포함)")
+    print(f"자기 검색 top-1 정확도: {hits / len(targets):.3f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+규칙 기반 추출 마이크로 벤치마크: 기존 줄 단위 구현 vs lib.rules 컴파일 엔진
+대용량 코퍼스(데모 항목 + 무작위 조합)로 결과 일치 여부와 처리 속도를 비교합니다.
+규칙 우선 라우팅 결과가 LLM Extractor 스키마와 같은 항목 집합인지도 검사합니다.
+
+사용법:
+    python scripts/bench_rules.py
+    python scripts/bench_rules.py --texts 50000 --seed 7
+
+외부 API / DB 호출 없음
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# 프로젝트 루트 디렉토리를 Python 경로에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from lib.demo_data import build_demo_items  # noqa: E402
+from lib.config import get_extraction_config  # noqa: E402
+from lib.prompts import EXTRACTOR_JSON_SCHEMA  # noqa: E402
+from lib.rules import RuleEngine  # noqa: E402
+
+# 규칙으로 채울 수 있는 항목이 없어 LLM 추출로 보내야 하는 텍스트
+UNROUTABLE_SAMPLES = [
+    "- 기도하기\n- 성경 읽기",
+    "- 운동\n- 장보기\n- 메일 정리"
+]
+
+
+def legacy_extract_by_rules(content: str) -> Dict[str, List[str]]:
+    """기존 구현 (pages/3_Checkin.py, lib/demo_data.py에 중복되어 있던 코드)"""
+    lines = content.strip().split('\n')
+
+    tasks = []
+    obstacles = []
+    projects = []
+    insights = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('-') or line.startswith('•') or line.startswith('*'):
+            task_text = line.lstrip('-•* ').strip()
+            if task_text:
+                tasks.append(task_text)
+
+        obstacle_keywords = ['문제', '어려움', '힘들', '막혀', '안됨', '실패', '오류', '버그']
+        if line.startswith('!') or any(kw in line for kw in obstacle_keywords):
+            obstacle_text = line.lstrip('! ').strip()
+            if obstacle_text and obstacle_text not in obstacles:
+                obstacles.append(obstacle_text)
+
+        project_matches = re.findall(r'#(\w+)', line)
+        for proj in project_matches:
+            if proj not in projects:
+                projects.append(proj)
+
+        insight_keywords = ['💡', '인사이트', '배움', '깨달음', '발견', '아이디어']
+        if any(kw in line for kw in insight_keywords):
+            insight_text = line.strip()
+            if insight_text and insight_text not in insights:
+                insights.append(insight_text)
+
+    return {
+        "tasks": tasks,
+        "obstacles": obstacles,
+        "projects": projects,
+        "insights": insights,
+        "people": [],
+        "emotions": []
+    }
+
+
+def build_corpus(size: int, seed: int) -> List[str]:
+    """데모 항목 줄을 무작위로 섞어 size개의 체크인 텍스트 생성"""
+    rng = random.Random(seed)
+    pool = [line for item in build_demo_items() for line in item["content"].split('\n')]
+    pool += [
+        "- 새벽기도 #기도모임", "! 회의가 길어져 말씀 묵상을 못함", "  * 운동 30분",
+        "💡 작은 순종이 큰 평안을 준다", "업무 중 버그 때문에 힘들었다", "#청년부 #찬양팀 연습",
+        "오늘은 평범한 하루였다.", ""
+    ]
+    # 규칙에 걸리지 않는 서술형 줄 (실제 체크인은 대부분 이런 줄)
+    pool += [
+        "점심에 동료와 산책하며 이야기를 나눴다", "저녁에는 가족과 함께 식사를 했다",
+        "설교 말씀을 다시 읽어 보았다", "내일은 조금 더 일찍 일어나려고 한다",
+        "주일 예배 후 소그룹 모임에 참석했다", "출근길에 찬양을 들으며 마음을 정리했다"
+    ] * 3
+    return ["\n".join(rng.choice(pool) for _ in range(rng.randint(3, 20))) for _ in range(size)]
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="규칙 기반 추출 벤치마크")
+    parser.add_argument("--texts", type=int, default=20000, help="코퍼스 텍스트 수")
+    parser.add_argument("--seed", type=int, default=42, help="코퍼스 생성 시드")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.texts, args.seed)
+    engine = RuleEngine()
+    total_lines = sum(text.count('\n') + 1 for text in corpus)
+
+    print("=" * 60)
+    print(f"규칙 기반 추출 벤치마크 ({len(corpus):,}건, {total_lines:,}줄)")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    legacy = [legacy_extract_by_rules(text) for text in corpus]
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    single = [engine.extract(text) for text in corpus]
+    single_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = engine.extract_batch(corpus)
+    batch_time = time.perf_counter() - started
+
+    mismatches = sum(a != b for a, b in zip(legacy, single)) + sum(a != b for a, b in zip(legacy, batch))
+
+    print(f"{'구현':<20} {'시간(s)':>9} {'건/초':>12} {'배속':>7}")
+    print("-" * 52)
+    for label, elapsed in (
+        ("기존 (줄 단위)", legacy_time),
+        ("엔진 extract", single_time),
+        ("엔진 extract_batch", batch_time)
+    ):
+        print(f"{label:<20} {elapsed:>9.3f} {len(corpus) / elapsed:>12,.0f} {legacy_time / elapsed:>6.1f}x")
+
+    started = time.perf_counter()
+    scored = [engine.extract_schema(text) for text in corpus]
+    schema_time = time.perf_counter() - started
+    print(f"{'엔진 extract_schema':<20} {schema_time:>9.3f} {len(corpus) / schema_time:>12,.0f} {legacy_time / schema_time:>6.1f}x")
+
+    # 라우팅된 결과는 LLM 추출 결과와 같은 형태로 저장되므로 항목 집합이 정확히 같아야 함
+    expected_fields = set(EXTRACTOR_JSON_SCHEMA["properties"])
+    field_mismatches = sum(set(extractions) != expected_fields for extractions, _ in scored)
+    threshold = float(get_extraction_config()["rule_confidence_threshold"])
+    routed = sum(confidence >= threshold for _, confidence in scored)
+    unroutable = [
+        text for text in UNROUTABLE_SAMPLES
+        if engine.extract_schema(text)[1] >= threshold
+    ]
+
+    print()
+    print(f"결과 불일치: {mismatches}건")
+    print(f"라우팅 가능(신뢰도 ≥ {threshold}): {routed:,}/{len(corpus):,}건")
+    print(f"스키마 항목 불일치: {field_mismatches}건")
+    print(f"LLM으로 보내야 하는데 라우팅되는 샘플: {len(unroutable)}건 {unroutable}")
+    print("=" * 60)
+    if mismatches or field_mismatches or unroutable:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
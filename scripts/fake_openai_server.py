@@ -0,0 +1,263 @@
+"""
+로컬 OpenAI 호환 가짜 서버 (벤치마크/오프라인 개발용)
+- POST /v1/chat/completions: 일반/스트리밍, json_schema 응답은 스키마 기본값 또는 지정한 고정 응답
+- POST /v1/embeddings: 결정적 임베딩 (lib.embedding_backends의 hashing 백엔드)
+- POST /v1/audio/transcriptions: 고정 전사 결과
+- 모든 응답에 x-ratelimit-* 헤더 포함 (요청 스케줄러 동작 확인용)
+
+사용법:
+    python scripts/fake_openai_server.py --port 8787 --latency-ms 300
+    python scripts/fake_openai_server.py --canned canned_outputs.json
+
+.streamlit/secrets.toml:
+    [openai]
+    api_key = "sk-fake"
+    base_url = "http://127.0.0.1:8787/v1"
+
+--canned 파일 형식: {"json_schema 이름": {...고정 응답...}, "chat": "일반 응답 텍스트"}
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# 프로젝트 루트 디렉토리를 Python 경로에 추가
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from lib.embedding_backends import HashingEmbeddingBackend  # noqa: E402
+from lib.utils import estimate_tokens  # noqa: E402
+
+DEFAULT_CHAT_REPLY = "오늘도 말씀을 붙들고 하루를 돌아본 모습이 귀합니다."
+DEFAULT_TRANSCRIPTION = "오늘 설교 말씀을 듣고 감사한 마음으로 기도했습니다."
+
+
+def schema_default(schema: Dict[str, Any]) -> Any:
+    """JSON Schema를 만족하는 결정적 기본값 (문자열은 빈 값 대신 자리표시 텍스트)"""
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {name: schema_default(prop) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [schema_default(schema.get("items", {}))] if schema.get("minItems") else []
+    if kind == "string":
+        return "fake"
+    if kind in ("number", "integer"):
+        return 0
+    if kind == "boolean":
+        return False
+    return None
+
+
+class FakeOpenAIState:
+    """
+    서버 설정과 호출 통계
+
+    Args:
+        latency_ms: 요청마다 추가할 고정 지연(ms)
+        ms_per_output_token: 출력 토큰당 추가 지연(ms, 생성 시간 흉내)
+        canned: json_schema 이름 또는 "chat"별 고정 응답
+    """
+
+    def __init__(self, latency_ms: float = 0, ms_per_output_token: float = 0, canned: Optional[Dict] = None):
+        self.latency_ms = latency_ms
+        self.ms_per_output_token = ms_per_output_token
+        self.canned = canned or {}
+        self.embedder = HashingEmbeddingBackend()
+        self.lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    def record(self, endpoint: str):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def sleep(self, output_tokens: int = 0):
+        delay = self.latency_ms + self.ms_per_output_token * output_tokens
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+def make_handler(state: FakeOpenAIState):
+    """state를 공유하는 요청 핸들러 클래스 생성"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - 기본 접근 로그 비활성화
+            pass
+
+        def _send_json(self, payload: Dict, status: int = 200):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            self._ratelimit_headers()
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _ratelimit_headers(self):
+            self.send_header("x-ratelimit-limit-requests", "10000")
+            self.send_header("x-ratelimit-remaining-requests", "9999")
+            self.send_header("x-ratelimit-limit-tokens", "10000000")
+            self.send_header("x-ratelimit-remaining-tokens", "9999000")
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("content-length") or 0))
+
+        def do_POST(self):
+            path = self.path.split("?")[0].rstrip("/")
+            if path.endswith("/chat/completions"):
+                self._chat(json.loads(self._read_body() or b"{}"))
+            elif path.endswith("/embeddings"):
+                self._embeddings(json.loads(self._read_body() or b"{}"))
+            elif path.endswith("/audio/transcriptions"):
+                self._read_body()
+                state.record("transcriptions")
+                state.sleep()
+                self._send_json({"text": state.canned.get("transcription", DEFAULT_TRANSCRIPTION)})
+            else:
+                self._send_json({"error": {"message": f"unknown path {path}"}}, status=404)
+
+        def _chat(self, request: Dict):
+            state.record("chat")
+            messages = request.get("messages", [])
+            prompt_tokens = sum(
+                estimate_tokens(m["content"]) if isinstance(m.get("content"), str) else 0 for m in messages
+            )
+
+            response_format = request.get("response_format") or {}
+            if response_format.get("type") == "json_schema":
+                spec = response_format["json_schema"]
+                content = json.dumps(
+                    state.canned.get(spec.get("name")) or schema_default(spec.get("schema", {})),
+                    ensure_ascii=False
+                )
+            else:
+                content = state.canned.get("chat", DEFAULT_CHAT_REPLY)
+
+            completion_tokens = estimate_tokens(content)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            model = request.get("model", "gpt-4o-mini")
+            state.sleep(completion_tokens)
+
+            if request.get("stream"):
+                self._stream(completion_id, model, content, usage, request)
+                return
+
+            self._send_json({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        def _stream(self, completion_id: str, model: str, content: str, usage: Dict, request: Dict):
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("connection", "close")
+            self._ratelimit_headers()
+            self.end_headers()
+
+            def _event(choices, chunk_usage=None):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": choices
+                }
+                if chunk_usage is not None:
+                    chunk["usage"] = chunk_usage
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+            for i in range(0, len(content), 8):
+                _event([{"index": 0, "delta": {"content": content[i:i + 8]}, "finish_reason": None}])
+            _event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if (request.get("stream_options") or {}).get("include_usage"):
+                _event([], usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+        def _embeddings(self, request: Dict):
+            state.record("embeddings")
+            inputs = request.get("input")
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            dimensions = int(request.get("dimensions") or state.embedder.dimensions)
+            embedder = state.embedder if dimensions == state.embedder.dimensions else \
+                HashingEmbeddingBackend(dimensions=dimensions)
+            state.sleep()
+            prompt_tokens = sum(estimate_tokens(text) for text in inputs)
+            self._send_json({
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": embedder.embed_one(text) or [0.0] * dimensions}
+                    for i, text in enumerate(inputs)
+                ],
+                "model": request.get("model", "text-embedding-3-small"),
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+            })
+
+    return Handler
+
+
+def make_server(
+    port: int = 8787,
+    latency_ms: float = 0,
+    ms_per_output_token: float = 0,
+    canned: Optional[Dict] = None,
+    host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """
+    가짜 OpenAI 서버 생성 (serve_forever는 호출자가 실행, port=0이면 빈 포트 사용)
+
+    Returns:
+        ThreadingHTTPServer (server.state에 호출 통계)
+    """
+    state = FakeOpenAIState(latency_ms, ms_per_output_token, canned)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 가짜 서버")
+    parser.add_argument("--port", type=int, default=8787, help="포트")
+    parser.add_argument("--latency-ms", type=float, default=0, help="요청마다 추가할 지연(ms)")
+    parser.add_argument("--ms-per-output-token", type=float, default=0, help="출력 토큰당 추가 지연(ms)")
+    parser.add_argument("--canned", type=str, default=None, help="고정 응답 JSON 파일")
+    args = parser.parse_args()
+
+    canned = json.loads(Path(args.canned).read_text(encoding="utf-8")) if args.canned else None
+    server = make_server(args.port, args.latency_ms, args.ms_per_output_token, canned)
+    print(f"가짜 OpenAI 서버: http://127.0.0.1:{server.server_address[1]}/v1 (Ctrl+C로 종료)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
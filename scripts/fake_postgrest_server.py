@@ -0,0 +1,581 @@
+"""
+로컬 Supabase(PostgREST) 가짜 서버 (벤치마크/오프라인 개발용)
+- /rest/v1/{table}: select / insert / upsert / update / delete (메모리 테이블, RLS 없음)
+  필터: eq, neq, gt, gte, lt, lte, in, is, cs, ov, like, ilike (+ not.)
+  select 컬럼 지정, 1단계 임베드(plans → plan_blocks(*)), order, limit, offset, count=exact, single
+- /rest/v1/rpc/{함수}: search_memories, search_memories_hybrid, replace_memory_chunks,
+  claim_jobs, ai_log_stats, tune_memory_index (sql/schema.sql의 동작을 Python으로 재현)
+- /storage/v1/object/{bucket}/{path}: 업로드만 지원 (바이트는 메모리에 보관)
+- Auth(/auth/v1)는 지원하지 않음 → 호출자가 st.session_state["user"]를 직접 설정
+
+사용법:
+    python scripts/fake_postgrest_server.py --port 54321 --latency-ms 20
+
+.streamlit/secrets.toml:
+    [supabase]
+    url = "http://127.0.0.1:54321"
+    key = "fake-anon-key"
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+import numpy as np
+
+# 컬럼 기본값 (sql/schema.sql의 DEFAULT 중 앱 코드가 의존하는 것)
+TABLE_DEFAULTS = {
+    "checkins": {"tags": [], "metadata": {}},
+    "extractions": {"data": {}},
+    "memory_chunks": {"chunk_index": 0, "metadata": {}},
+    "memory_embeddings": {"chunk_index": 0, "embedding_model": "text-embedding-3-small"},
+    "profiles": {"role": "user", "settings": {}},
+    "jobs": {"payload": {}, "status": "pending", "attempts": 0, "max_attempts": 5},
+    "ai_logs": {"status": "success", "cache_hit": False, "metadata": {}},
+    "prayers": {"status": "praying"},
+    "weekly_reports": {"exclude_demo": True, "source_checkins": []}
+}
+
+# 응답에서 pgvector 문자열("[0.1,0.2,...]")로 돌려주는 컬럼
+VECTOR_COLUMNS = {"embedding"}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _split_top_level(text: str, sep: str = ",") -> List[str]:
+    """괄호/따옴표 밖의 구분자로 분리"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_list(arg: str) -> List[str]:
+    """PostgREST 목록 리터럴 '(a,b)' / 배열 리터럴 '{a,b}'"""
+    inner = arg.strip()[1:-1]
+    return [item.strip().strip('"') for item in _split_top_level(inner)] if inner else []
+
+
+def _coerce(value: Any, arg: str) -> Tuple[Any, Any]:
+    """비교를 위해 필터 문자열을 저장 값의 타입에 맞춤"""
+    if isinstance(value, bool):
+        return value, arg.lower() == "true"
+    if isinstance(value, (int, float)):
+        try:
+            return value, float(arg)
+        except ValueError:
+            return str(value), arg
+    value_time, arg_time = _parse_time(value), _parse_time(arg)
+    if value_time and arg_time and isinstance(value, str) and len(value) >= 10 and len(arg) >= 10:
+        return value_time, arg_time
+    return str(value), arg
+
+
+def _like(value: Any, pattern: str, ignore_case: bool) -> bool:
+    regex = "^" + re.escape(pattern).replace(r"\*", ".*").replace("%", ".*").replace("_", ".") + "$"
+    return re.match(regex, str(value or ""), re.S | (re.I if ignore_case else 0)) is not None
+
+
+def _matches(row: Dict, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, arg = expression.partition(".")
+    value = row.get(column)
+
+    if op == "is":
+        result = value is None if arg == "null" else value is (arg == "true")
+    elif op == "in":
+        result = value is not None and str(value) in _parse_list(arg)
+    elif op in ("cs", "cd", "ov"):
+        try:
+            target = json.loads(arg)
+        except json.JSONDecodeError:
+            target = _parse_list(arg)
+        if isinstance(target, dict):
+            result = isinstance(value, dict) and all(value.get(k) == v for k, v in target.items())
+        else:
+            items = set(map(str, value or []))
+            target = set(map(str, target))
+            result = {"cs": target <= items, "cd": items <= target, "ov": bool(items & target)}[op]
+    elif op in ("like", "ilike"):
+        result = _like(value, arg, op == "ilike")
+    elif value is None:
+        result = False
+    else:
+        left, right = _coerce(value, unquote(arg))
+        result = {
+            "eq": left == right, "neq": left != right,
+            "gt": left > right, "gte": left >= right,
+            "lt": left < right, "lte": left <= right
+        }.get(op, False)
+    return not result if negate else result
+
+
+def _vector_out(value: Any) -> Any:
+    if isinstance(value, list):
+        return "[" + ",".join(repr(float(x)) for x in value) + "]"
+    return value
+
+
+def _vector_in(value: Any) -> Optional[np.ndarray]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _trigrams(text: str) -> set:
+    words = re.findall(r"\w+", (text or "").lower())
+    grams = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FakeDatabase:
+    """메모리 테이블 + RPC 구현 (단일 lock으로 직렬화)"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict]] = defaultdict(list)
+        self.storage: Dict[str, bytes] = {}
+        self.lock = threading.RLock()
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    # --- 테이블 ---
+
+    def _new_row(self, table: str, data: Dict) -> Dict:
+        row = {**json.loads(json.dumps(TABLE_DEFAULTS.get(table, {}))), **data}
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now())
+        if table in ("jobs", "profiles", "checkins", "prayers", "sermons", "weekly_reports"):
+            row.setdefault("updated_at", row["created_at"])
+        if table == "jobs":
+            row.setdefault("run_after", row["created_at"])
+        return row
+
+    def filter_rows(self, table: str, filters: List[Tuple[str, str]]) -> List[Dict]:
+        return [row for row in self.tables[table] if all(_matches(row, c, e) for c, e in filters)]
+
+    def insert(self, table: str, rows: List[Dict], on_conflict: Optional[str], resolution: Optional[str]) -> List[Dict]:
+        keys = (on_conflict or "id").split(",")
+        written = []
+        for data in rows:
+            existing = None
+            if resolution or on_conflict:
+                existing = next(
+                    (r for r in self.tables[table] if all(str(r.get(k)) == str(data.get(k)) for k in keys)),
+                    None
+                )
+            if existing is not None:
+                if resolution == "ignore-duplicates":
+                    continue
+                existing.update(data)
+                if "updated_at" in existing:
+                    existing["updated_at"] = _now()
+                written.append(existing)
+            else:
+                row = self._new_row(table, data)
+                self.tables[table].append(row)
+                written.append(row)
+        return written
+
+    def project(self, table: str, rows: List[Dict], select: Optional[str]) -> List[Dict]:
+        """select 컬럼 지정 / 1단계 임베드 적용 후 응답용 dict로 변환"""
+        columns = _split_top_level(select or "*")
+        result = []
+        for row in rows:
+            out = {}
+            for column in (c.strip() for c in columns):
+                if column == "*":
+                    out.update(row)
+                    continue
+                embed = re.match(r"(\w+)\((.*)\)$", column)
+                if embed:
+                    child, child_select = embed.groups()
+                    foreign_key = f"{table[:-1] if table.endswith('s') else table}_id"
+                    children = [r for r in self.tables[child] if r.get(foreign_key) == row.get("id")]
+                    out[child] = self.project(child, children, child_select)
+                    continue
+                alias, _, name = column.rpartition(":")
+                out[alias or name] = row.get(name)
+            result.append({k: _vector_out(v) if k in VECTOR_COLUMNS else v for k, v in out.items()})
+        return result
+
+    # --- RPC (sql/schema.sql 재현) ---
+
+    def _excluded_sources(self, exclude_tags: Optional[List[str]]) -> set:
+        if not exclude_tags:
+            return set()
+        return {
+            c["id"] for c in self.tables["checkins"]
+            if set(c.get("tags") or []) & set(exclude_tags)
+        }
+
+    def _visible(self, row: Dict, params: Dict, excluded: set) -> bool:
+        if params.get("user_id_filter") and row.get("user_id") != params["user_id_filter"]:
+            return False
+        if params.get("source_types") and row.get("source_type") not in params["source_types"]:
+            return False
+        if row.get("source_type") in ("checkin", "extraction") and row.get("source_id") in excluded:
+            return False
+        return True
+
+    def _vector_candidates(self, params: Dict, limit: int) -> List[Tuple[float, Dict]]:
+        excluded = self._excluded_sources(params.get("exclude_tags"))
+        rows = [r for r in self.tables["memory_embeddings"] if self._visible(r, params, excluded)]
+        if not rows:
+            return []
+        query = _vector_in(params["query_embedding"])
+        matrix = np.vstack([_vector_in(r["embedding"]) for r in rows])
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        similarity = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+        threshold = float(params.get("match_threshold", 0.7))
+        ranked = sorted(
+            ((float(s), r) for s, r in zip(similarity, rows) if s > threshold),
+            key=lambda pair: -pair[0]
+        )
+        return ranked[:limit]
+
+    @staticmethod
+    def _best_per_source(ranked: List[Tuple[float, Dict]]) -> List[Tuple[float, Dict]]:
+        seen, best = set(), []
+        for score, row in ranked:
+            key = (row["source_type"], row["source_id"])
+            if key not in seen:
+                seen.add(key)
+                best.append((score, row))
+        return best
+
+    def rpc_search_memories(self, params: Dict) -> List[Dict]:
+        match_count = int(params.get("match_count", 5))
+        best = self._best_per_source(self._vector_candidates(params, match_count * 4))[:match_count]
+        return [
+            {
+                "id": row["id"], "source_type": row["source_type"], "source_id": row["source_id"],
+                "content": row["content"], "similarity": similarity, "created_at": row["created_at"],
+                "chunk_index": row.get("chunk_index", 0),
+                "embedding": _vector_out(row["embedding"]) if params.get("include_embeddings") else None
+            }
+            for similarity, row in best
+        ]
+
+    def rpc_search_memories_hybrid(self, params: Dict) -> List[Dict]:
+        match_count = int(params.get("match_count", 5))
+        candidate_count = int(params.get("candidate_count", 20))
+        rrf_k = int(params.get("rrf_k", 60))
+        params = {"match_threshold": 0.5, **params}
+
+        vec = self._best_per_source(self._vector_candidates(params, candidate_count))
+
+        query_text = params.get("query_text") or ""
+        query_grams = _trigrams(query_text)
+        excluded = self._excluded_sources(params.get("exclude_tags"))
+        lex_raw = []
+        for row in self.tables["memory_chunks"]:
+            if not self._visible(row, params, excluded):
+                continue
+            exact = query_text.lower() in (row.get("content") or "").lower()
+            score = len(query_grams & _trigrams(row.get("content"))) / len(query_grams) if query_grams else 0.0
+            if exact or score >= 0.3:
+                lex_raw.append(((exact, score), row))
+        lex_raw.sort(key=lambda pair: (not pair[0][0], -pair[0][1]))
+        lex = self._best_per_source(lex_raw[:candidate_count])
+
+        merged: Dict[Tuple[str, str], Dict] = {}
+        for rank, (similarity, row) in enumerate(vec, start=1):
+            merged[(row["source_type"], row["source_id"])] = {
+                "id": row["id"], "source_type": row["source_type"], "source_id": row["source_id"],
+                "content": row["content"], "similarity": similarity, "created_at": row["created_at"],
+                "score": 1.0 / (rrf_k + rank), "vector_rank": rank, "lexical_rank": None,
+                "embedding": _vector_out(row["embedding"]) if params.get("include_embeddings") else None
+            }
+        for rank, (_, row) in enumerate(lex, start=1):
+            key = (row["source_type"], row["source_id"])
+            if key in merged:
+                merged[key]["score"] += 1.0 / (rrf_k + rank)
+                merged[key]["lexical_rank"] = rank
+            else:
+                merged[key] = {
+                    "id": row["id"], "source_type": row["source_type"], "source_id": row["source_id"],
+                    "content": row["content"], "similarity": 0.0, "created_at": row["created_at"],
+                    "score": 1.0 / (rrf_k + rank), "vector_rank": None, "lexical_rank": rank,
+                    "embedding": None
+                }
+        return sorted(merged.values(), key=lambda r: -r["score"])[:match_count]
+
+    def rpc_replace_memory_chunks(self, params: Dict) -> int:
+        user_id, source_type, source_id = params["p_user_id"], params["p_source_type"], params["p_source_id"]
+        chunks = params.get("chunks") or []
+        base = {"user_id": user_id, "source_type": source_type, "source_id": source_id}
+        conflict = "user_id,source_type,source_id,chunk_index,content_hash"
+        self.insert("memory_chunks", [
+            {**base, "content": c["content"], "chunk_index": c["chunk_index"],
+             "content_hash": c.get("content_hash"), "metadata": c.get("metadata") or {}}
+            for c in chunks
+        ], conflict, "ignore-duplicates")
+        inserted = self.insert("memory_embeddings", [
+            {**base, "content": c["content"], "chunk_index": c["chunk_index"],
+             "content_hash": c.get("content_hash"), "embedding": _vector_in(c["embedding"]).tolist(),
+             "embedding_model": c.get("embedding_model") or "text-embedding-3-small"}
+            for c in chunks if c.get("embedding") is not None
+        ], conflict, "ignore-duplicates")
+
+        keep = {(c["chunk_index"], c.get("content_hash")) for c in chunks}
+        for table in ("memory_chunks", "memory_embeddings"):
+            self.tables[table] = [
+                r for r in self.tables[table]
+                if not (r["user_id"] == user_id and r["source_type"] == source_type
+                        and r["source_id"] == source_id
+                        and (r.get("chunk_index"), r.get("content_hash")) not in keep)
+            ]
+        return len(inserted)
+
+    def rpc_claim_jobs(self, params: Dict) -> List[Dict]:
+        now = datetime.now(timezone.utc)
+        lock_timeout = timedelta(seconds=int(params.get("lock_timeout_seconds", 600)))
+
+        def stale(job: Dict) -> bool:
+            return job["status"] == "running" and _parse_time(job.get("locked_at")) < now - lock_timeout
+
+        for job in self.tables["jobs"]:
+            if stale(job) and job["attempts"] >= job["max_attempts"]:
+                job.update({
+                    "status": "failed", "last_error": job.get("last_error") or "lock timeout: max_attempts 초과",
+                    "locked_at": None, "locked_by": None
+                })
+        claimable = [
+            job for job in self.tables["jobs"]
+            if (job["status"] == "pending" and _parse_time(job["run_after"]) <= now)
+            or (stale(job) and job["attempts"] < job["max_attempts"])
+        ]
+        claimable.sort(key=lambda job: job["run_after"])
+        claimed = claimable[:int(params.get("batch_size", 5))]
+        for job in claimed:
+            job.update({
+                "status": "running", "attempts": job["attempts"] + 1,
+                "locked_at": _now(), "locked_by": params.get("worker_id")
+            })
+        return [dict(job) for job in claimed]
+
+    def rpc_ai_log_stats(self, params: Dict) -> List[Dict]:
+        since = _parse_time(params.get("since")) or datetime.now(timezone.utc) - timedelta(days=7)
+        groups: Dict[str, List[Dict]] = defaultdict(list)
+        for log in self.tables["ai_logs"]:
+            if (_parse_time(log.get("created_at")) or since) >= since:
+                groups[log.get("action")].append(log)
+
+        stats = []
+        for action, logs in groups.items():
+            latencies = [l["latency_ms"] for l in logs if not l.get("cache_hit") and l.get("latency_ms") is not None]
+            stats.append({
+                "action": action,
+                "calls": len(logs),
+                "errors": sum(l.get("status") == "error" for l in logs),
+                "cache_hits": sum(bool(l.get("cache_hit")) for l in logs),
+                "p50_ms": float(np.percentile(latencies, 50)) if latencies else None,
+                "p95_ms": float(np.percentile(latencies, 95)) if latencies else None,
+                "input_tokens": sum(l.get("input_tokens") or 0 for l in logs),
+                "output_tokens": sum(l.get("output_tokens") or 0 for l in logs),
+                "routed": sum(bool((l.get("metadata") or {}).get("routed")) for l in logs)
+            })
+        return sorted(stats, key=lambda s: -s["calls"])
+
+    def rpc_tune_memory_index(self, params: Dict) -> Dict:
+        return {
+            "id": 1, "index_type": "hnsw", "lists": None, "probes": 10, "ef_search": 40,
+            "row_count": len(self.tables["memory_embeddings"]), "tuned_at": _now()
+        }
+
+
+def make_handler(db: FakeDatabase, latency_ms: float):
+    """db를 공유하는 요청 핸들러 클래스 생성"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - 기본 접근 로그 비활성화
+            pass
+
+        # --- 공통 ---
+
+        def _send(self, payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None):
+            body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json; charset=utf-8")
+            self.send_header("content-length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, message: str, status: int = 400, code: str = "PGRST000"):
+            self._send({"message": message, "code": code, "hint": None, "details": None}, status)
+
+        def _body(self) -> Any:
+            raw = self.rfile.read(int(self.headers.get("content-length") or 0))
+            return json.loads(raw) if raw else None
+
+        def _prefer(self) -> Dict[str, str]:
+            prefer = {}
+            for item in (self.headers.get("prefer") or "").split(","):
+                key, _, value = item.strip().partition("=")
+                if key:
+                    prefer[key] = value
+            return prefer
+
+        def _route(self) -> Tuple[str, List[Tuple[str, str]], Dict[str, str]]:
+            parts = urlsplit(self.path)
+            query = parse_qsl(parts.query, keep_blank_values=True)
+            filters = [(k, v) for k, v in query if k not in RESERVED_PARAMS]
+            options = {k: v for k, v in query if k in RESERVED_PARAMS}
+            return unquote(parts.path), filters, options
+
+        def _respond_rows(self, table: str, rows: List[Dict], options: Dict, total: Optional[int] = None):
+            data = db.project(table, rows, options.get("select"))
+            headers = {}
+            if self._prefer().get("count"):
+                total = len(rows) if total is None else total
+                headers["content-range"] = f"0-{max(len(data) - 1, 0)}/{total}" if data else f"*/{total}"
+            if "vnd.pgrst.object" in (self.headers.get("accept") or ""):
+                if len(data) != 1:
+                    self._error("JSON object requested, multiple (or no) rows returned", 406, "PGRST116")
+                    return
+                self._send(data[0], headers=headers)
+                return
+            if self._prefer().get("return") == "minimal":
+                self._send(None, 201 if self.command == "POST" else 204, headers)
+                return
+            self._send(data, headers=headers)
+
+        def _handle(self):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            path, filters, options = self._route()
+            db.calls[f"{self.command} {path}"] += 1
+
+            if path.startswith("/storage/v1/object/"):
+                db.storage[path[len("/storage/v1/object/"):]] = self.rfile.read(
+                    int(self.headers.get("content-length") or 0)
+                )
+                self._send({"Key": path[len("/storage/v1/object/"):]})
+                return
+            if not path.startswith("/rest/v1/"):
+                self._error(f"지원하지 않는 경로: {path}", 404)
+                return
+
+            name = path[len("/rest/v1/"):].strip("/")
+            with db.lock:
+                if name.startswith("rpc/"):
+                    handler = getattr(db, f"rpc_{name[4:]}", None)
+                    if handler is None:
+                        self._error(f"Could not find the function {name[4:]}", 404, "PGRST202")
+                        return
+                    self._send(handler(self._body() or {}))
+                    return
+
+                if self.command == "GET":
+                    rows = db.filter_rows(name, filters)
+                    total = len(rows)
+                    for spec in reversed([s for s in options.get("order", "").split(",") if s]):
+                        column, *flags = spec.split(".")
+                        rows.sort(
+                            key=lambda r: (r.get(column) is None, r.get(column) if r.get(column) is not None else 0),
+                            reverse="desc" in flags
+                        )
+                    offset = int(options.get("offset", 0))
+                    limit = int(options["limit"]) if "limit" in options else None
+                    rows = rows[offset:offset + limit if limit is not None else None]
+                    self._respond_rows(name, rows, options, total)
+                elif self.command == "POST":
+                    body = self._body()
+                    rows = body if isinstance(body, list) else [body]
+                    resolution = self._prefer().get("resolution")
+                    written = db.insert(name, rows, options.get("on_conflict"), resolution)
+                    self._respond_rows(name, written, options)
+                elif self.command == "PATCH":
+                    rows = db.filter_rows(name, filters)
+                    changes = self._body() or {}
+                    for row in rows:
+                        row.update(changes)
+                    self._respond_rows(name, rows, options)
+                elif self.command == "DELETE":
+                    rows = db.filter_rows(name, filters)
+                    ids = {id(row) for row in rows}
+                    db.tables[name] = [row for row in db.tables[name] if id(row) not in ids]
+                    self._respond_rows(name, rows, options)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        def do_HEAD(self):
+            self._handle()
+
+    return Handler
+
+
+def make_server(port: int = 54321, latency_ms: float = 0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    가짜 PostgREST 서버 생성 (serve_forever는 호출자가 실행, port=0이면 빈 포트 사용)
+
+    Returns:
+        ThreadingHTTPServer (server.db에 테이블/호출 통계)
+    """
+    db = FakeDatabase()
+    server = ThreadingHTTPServer((host, port), make_handler(db, latency_ms))
+    server.daemon_threads = True
+    server.db = db
+    return server
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="로컬 Supabase(PostgREST) 가짜 서버")
+    parser.add_argument("--port", type=int, default=54321, help="포트")
+    parser.add_argument("--latency-ms", type=float, default=0, help="요청마다 추가할 왕복 지연(ms)")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency_ms)
+    print(f"가짜 PostgREST 서버: http://127.0.0.1:{server.server_address[1]} (Ctrl+C로 종료)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+-- ============================================
+-- Migration 001: search_memories 필터 파라미터
+-- source_types / exclude_tags를 RPC 내부에서 처리 (기존 DB 적용용)
+-- 신규 설치는 sql/schema.sql만 실행하면 됩니다.
+-- ============================================
+
+-- ============================================
+-- RAG 검색 함수 (RPC)
+-- source_types: 소스 타입 필터 (NULL이면 전체)
+-- exclude_tags: 연결된 checkin의 tags와 겹치면 제외 (예: '{__demo__}')
+-- 필터를 LIMIT 전에 적용하여 top-k가 정확하고, 검색당 1회 왕복
+-- ============================================
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID);
+
+CREATE OR REPLACE FUNCTION search_memories(
+    query_embedding vector(1536),
+    match_count INT DEFAULT 5,
+    match_threshold FLOAT DEFAULT 0.7,
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    source_type TEXT,
+    source_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    created_at TIMESTAMPTZ
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT 
+        me.id,
+        me.source_type,
+        me.source_id,
+        me.content,
+        1 - (me.embedding <=> query_embedding) AS similarity,
+        me.created_at
+    FROM memory_embeddings me
+    LEFT JOIN checkins c
+        ON exclude_tags IS NOT NULL
+        AND me.source_type IN ('checkin', 'extraction')
+        AND c.id = me.source_id
+    WHERE 
+        (user_id_filter IS NULL OR me.user_id = user_id_filter)
+        AND (source_types IS NULL OR me.source_type = ANY(source_types))
+        AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+        AND 1 - (me.embedding <=> query_embedding) > match_threshold
+    ORDER BY me.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,171 @@
+-- ============================================
+-- Migration 002: memory_embeddings HNSW 인덱스 + 파라미터 자동 튜닝
+-- 기존 ivfflat(lists = 100) 인덱스를 HNSW로 교체하고,
+-- search_memories가 vector_index_settings 값을 세션 단위로 적용하도록 변경
+--
+-- ivfflat을 유지하려면 아래 HNSW 블록 대신 다음을 실행한 뒤
+-- SELECT tune_memory_index(rebuild => true); 로 lists를 행 수에 맞게 재생성:
+--   CREATE INDEX idx_memory_embeddings_vector ON memory_embeddings
+--   USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+-- ============================================
+
+DROP INDEX IF EXISTS idx_memory_embeddings_vector;
+
+CREATE INDEX IF NOT EXISTS idx_memory_embeddings_hnsw
+ON memory_embeddings USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+-- ============================================
+-- 벡터 인덱스 파라미터 자동 튜닝
+-- tune_memory_index(): 행 수 기반으로 lists/probes 또는 ef_search 결정 (SQL Editor / service role 전용)
+-- search_memories가 매 호출 시 세션(트랜잭션) 단위로 적용
+-- ============================================
+CREATE TABLE IF NOT EXISTS vector_index_settings (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    index_type TEXT NOT NULL DEFAULT 'hnsw',  -- 'hnsw', 'ivfflat'
+    lists INTEGER,
+    probes INTEGER DEFAULT 10,
+    ef_search INTEGER DEFAULT 40,
+    row_count BIGINT DEFAULT 0,
+    tuned_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO vector_index_settings (id) VALUES (1)
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE vector_index_settings ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "vector_index_settings_select_all" ON vector_index_settings
+    FOR SELECT USING (true);
+
+CREATE OR REPLACE FUNCTION tune_memory_index(rebuild BOOLEAN DEFAULT false)
+RETURNS vector_index_settings
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    n BIGINT;
+    idx_type TEXT;
+    new_lists INT;
+    new_probes INT;
+    new_ef INT;
+    result vector_index_settings;
+BEGIN
+    -- SQL 전용 관리 작업: service role 또는 SQL Editor(postgres 직접 접속)만 허용
+    -- (API 역할은 아래 REVOKE로 EXECUTE 권한이 없음, 권한이 다시 부여되더라도 여기서 차단)
+    -- SECURITY DEFINER 안에서 current_user는 함수 소유자이므로 JWT의 role(auth.role())로 판단
+    IF COALESCE(auth.role(), '') <> 'service_role' AND session_user <> 'postgres' THEN
+        RAISE EXCEPTION 'tune_memory_index: service role / SQL Editor only';
+    END IF;
+
+    SELECT COUNT(*) INTO n FROM memory_embeddings;
+
+    SELECT CASE WHEN indexdef ILIKE '%USING ivfflat%' THEN 'ivfflat' ELSE 'hnsw' END
+    INTO idx_type
+    FROM pg_indexes
+    WHERE tablename = 'memory_embeddings'
+    AND (indexdef ILIKE '%USING hnsw%' OR indexdef ILIKE '%USING ivfflat%')
+    LIMIT 1;
+    idx_type := COALESCE(idx_type, 'hnsw');
+
+    -- pgvector 권장값: lists = rows/1000 (100만 이하), sqrt(rows) (그 이상), probes = sqrt(lists)
+    new_lists := GREATEST(10, CASE
+        WHEN n <= 1000000 THEN (n / 1000)::INT
+        ELSE sqrt(n)::INT
+    END);
+    new_probes := GREATEST(1, ceil(sqrt(new_lists))::INT);
+
+    -- HNSW: 데이터가 많을수록 ef_search를 높여 recall 유지
+    new_ef := CASE
+        WHEN n < 10000 THEN 40
+        WHEN n < 100000 THEN 64
+        WHEN n < 1000000 THEN 100
+        ELSE 200
+    END;
+
+    IF rebuild AND idx_type = 'ivfflat' THEN
+        EXECUTE 'DROP INDEX IF EXISTS idx_memory_embeddings_vector';
+        EXECUTE format(
+            'CREATE INDEX idx_memory_embeddings_vector ON memory_embeddings '
+            'USING ivfflat (embedding vector_cosine_ops) WITH (lists = %s)',
+            new_lists
+        );
+    END IF;
+
+    UPDATE vector_index_settings
+    SET index_type = idx_type,
+        lists = new_lists,
+        probes = new_probes,
+        ef_search = new_ef,
+        row_count = n,
+        tuned_at = NOW()
+    WHERE id = 1
+    RETURNING * INTO result;
+
+    RETURN result;
+END;
+$$;
+
+-- 인덱스 DROP/CREATE가 가능한 함수이므로 API 역할의 직접 호출 차단 (service role / SQL Editor 전용)
+REVOKE EXECUTE ON FUNCTION tune_memory_index(BOOLEAN) FROM PUBLIC, anon, authenticated;
+
+
+-- ============================================
+-- RAG 검색 함수 (RPC)
+-- source_types: 소스 타입 필터 (NULL이면 전체)
+-- exclude_tags: 연결된 checkin의 tags와 겹치면 제외 (예: '{__demo__}')
+-- 필터를 LIMIT 전에 적용하여 top-k가 정확하고, 검색당 1회 왕복
+-- ============================================
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID);
+
+CREATE OR REPLACE FUNCTION search_memories(
+    query_embedding vector(1536),
+    match_count INT DEFAULT 5,
+    match_threshold FLOAT DEFAULT 0.7,
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    source_type TEXT,
+    source_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    created_at TIMESTAMPTZ
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    cfg vector_index_settings;
+BEGIN
+    -- 튜닝된 인덱스 파라미터를 이 트랜잭션에만 적용
+    SELECT * INTO cfg FROM vector_index_settings WHERE vector_index_settings.id = 1;
+    IF FOUND THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(cfg.ef_search, match_count)::TEXT, true);
+        PERFORM set_config('ivfflat.probes', cfg.probes::TEXT, true);
+    END IF;
+
+    RETURN QUERY
+    SELECT 
+        me.id,
+        me.source_type,
+        me.source_id,
+        me.content,
+        1 - (me.embedding <=> query_embedding) AS similarity,
+        me.created_at
+    FROM memory_embeddings me
+    LEFT JOIN checkins c
+        ON exclude_tags IS NOT NULL
+        AND me.source_type IN ('checkin', 'extraction')
+        AND c.id = me.source_id
+    WHERE 
+        (user_id_filter IS NULL OR me.user_id = user_id_filter)
+        AND (source_types IS NULL OR me.source_type = ANY(source_types))
+        AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+        AND 1 - (me.embedding <=> query_embedding) > match_threshold
+    ORDER BY me.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,122 @@
+-- ============================================
+-- Migration 003: 하이브리드(lexical + vector) 검색
+-- pg_trgm 인덱스(memory_chunks.content)와 search_memories_hybrid RPC 추가
+-- ============================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_memory_chunks_content_trgm ON memory_chunks USING GIN (content gin_trgm_ops);
+
+-- ============================================
+-- 하이브리드 검색 함수 (RPC)
+-- vector(memory_embeddings) + lexical(memory_chunks 트라이그램) 순위를
+-- reciprocal-rank fusion(1 / (rrf_k + rank))으로 합산, 소스별 1행
+-- ============================================
+CREATE OR REPLACE FUNCTION search_memories_hybrid(
+    query_text TEXT,
+    query_embedding vector(1536),
+    match_count INT DEFAULT 5,
+    match_threshold FLOAT DEFAULT 0.5,
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL,
+    candidate_count INT DEFAULT 20,
+    rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+    id UUID,
+    source_type TEXT,
+    source_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    created_at TIMESTAMPTZ,
+    score FLOAT,
+    vector_rank INT,
+    lexical_rank INT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    cfg vector_index_settings;
+    like_pattern TEXT;
+BEGIN
+    SELECT * INTO cfg FROM vector_index_settings WHERE vector_index_settings.id = 1;
+    IF FOUND THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(cfg.ef_search, candidate_count)::TEXT, true);
+        PERFORM set_config('ivfflat.probes', cfg.probes::TEXT, true);
+    END IF;
+    -- 한국어는 단어가 짧아 기본 임계값(0.6)이 너무 높음
+    PERFORM set_config('pg_trgm.word_similarity_threshold', '0.3', true);
+
+    like_pattern := '%' || replace(replace(replace(query_text, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+    RETURN QUERY
+    WITH vec_raw AS (
+        SELECT
+            me.id, me.source_type, me.source_id, me.content, me.created_at,
+            me.embedding <=> query_embedding AS distance
+        FROM memory_embeddings me
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND me.source_type IN ('checkin', 'extraction')
+            AND c.id = me.source_id
+        WHERE
+            (user_id_filter IS NULL OR me.user_id = user_id_filter)
+            AND (source_types IS NULL OR me.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND 1 - (me.embedding <=> query_embedding) > match_threshold
+        ORDER BY me.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    vec AS (
+        SELECT d.*, (row_number() OVER (ORDER BY d.distance))::INT AS rnk
+        FROM (
+            SELECT DISTINCT ON (v.source_type, v.source_id) v.*
+            FROM vec_raw v
+            ORDER BY v.source_type, v.source_id, v.distance
+        ) d
+    ),
+    lex_raw AS (
+        SELECT
+            mc.id, mc.source_type, mc.source_id, mc.content, mc.created_at,
+            (mc.content ILIKE like_pattern) AS exact_match,
+            word_similarity(query_text, mc.content) AS lex_score
+        FROM memory_chunks mc
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND mc.source_type IN ('checkin', 'extraction')
+            AND c.id = mc.source_id
+        WHERE
+            (user_id_filter IS NULL OR mc.user_id = user_id_filter)
+            AND (source_types IS NULL OR mc.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND (query_text <% mc.content OR mc.content ILIKE like_pattern)
+        ORDER BY exact_match DESC, lex_score DESC
+        LIMIT candidate_count
+    ),
+    lex AS (
+        SELECT d.*, (row_number() OVER (ORDER BY d.exact_match DESC, d.lex_score DESC))::INT AS rnk
+        FROM (
+            SELECT DISTINCT ON (l.source_type, l.source_id) l.*
+            FROM lex_raw l
+            ORDER BY l.source_type, l.source_id, l.exact_match DESC, l.lex_score DESC
+        ) d
+    )
+    SELECT
+        COALESCE(v.id, l.id),
+        COALESCE(v.source_type, l.source_type),
+        COALESCE(v.source_id, l.source_id),
+        COALESCE(v.content, l.content),
+        COALESCE(1 - v.distance, 0)::FLOAT AS similarity,
+        COALESCE(v.created_at, l.created_at),
+        (COALESCE(1.0 / (rrf_k + v.rnk), 0) + COALESCE(1.0 / (rrf_k + l.rnk), 0))::FLOAT AS score,
+        v.rnk,
+        l.rnk
+    FROM vec v
+    FULL OUTER JOIN lex l
+        ON v.source_type = l.source_type AND v.source_id = l.source_id
+    ORDER BY 7 DESC  -- score
+    LIMIT match_count;
+END;
+$$;
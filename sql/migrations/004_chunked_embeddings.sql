@@ -0,0 +1,91 @@
+-- ============================================
+-- Migration 004: 청크 단위 임베딩
+-- memory_embeddings.chunk_index 추가, search_memories가 소스별 1행으로 합치도록 변경
+-- ============================================
+
+ALTER TABLE memory_embeddings ADD COLUMN IF NOT EXISTS chunk_index INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_memory_embeddings_source ON memory_embeddings(source_type, source_id);
+
+-- ============================================
+-- RAG 검색 함수 (RPC)
+-- source_types: 소스 타입 필터 (NULL이면 전체)
+-- exclude_tags: 연결된 checkin의 tags와 겹치면 제외 (예: '{__demo__}')
+-- 필터를 LIMIT 전에 적용하여 top-k가 정확하고, 검색당 1회 왕복
+-- 청크 단위로 검색한 뒤 소스별 가장 가까운 청크 1행으로 합침
+-- ============================================
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID);
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID, TEXT[], TEXT[]);
+
+CREATE OR REPLACE FUNCTION search_memories(
+    query_embedding vector(1536),
+    match_count INT DEFAULT 5,
+    match_threshold FLOAT DEFAULT 0.7,
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    source_type TEXT,
+    source_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    created_at TIMESTAMPTZ,
+    chunk_index INT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    cfg vector_index_settings;
+BEGIN
+    -- 튜닝된 인덱스 파라미터를 이 트랜잭션에만 적용
+    SELECT * INTO cfg FROM vector_index_settings WHERE vector_index_settings.id = 1;
+    IF FOUND THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(cfg.ef_search, match_count * 4)::TEXT, true);
+        PERFORM set_config('ivfflat.probes', cfg.probes::TEXT, true);
+    END IF;
+
+    RETURN QUERY
+    WITH candidates AS (
+        -- 한 소스가 여러 청크로 top-k를 채우지 않도록 여유 있게 후보 조회
+        SELECT 
+            me.id,
+            me.source_type,
+            me.source_id,
+            me.content,
+            me.embedding <=> query_embedding AS distance,
+            me.created_at,
+            me.chunk_index
+        FROM memory_embeddings me
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND me.source_type IN ('checkin', 'extraction')
+            AND c.id = me.source_id
+        WHERE 
+            (user_id_filter IS NULL OR me.user_id = user_id_filter)
+            AND (source_types IS NULL OR me.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND 1 - (me.embedding <=> query_embedding) > match_threshold
+        ORDER BY me.embedding <=> query_embedding
+        LIMIT match_count * 4
+    ),
+    best_per_source AS (
+        SELECT DISTINCT ON (cd.source_type, cd.source_id) cd.*
+        FROM candidates cd
+        ORDER BY cd.source_type, cd.source_id, cd.distance
+    )
+    SELECT
+        b.id,
+        b.source_type,
+        b.source_id,
+        b.content,
+        1 - b.distance AS similarity,
+        b.created_at,
+        b.chunk_index
+    FROM best_per_source b
+    ORDER BY b.distance
+    LIMIT match_count;
+END;
+$$;
@@ -0,0 +1,104 @@
+-- ============================================
+-- Migration 006: memory_chunks / memory_embeddings 멱등 upsert
+-- content_hash 컬럼 + (user_id, source_type, source_id, chunk_index, content_hash) 유니크 제약
+-- replace_memory_chunks RPC 추가
+-- ============================================
+
+ALTER TABLE memory_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE memory_embeddings ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- 기존 row 해시 채우기 (Python hashlib.sha256(content.encode("utf-8")).hexdigest()와 동일)
+UPDATE memory_chunks SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+WHERE content_hash IS NULL;
+UPDATE memory_embeddings SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+WHERE content_hash IS NULL;
+
+-- 동시 저장으로 생긴 중복 row 정리 (가장 먼저 만들어진 1건 유지)
+DELETE FROM memory_chunks a
+USING memory_chunks b
+WHERE a.user_id = b.user_id
+AND a.source_type = b.source_type
+AND a.source_id = b.source_id
+AND a.chunk_index IS NOT DISTINCT FROM b.chunk_index
+AND a.content_hash = b.content_hash
+AND (a.created_at, a.id) > (b.created_at, b.id);
+
+DELETE FROM memory_embeddings a
+USING memory_embeddings b
+WHERE a.user_id = b.user_id
+AND a.source_type = b.source_type
+AND a.source_id = b.source_id
+AND a.chunk_index IS NOT DISTINCT FROM b.chunk_index
+AND a.content_hash = b.content_hash
+AND (a.created_at, a.id) > (b.created_at, b.id);
+
+ALTER TABLE memory_chunks
+    ADD CONSTRAINT memory_chunks_content_key UNIQUE (user_id, source_type, source_id, chunk_index, content_hash);
+ALTER TABLE memory_embeddings
+    ADD CONSTRAINT memory_embeddings_content_key UNIQUE (user_id, source_type, source_id, chunk_index, content_hash);
+
+-- ============================================
+-- 청크 교체 함수 (RPC)
+-- 소스 1건의 청크/임베딩을 한 번에 upsert하고, 새 목록에 없는 stale 청크 삭제
+-- (select → 비교 → delete → insert 왕복 대신 1회 호출, 동시 저장에도 안전)
+-- SECURITY INVOKER: RLS로 본인 데이터만 변경 가능
+-- chunks: [{chunk_index, content, content_hash, embedding, metadata}]
+-- ============================================
+CREATE OR REPLACE FUNCTION replace_memory_chunks(
+    p_user_id UUID,
+    p_source_type TEXT,
+    p_source_id UUID,
+    chunks JSONB
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted INT;
+BEGIN
+    INSERT INTO memory_chunks (user_id, source_type, source_id, content, chunk_index, content_hash, metadata)
+    SELECT
+        p_user_id, p_source_type, p_source_id,
+        elem->>'content',
+        (elem->>'chunk_index')::INT,
+        elem->>'content_hash',
+        COALESCE(elem->'metadata', '{}'::JSONB)
+    FROM jsonb_array_elements(chunks) AS elem
+    ON CONFLICT ON CONSTRAINT memory_chunks_content_key DO NOTHING;
+
+    INSERT INTO memory_embeddings (user_id, source_type, source_id, content, chunk_index, content_hash, embedding)
+    SELECT
+        p_user_id, p_source_type, p_source_id,
+        elem->>'content',
+        (elem->>'chunk_index')::INT,
+        elem->>'content_hash',
+        (elem->>'embedding')::vector
+    FROM jsonb_array_elements(chunks) AS elem
+    WHERE elem ? 'embedding'
+    ON CONFLICT ON CONSTRAINT memory_embeddings_content_key DO NOTHING;
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+
+    -- 새 청크 목록에 없는 (chunk_index, content_hash) 조합은 stale
+    DELETE FROM memory_chunks mc
+    WHERE mc.user_id = p_user_id
+    AND mc.source_type = p_source_type
+    AND mc.source_id = p_source_id
+    AND NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(chunks) AS elem
+        WHERE (elem->>'chunk_index')::INT = mc.chunk_index
+        AND elem->>'content_hash' = mc.content_hash
+    );
+
+    DELETE FROM memory_embeddings me
+    WHERE me.user_id = p_user_id
+    AND me.source_type = p_source_type
+    AND me.source_id = p_source_id
+    AND NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(chunks) AS elem
+        WHERE (elem->>'chunk_index')::INT = me.chunk_index
+        AND elem->>'content_hash' = me.content_hash
+    );
+
+    RETURN inserted;
+END;
+$$;
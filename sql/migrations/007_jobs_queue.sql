@@ -0,0 +1,93 @@
+-- ============================================
+-- Migration 007: 백그라운드 작업 큐
+-- jobs 테이블 + claim_jobs RPC (FOR UPDATE SKIP LOCKED)
+-- ============================================
+
+-- ============================================
+-- jobs - 백그라운드 작업 큐 (자동 인덱싱 등)
+-- 워커(python -m lib.worker)가 claim_jobs()로 FOR UPDATE SKIP LOCKED 선점
+-- ============================================
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    job_type TEXT NOT NULL,  -- 'index_checkin'
+    payload JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- 재시도 backoff 시각
+    locked_at TIMESTAMPTZ,
+    locked_by TEXT,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_claimable ON jobs(run_after)
+    WHERE status IN ('pending', 'running');
+
+ALTER TABLE jobs ENABLE ROW LEVEL SECURITY;
+
+-- 사용자는 본인 작업 등록/상태 조회만 가능 (처리는 service role 워커)
+CREATE POLICY "jobs_select_own" ON jobs
+    FOR SELECT USING (auth.uid() = user_id);
+CREATE POLICY "jobs_insert_own" ON jobs
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+
+-- ============================================
+-- 작업 선점 함수 (워커 전용 RPC)
+-- 실행 가능한 pending 작업 + lock_timeout이 지난 running 작업(죽은 워커)을
+-- FOR UPDATE SKIP LOCKED로 선점 → 여러 워커가 같은 작업을 잡지 않음
+-- 재선점도 attempts < max_attempts일 때만 (초과한 stale 작업은 failed)
+-- ============================================
+CREATE OR REPLACE FUNCTION claim_jobs(
+    worker_id TEXT,
+    batch_size INT DEFAULT 5,
+    lock_timeout_seconds INT DEFAULT 600
+)
+RETURNS SETOF jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- 재시도 횟수를 다 쓴 채 멈춘 running 작업(매번 워커를 죽이는 작업)은 다시 잡지 않고 failed 처리
+    UPDATE jobs
+    SET status = 'failed',
+        last_error = COALESCE(last_error, 'lock timeout: max_attempts 초과'),
+        locked_at = NULL,
+        locked_by = NULL
+    WHERE status = 'running'
+    AND attempts >= max_attempts
+    AND locked_at < NOW() - make_interval(secs => lock_timeout_seconds);
+
+    RETURN QUERY
+    UPDATE jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_at = NOW(),
+        locked_by = worker_id
+    WHERE j.id IN (
+        SELECT c.id
+        FROM jobs c
+        WHERE (c.status = 'pending' AND c.run_after <= NOW())
+        OR (
+            c.status = 'running'
+            AND c.locked_at < NOW() - make_interval(secs => lock_timeout_seconds)
+            AND c.attempts < c.max_attempts
+        )
+        ORDER BY c.run_after
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION claim_jobs(TEXT, INT, INT) FROM PUBLIC, anon, authenticated;
+
+
+CREATE TRIGGER update_jobs_updated_at
+    BEFORE UPDATE ON jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,26 @@
+-- ============================================
+-- Migration 008: LLM 응답 캐시 테이블
+-- 만료 항목 정리: DELETE FROM llm_response_cache WHERE expires_at < NOW();
+-- ============================================
+
+-- ============================================
+-- llm_response_cache - LLM 응답 캐시 (선택: [cache] llm_use_supabase)
+-- key = sha256(model + messages + schema + temperature + max_tokens)
+-- ============================================
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    cache_key TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response JSONB NOT NULL,  -- 텍스트 응답은 JSON 문자열로 저장
+    usage JSONB DEFAULT '{}',  -- {prompt_tokens, completion_tokens} (절약량 집계용)
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, cache_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires ON llm_response_cache(expires_at);
+
+ALTER TABLE llm_response_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "llm_response_cache_own" ON llm_response_cache
+    FOR ALL USING (auth.uid() = user_id);
@@ -0,0 +1,33 @@
+-- ============================================
+-- Migration 010: 저장된 주간 리포트
+-- weekly_reports 테이블 (입력 해시가 같으면 LLM 재호출 없이 재사용)
+-- ============================================
+
+-- ============================================
+-- weekly_reports - 저장된 주간 리포트
+-- (user_id, start_date, end_date, exclude_demo)당 1행, 지난 주 조회는 인덱스 1회 읽기
+-- input_hash = sha256(체크인/추출 입력) → 입력이 바뀐 경우에만 LLM으로 다시 생성
+-- ============================================
+CREATE TABLE IF NOT EXISTS weekly_reports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    exclude_demo BOOLEAN NOT NULL DEFAULT TRUE,
+    report JSONB NOT NULL,  -- generate_weekly_report_json 결과
+    source_checkins JSONB NOT NULL DEFAULT '[]',  -- 근거 표시용 체크인 요약 [{id, created_at, mood, content, tags}]
+    input_hash TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (user_id, start_date, end_date, exclude_demo)
+);
+
+ALTER TABLE weekly_reports ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "weekly_reports_own" ON weekly_reports
+    FOR ALL USING (auth.uid() = user_id);
+
+CREATE TRIGGER update_weekly_reports_updated_at
+    BEFORE UPDATE ON weekly_reports
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
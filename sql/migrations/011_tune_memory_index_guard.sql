@@ -0,0 +1,77 @@
+-- ============================================
+-- Migration 011: tune_memory_index 호출 제한
+-- anon 키 호출(auth.uid() IS NULL)이 관리자 검사를 통과하던 문제 수정
+-- - JWT 없는 호출은 service role / SQL Editor만 허용
+-- - API 역할(anon, authenticated)의 EXECUTE 권한 회수
+-- ============================================
+
+CREATE OR REPLACE FUNCTION tune_memory_index(rebuild BOOLEAN DEFAULT false)
+RETURNS vector_index_settings
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    n BIGINT;
+    idx_type TEXT;
+    new_lists INT;
+    new_probes INT;
+    new_ef INT;
+    result vector_index_settings;
+BEGIN
+    -- SQL 전용 관리 작업: service role 또는 SQL Editor(postgres 직접 접속)만 허용
+    -- (API 역할은 아래 REVOKE로 EXECUTE 권한이 없음, 권한이 다시 부여되더라도 여기서 차단)
+    -- SECURITY DEFINER 안에서 current_user는 함수 소유자이므로 JWT의 role(auth.role())로 판단
+    IF COALESCE(auth.role(), '') <> 'service_role' AND session_user <> 'postgres' THEN
+        RAISE EXCEPTION 'tune_memory_index: service role / SQL Editor only';
+    END IF;
+
+    SELECT COUNT(*) INTO n FROM memory_embeddings;
+
+    SELECT CASE WHEN indexdef ILIKE '%USING ivfflat%' THEN 'ivfflat' ELSE 'hnsw' END
+    INTO idx_type
+    FROM pg_indexes
+    WHERE tablename = 'memory_embeddings'
+    AND (indexdef ILIKE '%USING hnsw%' OR indexdef ILIKE '%USING ivfflat%')
+    LIMIT 1;
+    idx_type := COALESCE(idx_type, 'hnsw');
+
+    -- pgvector 권장값: lists = rows/1000 (100만 이하), sqrt(rows) (그 이상), probes = sqrt(lists)
+    new_lists := GREATEST(10, CASE
+        WHEN n <= 1000000 THEN (n / 1000)::INT
+        ELSE sqrt(n)::INT
+    END);
+    new_probes := GREATEST(1, ceil(sqrt(new_lists))::INT);
+
+    -- HNSW: 데이터가 많을수록 ef_search를 높여 recall 유지
+    new_ef := CASE
+        WHEN n < 10000 THEN 40
+        WHEN n < 100000 THEN 64
+        WHEN n < 1000000 THEN 100
+        ELSE 200
+    END;
+
+    IF rebuild AND idx_type = 'ivfflat' THEN
+        EXECUTE 'DROP INDEX IF EXISTS idx_memory_embeddings_vector';
+        EXECUTE format(
+            'CREATE INDEX idx_memory_embeddings_vector ON memory_embeddings '
+            'USING ivfflat (embedding vector_cosine_ops) WITH (lists = %s)',
+            new_lists
+        );
+    END IF;
+
+    UPDATE vector_index_settings
+    SET index_type = idx_type,
+        lists = new_lists,
+        probes = new_probes,
+        ef_search = new_ef,
+        row_count = n,
+        tuned_at = NOW()
+    WHERE id = 1
+    RETURNING * INTO result;
+
+    RETURN result;
+END;
+$$;
+
+-- 인덱스 DROP/CREATE가 가능한 함수이므로 API 역할의 직접 호출 차단 (service role / SQL Editor 전용)
+REVOKE EXECUTE ON FUNCTION tune_memory_index(BOOLEAN) FROM PUBLIC, anon, authenticated;
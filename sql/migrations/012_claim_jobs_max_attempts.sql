@@ -0,0 +1,54 @@
+-- ============================================
+-- Migration 012: claim_jobs 재시도 상한
+-- lock_timeout이 지난 running 작업을 max_attempts와 무관하게 다시 선점하던 문제 수정
+-- ============================================
+
+-- ============================================
+-- 작업 선점 함수 (워커 전용 RPC)
+-- 실행 가능한 pending 작업 + lock_timeout이 지난 running 작업(죽은 워커)을
+-- FOR UPDATE SKIP LOCKED로 선점 → 여러 워커가 같은 작업을 잡지 않음
+-- 재선점도 attempts < max_attempts일 때만 (초과한 stale 작업은 failed)
+-- ============================================
+CREATE OR REPLACE FUNCTION claim_jobs(
+    worker_id TEXT,
+    batch_size INT DEFAULT 5,
+    lock_timeout_seconds INT DEFAULT 600
+)
+RETURNS SETOF jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- 재시도 횟수를 다 쓴 채 멈춘 running 작업(매번 워커를 죽이는 작업)은 다시 잡지 않고 failed 처리
+    UPDATE jobs
+    SET status = 'failed',
+        last_error = COALESCE(last_error, 'lock timeout: max_attempts 초과'),
+        locked_at = NULL,
+        locked_by = NULL
+    WHERE status = 'running'
+    AND attempts >= max_attempts
+    AND locked_at < NOW() - make_interval(secs => lock_timeout_seconds);
+
+    RETURN QUERY
+    UPDATE jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_at = NOW(),
+        locked_by = worker_id
+    WHERE j.id IN (
+        SELECT c.id
+        FROM jobs c
+        WHERE (c.status = 'pending' AND c.run_after <= NOW())
+        OR (
+            c.status = 'running'
+            AND c.locked_at < NOW() - make_interval(secs => lock_timeout_seconds)
+            AND c.attempts < c.max_attempts
+        )
+        ORDER BY c.run_after
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION claim_jobs(TEXT, INT, INT) FROM PUBLIC, anon, authenticated;
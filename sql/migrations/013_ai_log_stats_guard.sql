@@ -0,0 +1,63 @@
+-- ============================================
+-- Migration 013: ai_log_stats 호출 제한
+-- anon 키 호출(auth.uid() IS NULL)이 관리자 검사를 통과하던 문제 수정
+-- - JWT 없는 호출은 service role / SQL Editor만 허용
+-- - anon의 EXECUTE 권한 회수
+-- ============================================
+
+-- ============================================
+-- AI 호출 통계 (관리자 전용 RPC)
+-- action별 호출 수, p50/p95 지연시간, 토큰 사용량, 캐시 적중, 오류
+-- ============================================
+CREATE OR REPLACE FUNCTION ai_log_stats(since TIMESTAMPTZ DEFAULT NOW() - INTERVAL '7 days')
+RETURNS TABLE (
+    action TEXT,
+    calls BIGINT,
+    errors BIGINT,
+    cache_hits BIGINT,
+    p50_ms DOUBLE PRECISION,
+    p95_ms DOUBLE PRECISION,
+    input_tokens BIGINT,
+    output_tokens BIGINT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- 로그인 사용자는 admin만 허용
+    -- auth.uid()가 없으면 service role 또는 SQL Editor(postgres 직접 접속)만 허용 (anon 키 호출 차단)
+    -- SECURITY DEFINER 안에서 current_user는 함수 소유자이므로 JWT의 role(auth.role())로 판단
+    IF auth.uid() IS NULL THEN
+        IF COALESCE(auth.role(), '') <> 'service_role' AND session_user <> 'postgres' THEN
+            RAISE EXCEPTION 'ai_log_stats: admin only';
+        END IF;
+    ELSIF NOT EXISTS (
+        SELECT 1 FROM profiles
+        WHERE profiles.user_id = auth.uid()
+        AND profiles.role = 'admin'
+    ) THEN
+        RAISE EXCEPTION 'ai_log_stats: admin only';
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        l.action,
+        COUNT(*) AS calls,
+        COUNT(*) FILTER (WHERE l.status = 'error') AS errors,
+        COUNT(*) FILTER (WHERE l.cache_hit) AS cache_hits,
+        -- 지연시간 분위수는 실제 API 호출만 대상 (캐시 적중 제외)
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY l.latency_ms) FILTER (WHERE NOT l.cache_hit) AS p50_ms,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY l.latency_ms) FILTER (WHERE NOT l.cache_hit) AS p95_ms,
+        COALESCE(SUM(l.input_tokens), 0)::BIGINT AS input_tokens,
+        COALESCE(SUM(l.output_tokens), 0)::BIGINT AS output_tokens
+    FROM ai_logs l
+    WHERE l.created_at >= since
+    GROUP BY l.action
+    ORDER BY 2 DESC;  -- calls
+END;
+$$;
+
+-- 전체 사용자의 토큰/비용 합계를 읽는 함수이므로 anon 호출 차단
+-- (authenticated는 관리자 페이지용으로 유지, 함수 안에서 admin 여부 검사)
+REVOKE EXECUTE ON FUNCTION ai_log_stats(TIMESTAMPTZ) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION ai_log_stats(TIMESTAMPTZ) TO authenticated, service_role;
@@ -0,0 +1,76 @@
+-- ============================================
+-- Migration 014: 임베딩 모델 기록
+-- memory_embeddings 행마다 벡터를 만든 백엔드 모델을 기록
+-- - 기존 행은 OpenAI text-embedding-3-small로 간주
+-- - 앱은 저장된 모델과 현재 [embedding] backend가 다르면 인덱싱/검색을 거부
+-- ============================================
+
+ALTER TABLE memory_embeddings
+    ADD COLUMN IF NOT EXISTS embedding_model TEXT NOT NULL DEFAULT 'text-embedding-3-small';
+
+CREATE INDEX IF NOT EXISTS idx_memory_embeddings_model ON memory_embeddings(embedding_model);
+
+
+-- ============================================
+-- 청크 교체 함수 (RPC) - embedding_model 저장
+-- chunks: [{chunk_index, content, content_hash, embedding, embedding_model, metadata}]
+-- ============================================
+CREATE OR REPLACE FUNCTION replace_memory_chunks(
+    p_user_id UUID,
+    p_source_type TEXT,
+    p_source_id UUID,
+    chunks JSONB
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted INT;
+BEGIN
+    INSERT INTO memory_chunks (user_id, source_type, source_id, content, chunk_index, content_hash, metadata)
+    SELECT
+        p_user_id, p_source_type, p_source_id,
+        elem->>'content',
+        (elem->>'chunk_index')::INT,
+        elem->>'content_hash',
+        COALESCE(elem->'metadata', '{}'::JSONB)
+    FROM jsonb_array_elements(chunks) AS elem
+    ON CONFLICT ON CONSTRAINT memory_chunks_content_key DO NOTHING;
+
+    INSERT INTO memory_embeddings (user_id, source_type, source_id, content, chunk_index, content_hash, embedding, embedding_model)
+    SELECT
+        p_user_id, p_source_type, p_source_id,
+        elem->>'content',
+        (elem->>'chunk_index')::INT,
+        elem->>'content_hash',
+        (elem->>'embedding')::vector,
+        COALESCE(elem->>'embedding_model', 'text-embedding-3-small')
+    FROM jsonb_array_elements(chunks) AS elem
+    WHERE elem ? 'embedding'
+    ON CONFLICT ON CONSTRAINT memory_embeddings_content_key DO NOTHING;
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+
+    -- 새 청크 목록에 없는 (chunk_index, content_hash) 조합은 stale
+    DELETE FROM memory_chunks mc
+    WHERE mc.user_id = p_user_id
+    AND mc.source_type = p_source_type
+    AND mc.source_id = p_source_id
+    AND NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(chunks) AS elem
+        WHERE (elem->>'chunk_index')::INT = mc.chunk_index
+        AND elem->>'content_hash' = mc.content_hash
+    );
+
+    DELETE FROM memory_embeddings me
+    WHERE me.user_id = p_user_id
+    AND me.source_type = p_source_type
+    AND me.source_id = p_source_id
+    AND NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(chunks) AS elem
+        WHERE (elem->>'chunk_index')::INT = me.chunk_index
+        AND elem->>'content_hash' = me.content_hash
+    );
+
+    RETURN inserted;
+END;
+$$;
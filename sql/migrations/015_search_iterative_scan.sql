@@ -0,0 +1,236 @@
+-- ============================================
+-- Migration 015: 필터 검색 recall (iterative scan)
+-- HNSW는 ef_search개 후보만 돌려주고 user_id/source_types/exclude_tags/임계값 필터는 그 뒤에 적용됨
+-- → 모든 사용자가 공유하는 테이블에서 기록이 적은 사용자는 결과가 모자라거나 비어 있었음
+-- search_memories / search_memories_hybrid가 pgvector 0.8+ iterative scan(relaxed_order)을 사용
+-- ============================================
+
+-- ============================================
+-- RAG 검색 함수 (RPC)
+-- source_types: 소스 타입 필터 (NULL이면 전체)
+-- exclude_tags: 연결된 checkin의 tags와 겹치면 제외 (예: '{__demo__}')
+-- 필터를 LIMIT 전에 적용하여 top-k가 정확하고, 검색당 1회 왕복
+-- 청크 단위로 검색한 뒤 소스별 가장 가까운 청크 1행으로 합침
+-- include_embeddings: true면 MMR 컨텍스트 선택용 embedding 반환
+-- ============================================
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID);
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID, TEXT[], TEXT[]);
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID, TEXT[], TEXT[], BOOLEAN);
+
+CREATE OR REPLACE FUNCTION search_memories(
+    query_embedding vector(1536),
+    match_count INT DEFAULT 5,
+    match_threshold FLOAT DEFAULT 0.7,
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL,
+    include_embeddings BOOLEAN DEFAULT false
+)
+RETURNS TABLE (
+    id UUID,
+    source_type TEXT,
+    source_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    created_at TIMESTAMPTZ,
+    chunk_index INT,
+    embedding vector(1536)
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    cfg vector_index_settings;
+BEGIN
+    -- 튜닝된 인덱스 파라미터를 이 트랜잭션에만 적용
+    SELECT * INTO cfg FROM vector_index_settings WHERE vector_index_settings.id = 1;
+    IF FOUND THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(cfg.ef_search, match_count * 4)::TEXT, true);
+        PERFORM set_config('ivfflat.probes', cfg.probes::TEXT, true);
+    END IF;
+
+    -- 사용자/소스/태그 필터는 인덱스 후보를 뽑은 뒤 적용되므로, 공유 테이블에서 데이터가 적은 사용자는
+    -- ef_search 후보 안에 자기 행이 거의 없음 → 필터를 통과한 행이 충분할 때까지 인덱스를 계속 탐색
+    -- (pgvector 0.8+ iterative scan, 순서는 아래 ORDER BY가 다시 정렬 / 이전 버전은 설정 무시)
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+        PERFORM set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+
+    RETURN QUERY
+    WITH candidates AS (
+        -- 한 소스가 여러 청크로 top-k를 채우지 않도록 여유 있게 후보 조회
+        SELECT 
+            me.id,
+            me.source_type,
+            me.source_id,
+            me.content,
+            me.embedding <=> query_embedding AS distance,
+            me.created_at,
+            me.chunk_index,
+            me.embedding
+        FROM memory_embeddings me
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND me.source_type IN ('checkin', 'extraction')
+            AND c.id = me.source_id
+        WHERE 
+            (user_id_filter IS NULL OR me.user_id = user_id_filter)
+            AND (source_types IS NULL OR me.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND 1 - (me.embedding <=> query_embedding) > match_threshold
+        ORDER BY me.embedding <=> query_embedding
+        LIMIT match_count * 4
+    ),
+    best_per_source AS (
+        SELECT DISTINCT ON (cd.source_type, cd.source_id) cd.*
+        FROM candidates cd
+        ORDER BY cd.source_type, cd.source_id, cd.distance
+    )
+    SELECT
+        b.id,
+        b.source_type,
+        b.source_id,
+        b.content,
+        1 - b.distance AS similarity,
+        b.created_at,
+        b.chunk_index,
+        -- MMR(중복 제거) 선택용 벡터는 요청 시에만 반환
+        CASE WHEN include_embeddings THEN b.embedding END
+    FROM best_per_source b
+    ORDER BY b.distance
+    LIMIT match_count;
+END;
+$$;
+
+
+-- ============================================
+-- 하이브리드 검색 함수 (RPC)
+-- vector(memory_embeddings) + lexical(memory_chunks 트라이그램) 순위를
+-- reciprocal-rank fusion(1 / (rrf_k + rank))으로 합산, 소스별 1행
+-- ============================================
+DROP FUNCTION IF EXISTS search_memories_hybrid(TEXT, vector, INT, FLOAT, UUID, TEXT[], TEXT[], INT, INT);
+
+CREATE OR REPLACE FUNCTION search_memories_hybrid(
+    query_text TEXT,
+    query_embedding vector(1536),
+    match_count INT DEFAULT 5,
+    match_threshold FLOAT DEFAULT 0.5,
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL,
+    candidate_count INT DEFAULT 20,
+    rrf_k INT DEFAULT 60,
+    include_embeddings BOOLEAN DEFAULT false
+)
+RETURNS TABLE (
+    id UUID,
+    source_type TEXT,
+    source_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    created_at TIMESTAMPTZ,
+    score FLOAT,
+    vector_rank INT,
+    lexical_rank INT,
+    embedding vector(1536)
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    cfg vector_index_settings;
+    like_pattern TEXT;
+BEGIN
+    SELECT * INTO cfg FROM vector_index_settings WHERE vector_index_settings.id = 1;
+    IF FOUND THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(cfg.ef_search, candidate_count)::TEXT, true);
+        PERFORM set_config('ivfflat.probes', cfg.probes::TEXT, true);
+    END IF;
+
+    -- 사용자/소스/태그 필터는 인덱스 후보를 뽑은 뒤 적용되므로, 공유 테이블에서 데이터가 적은 사용자는
+    -- ef_search 후보 안에 자기 행이 거의 없음 → 필터를 통과한 행이 충분할 때까지 인덱스를 계속 탐색
+    -- (pgvector 0.8+ iterative scan, 순서는 아래 ORDER BY가 다시 정렬 / 이전 버전은 설정 무시)
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+        PERFORM set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+    -- 한국어는 단어가 짧아 기본 임계값(0.6)이 너무 높음
+    PERFORM set_config('pg_trgm.word_similarity_threshold', '0.3', true);
+
+    like_pattern := '%' || replace(replace(replace(query_text, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+    RETURN QUERY
+    WITH vec_raw AS (
+        SELECT
+            me.id, me.source_type, me.source_id, me.content, me.created_at, me.embedding,
+            me.embedding <=> query_embedding AS distance
+        FROM memory_embeddings me
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND me.source_type IN ('checkin', 'extraction')
+            AND c.id = me.source_id
+        WHERE
+            (user_id_filter IS NULL OR me.user_id = user_id_filter)
+            AND (source_types IS NULL OR me.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND 1 - (me.embedding <=> query_embedding) > match_threshold
+        ORDER BY me.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    vec AS (
+        SELECT d.*, (row_number() OVER (ORDER BY d.distance))::INT AS rnk
+        FROM (
+            SELECT DISTINCT ON (v.source_type, v.source_id) v.*
+            FROM vec_raw v
+            ORDER BY v.source_type, v.source_id, v.distance
+        ) d
+    ),
+    lex_raw AS (
+        SELECT
+            mc.id, mc.source_type, mc.source_id, mc.content, mc.created_at,
+            (mc.content ILIKE like_pattern) AS exact_match,
+            word_similarity(query_text, mc.content) AS lex_score
+        FROM memory_chunks mc
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND mc.source_type IN ('checkin', 'extraction')
+            AND c.id = mc.source_id
+        WHERE
+            (user_id_filter IS NULL OR mc.user_id = user_id_filter)
+            AND (source_types IS NULL OR mc.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND (query_text <% mc.content OR mc.content ILIKE like_pattern)
+        ORDER BY exact_match DESC, lex_score DESC
+        LIMIT candidate_count
+    ),
+    lex AS (
+        SELECT d.*, (row_number() OVER (ORDER BY d.exact_match DESC, d.lex_score DESC))::INT AS rnk
+        FROM (
+            SELECT DISTINCT ON (l.source_type, l.source_id) l.*
+            FROM lex_raw l
+            ORDER BY l.source_type, l.source_id, l.exact_match DESC, l.lex_score DESC
+        ) d
+    )
+    SELECT
+        COALESCE(v.id, l.id),
+        COALESCE(v.source_type, l.source_type),
+        COALESCE(v.source_id, l.source_id),
+        COALESCE(v.content, l.content),
+        COALESCE(1 - v.distance, 0)::FLOAT AS similarity,
+        COALESCE(v.created_at, l.created_at),
+        (COALESCE(1.0 / (rrf_k + v.rnk), 0) + COALESCE(1.0 / (rrf_k + l.rnk), 0))::FLOAT AS score,
+        v.rnk,
+        l.rnk,
+        CASE WHEN include_embeddings THEN v.embedding END
+    FROM vec v
+    FULL OUTER JOIN lex l
+        ON v.source_type = l.source_type AND v.source_id = l.source_id
+    ORDER BY 7 DESC  -- score
+    LIMIT match_count;
+END;
+$$;
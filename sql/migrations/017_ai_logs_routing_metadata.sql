@@ -0,0 +1,70 @@
+-- ============================================
+-- Migration 017: ai_logs.metadata + 규칙 우선 라우팅 집계
+-- 라우팅 결정을 LLM 추출 생략 여부와 관계없이 모두 기록 (action='extract_route',
+-- metadata {routed, confidence})하고 ai_log_stats에 routed 건수 컬럼 추가
+-- (반환 컬럼이 바뀌므로 DROP 후 재생성)
+-- ============================================
+
+ALTER TABLE ai_logs ADD COLUMN IF NOT EXISTS metadata JSONB DEFAULT '{}';
+
+DROP FUNCTION IF EXISTS ai_log_stats(TIMESTAMPTZ);
+
+-- ============================================
+-- AI 호출 통계 (관리자 전용 RPC)
+-- action별 호출 수, p50/p95 지연시간, 토큰 사용량, 캐시 적중, 오류, 규칙 라우팅 건수
+-- ============================================
+CREATE OR REPLACE FUNCTION ai_log_stats(since TIMESTAMPTZ DEFAULT NOW() - INTERVAL '7 days')
+RETURNS TABLE (
+    action TEXT,
+    calls BIGINT,
+    errors BIGINT,
+    cache_hits BIGINT,
+    p50_ms DOUBLE PRECISION,
+    p95_ms DOUBLE PRECISION,
+    input_tokens BIGINT,
+    output_tokens BIGINT,
+    routed BIGINT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- 로그인 사용자는 admin만 허용
+    -- auth.uid()가 없으면 service role 또는 SQL Editor(postgres 직접 접속)만 허용 (anon 키 호출 차단)
+    -- SECURITY DEFINER 안에서 current_user는 함수 소유자이므로 JWT의 role(auth.role())로 판단
+    IF auth.uid() IS NULL THEN
+        IF COALESCE(auth.role(), '') <> 'service_role' AND session_user <> 'postgres' THEN
+            RAISE EXCEPTION 'ai_log_stats: admin only';
+        END IF;
+    ELSIF NOT EXISTS (
+        SELECT 1 FROM profiles
+        WHERE profiles.user_id = auth.uid()
+        AND profiles.role = 'admin'
+    ) THEN
+        RAISE EXCEPTION 'ai_log_stats: admin only';
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        l.action,
+        COUNT(*) AS calls,
+        COUNT(*) FILTER (WHERE l.status = 'error') AS errors,
+        COUNT(*) FILTER (WHERE l.cache_hit) AS cache_hits,
+        -- 지연시간 분위수는 실제 API 호출만 대상 (캐시 적중 제외)
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY l.latency_ms) FILTER (WHERE NOT l.cache_hit) AS p50_ms,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY l.latency_ms) FILTER (WHERE NOT l.cache_hit) AS p95_ms,
+        COALESCE(SUM(l.input_tokens), 0)::BIGINT AS input_tokens,
+        COALESCE(SUM(l.output_tokens), 0)::BIGINT AS output_tokens,
+        -- 규칙 우선 라우팅 결정(action='extract_route') 중 LLM 추출을 생략한 건수
+        COUNT(*) FILTER (WHERE (l.metadata->>'routed')::BOOLEAN) AS routed
+    FROM ai_logs l
+    WHERE l.created_at >= since
+    GROUP BY l.action
+    ORDER BY 2 DESC;  -- calls
+END;
+$$;
+
+-- 전체 사용자의 토큰/비용 합계를 읽는 함수이므로 anon 호출 차단
+-- (authenticated는 관리자 페이지용으로 유지, 함수 안에서 admin 여부 검사)
+REVOKE EXECUTE ON FUNCTION ai_log_stats(TIMESTAMPTZ) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION ai_log_stats(TIMESTAMPTZ) TO authenticated, service_role;
@@ -6,6 +6,8 @@
 
 -- pgvector 확장 활성화 (Supabase Extensions에서 활성화 필요)
 CREATE EXTENSION IF NOT EXISTS vector;
+-- pg_trgm: 하이브리드 검색의 lexical(문자 n-gram) 매칭용
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- ============================================
 -- 1. profiles - 사용자 프로필 (Auth 연동)
@@ -248,12 +250,16 @@ CREATE TABLE IF NOT EXISTS memory_chunks (
     source_id UUID NOT NULL,
     content TEXT NOT NULL,
     chunk_index INTEGER DEFAULT 0,
+    content_hash TEXT,  -- sha256(content) hex, 멱등 upsert 키
     metadata JSONB DEFAULT '{}',
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT memory_chunks_content_key UNIQUE (user_id, source_type, source_id, chunk_index, content_hash)
 );
 
 CREATE INDEX IF NOT EXISTS idx_memory_chunks_user ON memory_chunks(user_id);
 CREATE INDEX IF NOT EXISTS idx_memory_chunks_source ON memory_chunks(source_type, source_id);
+-- 트라이그램(문자 3-gram) 인덱스: 공백 분리 없이도 한국어 부분 일치/성경 구절/이름 검색 가능
+CREATE INDEX IF NOT EXISTS idx_memory_chunks_content_trgm ON memory_chunks USING GIN (content gin_trgm_ops);
 
 ALTER TABLE memory_chunks ENABLE ROW LEVEL SECURITY;
 
@@ -270,15 +276,23 @@ CREATE TABLE IF NOT EXISTS memory_embeddings (
     source_type TEXT NOT NULL,
     source_id UUID NOT NULL,
     content TEXT NOT NULL,
+    chunk_index INTEGER DEFAULT 0,  -- memory_chunks.chunk_index와 동일 (긴 기록 분할)
+    content_hash TEXT,  -- sha256(content) hex, 멱등 upsert 키
     embedding vector(1536),  -- OpenAI text-embedding-3-small
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    embedding_model TEXT NOT NULL DEFAULT 'text-embedding-3-small',  -- 벡터를 만든 백엔드 모델 (다른 모델과 섞어 검색하지 않음)
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT memory_embeddings_content_key UNIQUE (user_id, source_type, source_id, chunk_index, content_hash)
 );
 
-CREATE INDEX IF NOT EXISTS idx_memory_embeddings_vector 
-ON memory_embeddings USING ivfflat (embedding vector_cosine_ops) 
-WITH (lists = 100);
+-- HNSW: 빈 테이블에서 시작해 점진적으로 커지는 사용자별 데이터에 적합
+-- (ivfflat은 데이터가 쌓인 뒤 lists를 정해 재생성해야 recall이 나옴)
+CREATE INDEX IF NOT EXISTS idx_memory_embeddings_hnsw
+ON memory_embeddings USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
 
 CREATE INDEX IF NOT EXISTS idx_memory_embeddings_user ON memory_embeddings(user_id);
+CREATE INDEX IF NOT EXISTS idx_memory_embeddings_source ON memory_embeddings(source_type, source_id);
+CREATE INDEX IF NOT EXISTS idx_memory_embeddings_model ON memory_embeddings(embedding_model);
 
 ALTER TABLE memory_embeddings ENABLE ROW LEVEL SECURITY;
 
@@ -292,16 +306,21 @@ CREATE POLICY "memory_embeddings_own" ON memory_embeddings
 CREATE TABLE IF NOT EXISTS ai_logs (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     user_id UUID REFERENCES auth.users(id) ON DELETE SET NULL,
-    action TEXT NOT NULL,  -- 'checkin_summary', 'weekly_report', 'rag_search'
+    action TEXT NOT NULL,  -- 'reflection', 'extract', 'embedding', 'weekly_report', 'rag_answer' 등
+    model TEXT,
     input_tokens INTEGER,
     output_tokens INTEGER,
+    latency_ms INTEGER,
+    cache_hit BOOLEAN DEFAULT false,  -- LLM 응답 캐시 적중 (API 호출 없음)
     status TEXT DEFAULT 'success',  -- 'success', 'error'
     error_message TEXT,
+    metadata JSONB DEFAULT '{}',  -- 호출별 부가 정보 (예: 규칙 우선 라우팅 {routed, confidence})
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE INDEX IF NOT EXISTS idx_ai_logs_user ON ai_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_ai_logs_created ON ai_logs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_ai_logs_action_created ON ai_logs(action, created_at DESC);
 
 ALTER TABLE ai_logs ENABLE ROW LEVEL SECURITY;
 
@@ -344,15 +363,273 @@ CREATE POLICY "feedback_admin_all" ON feedback
         )
     );
 
+-- ============================================
+-- 13. jobs - 백그라운드 작업 큐 (자동 인덱싱 등)
+-- 워커(python -m lib.worker)가 claim_jobs()로 FOR UPDATE SKIP LOCKED 선점
+-- ============================================
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    job_type TEXT NOT NULL,  -- 'index_checkin'
+    payload JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- 재시도 backoff 시각
+    locked_at TIMESTAMPTZ,
+    locked_by TEXT,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_claimable ON jobs(run_after)
+    WHERE status IN ('pending', 'running');
+
+ALTER TABLE jobs ENABLE ROW LEVEL SECURITY;
+
+-- 사용자는 본인 작업 등록/상태 조회만 가능 (처리는 service role 워커)
+CREATE POLICY "jobs_select_own" ON jobs
+    FOR SELECT USING (auth.uid() = user_id);
+CREATE POLICY "jobs_insert_own" ON jobs
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+
+-- ============================================
+-- 14. llm_response_cache - LLM 응답 캐시 (선택: [cache] llm_use_supabase)
+-- key = sha256(model + messages + schema + temperature + max_tokens)
+-- ============================================
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    cache_key TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response JSONB NOT NULL,  -- 텍스트 응답은 JSON 문자열로 저장
+    usage JSONB DEFAULT '{}',  -- {prompt_tokens, completion_tokens} (절약량 집계용)
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, cache_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires ON llm_response_cache(expires_at);
+
+ALTER TABLE llm_response_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "llm_response_cache_own" ON llm_response_cache
+    FOR ALL USING (auth.uid() = user_id);
+
+
+-- ============================================
+-- 15. weekly_reports - 저장된 주간 리포트
+-- (user_id, start_date, end_date, exclude_demo)당 1행, 지난 주 조회는 인덱스 1회 읽기
+-- input_hash = sha256(체크인/추출 입력) → 입력이 바뀐 경우에만 LLM으로 다시 생성
+-- ============================================
+CREATE TABLE IF NOT EXISTS weekly_reports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    exclude_demo BOOLEAN NOT NULL DEFAULT TRUE,
+    report JSONB NOT NULL,  -- generate_weekly_report_json 결과
+    source_checkins JSONB NOT NULL DEFAULT '[]',  -- 근거 표시용 체크인 요약 [{id, created_at, mood, content, tags}]
+    input_hash TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (user_id, start_date, end_date, exclude_demo)
+);
+
+ALTER TABLE weekly_reports ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "weekly_reports_own" ON weekly_reports
+    FOR ALL USING (auth.uid() = user_id);
+
+
+
+-- ============================================
+-- 청크 교체 함수 (RPC)
+-- 소스 1건의 청크/임베딩을 한 번에 upsert하고, 새 목록에 없는 stale 청크 삭제
+-- (select → 비교 → delete → insert 왕복 대신 1회 호출, 동시 저장에도 안전)
+-- SECURITY INVOKER: RLS로 본인 데이터만 변경 가능
+-- chunks: [{chunk_index, content, content_hash, embedding, embedding_model, metadata}]
+-- ============================================
+CREATE OR REPLACE FUNCTION replace_memory_chunks(
+    p_user_id UUID,
+    p_source_type TEXT,
+    p_source_id UUID,
+    chunks JSONB
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    inserted INT;
+BEGIN
+    INSERT INTO memory_chunks (user_id, source_type, source_id, content, chunk_index, content_hash, metadata)
+    SELECT
+        p_user_id, p_source_type, p_source_id,
+        elem->>'content',
+        (elem->>'chunk_index')::INT,
+        elem->>'content_hash',
+        COALESCE(elem->'metadata', '{}'::JSONB)
+    FROM jsonb_array_elements(chunks) AS elem
+    ON CONFLICT ON CONSTRAINT memory_chunks_content_key DO NOTHING;
+
+    INSERT INTO memory_embeddings (user_id, source_type, source_id, content, chunk_index, content_hash, embedding, embedding_model)
+    SELECT
+        p_user_id, p_source_type, p_source_id,
+        elem->>'content',
+        (elem->>'chunk_index')::INT,
+        elem->>'content_hash',
+        (elem->>'embedding')::vector,
+        COALESCE(elem->>'embedding_model', 'text-embedding-3-small')
+    FROM jsonb_array_elements(chunks) AS elem
+    WHERE elem ? 'embedding'
+    ON CONFLICT ON CONSTRAINT memory_embeddings_content_key DO NOTHING;
+    GET DIAGNOSTICS inserted = ROW_COUNT;
+
+    -- 새 청크 목록에 없는 (chunk_index, content_hash) 조합은 stale
+    DELETE FROM memory_chunks mc
+    WHERE mc.user_id = p_user_id
+    AND mc.source_type = p_source_type
+    AND mc.source_id = p_source_id
+    AND NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(chunks) AS elem
+        WHERE (elem->>'chunk_index')::INT = mc.chunk_index
+        AND elem->>'content_hash' = mc.content_hash
+    );
+
+    DELETE FROM memory_embeddings me
+    WHERE me.user_id = p_user_id
+    AND me.source_type = p_source_type
+    AND me.source_id = p_source_id
+    AND NOT EXISTS (
+        SELECT 1 FROM jsonb_array_elements(chunks) AS elem
+        WHERE (elem->>'chunk_index')::INT = me.chunk_index
+        AND elem->>'content_hash' = me.content_hash
+    );
+
+    RETURN inserted;
+END;
+$$;
+
+
+-- ============================================
+-- 벡터 인덱스 파라미터 자동 튜닝
+-- tune_memory_index(): 행 수 기반으로 lists/probes 또는 ef_search 결정 (SQL Editor / service role 전용)
+-- search_memories가 매 호출 시 세션(트랜잭션) 단위로 적용
+-- ============================================
+CREATE TABLE IF NOT EXISTS vector_index_settings (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    index_type TEXT NOT NULL DEFAULT 'hnsw',  -- 'hnsw', 'ivfflat'
+    lists INTEGER,
+    probes INTEGER DEFAULT 10,
+    ef_search INTEGER DEFAULT 40,
+    row_count BIGINT DEFAULT 0,
+    tuned_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO vector_index_settings (id) VALUES (1)
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE vector_index_settings ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "vector_index_settings_select_all" ON vector_index_settings
+    FOR SELECT USING (true);
+
+CREATE OR REPLACE FUNCTION tune_memory_index(rebuild BOOLEAN DEFAULT false)
+RETURNS vector_index_settings
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    n BIGINT;
+    idx_type TEXT;
+    new_lists INT;
+    new_probes INT;
+    new_ef INT;
+    result vector_index_settings;
+BEGIN
+    -- SQL 전용 관리 작업: service role 또는 SQL Editor(postgres 직접 접속)만 허용
+    -- (API 역할은 아래 REVOKE로 EXECUTE 권한이 없음, 권한이 다시 부여되더라도 여기서 차단)
+    -- SECURITY DEFINER 안에서 current_user는 함수 소유자이므로 JWT의 role(auth.role())로 판단
+    IF COALESCE(auth.role(), '') <> 'service_role' AND session_user <> 'postgres' THEN
+        RAISE EXCEPTION 'tune_memory_index: service role / SQL Editor only';
+    END IF;
+
+    SELECT COUNT(*) INTO n FROM memory_embeddings;
+
+    SELECT CASE WHEN indexdef ILIKE '%USING ivfflat%' THEN 'ivfflat' ELSE 'hnsw' END
+    INTO idx_type
+    FROM pg_indexes
+    WHERE tablename = 'memory_embeddings'
+    AND (indexdef ILIKE '%USING hnsw%' OR indexdef ILIKE '%USING ivfflat%')
+    LIMIT 1;
+    idx_type := COALESCE(idx_type, 'hnsw');
+
+    -- pgvector 권장값: lists = rows/1000 (100만 이하), sqrt(rows) (그 이상), probes = sqrt(lists)
+    new_lists := GREATEST(10, CASE
+        WHEN n <= 1000000 THEN (n / 1000)::INT
+        ELSE sqrt(n)::INT
+    END);
+    new_probes := GREATEST(1, ceil(sqrt(new_lists))::INT);
+
+    -- HNSW: 데이터가 많을수록 ef_search를 높여 recall 유지
+    new_ef := CASE
+        WHEN n < 10000 THEN 40
+        WHEN n < 100000 THEN 64
+        WHEN n < 1000000 THEN 100
+        ELSE 200
+    END;
+
+    IF rebuild AND idx_type = 'ivfflat' THEN
+        EXECUTE 'DROP INDEX IF EXISTS idx_memory_embeddings_vector';
+        EXECUTE format(
+            'CREATE INDEX idx_memory_embeddings_vector ON memory_embeddings '
+            'USING ivfflat (embedding vector_cosine_ops) WITH (lists = %s)',
+            new_lists
+        );
+    END IF;
+
+    UPDATE vector_index_settings
+    SET index_type = idx_type,
+        lists = new_lists,
+        probes = new_probes,
+        ef_search = new_ef,
+        row_count = n,
+        tuned_at = NOW()
+    WHERE id = 1
+    RETURNING * INTO result;
+
+    RETURN result;
+END;
+$$;
+
+-- 인덱스 DROP/CREATE가 가능한 함수이므로 API 역할의 직접 호출 차단 (service role / SQL Editor 전용)
+REVOKE EXECUTE ON FUNCTION tune_memory_index(BOOLEAN) FROM PUBLIC, anon, authenticated;
+
 
 -- ============================================
 -- RAG 검색 함수 (RPC)
+-- source_types: 소스 타입 필터 (NULL이면 전체)
+-- exclude_tags: 연결된 checkin의 tags와 겹치면 제외 (예: '{__demo__}')
+-- 필터를 LIMIT 전에 적용하여 top-k가 정확하고, 검색당 1회 왕복
+-- 청크 단위로 검색한 뒤 소스별 가장 가까운 청크 1행으로 합침
+-- include_embeddings: true면 MMR 컨텍스트 선택용 embedding 반환
+-- SECURITY INVOKER: memory_embeddings/checkins RLS가 그대로 적용되어 본인 기록만 검색
+-- (user_id_filter는 추가 필터일 뿐, NULL이나 다른 사용자 ID로 남의 기록을 읽을 수 없음)
 -- ============================================
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID);
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID, TEXT[], TEXT[]);
+DROP FUNCTION IF EXISTS search_memories(vector, INT, FLOAT, UUID, TEXT[], TEXT[], BOOLEAN);
+
 CREATE OR REPLACE FUNCTION search_memories(
     query_embedding vector(1536),
     match_count INT DEFAULT 5,
     match_threshold FLOAT DEFAULT 0.7,
-    user_id_filter UUID DEFAULT NULL
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL,
+    include_embeddings BOOLEAN DEFAULT false
 )
 RETURNS TABLE (
     id UUID,
@@ -360,30 +637,323 @@ RETURNS TABLE (
     source_id UUID,
     content TEXT,
     similarity FLOAT,
-    created_at TIMESTAMPTZ
+    created_at TIMESTAMPTZ,
+    chunk_index INT,
+    embedding vector(1536)
 )
 LANGUAGE plpgsql
-SECURITY DEFINER
+SECURITY INVOKER
 AS $$
+DECLARE
+    cfg vector_index_settings;
 BEGIN
+    -- 튜닝된 인덱스 파라미터를 이 트랜잭션에만 적용
+    SELECT * INTO cfg FROM vector_index_settings WHERE vector_index_settings.id = 1;
+    IF FOUND THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(cfg.ef_search, match_count * 4)::TEXT, true);
+        PERFORM set_config('ivfflat.probes', cfg.probes::TEXT, true);
+    END IF;
+
+    -- 사용자/소스/태그 필터는 인덱스 후보를 뽑은 뒤 적용되므로, 공유 테이블에서 데이터가 적은 사용자는
+    -- ef_search 후보 안에 자기 행이 거의 없음 → 필터를 통과한 행이 충분할 때까지 인덱스를 계속 탐색
+    -- (pgvector 0.8+ iterative scan, 순서는 아래 ORDER BY가 다시 정렬 / 이전 버전은 설정 무시)
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+        PERFORM set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+
     RETURN QUERY
-    SELECT 
-        me.id,
-        me.source_type,
-        me.source_id,
-        me.content,
-        1 - (me.embedding <=> query_embedding) AS similarity,
-        me.created_at
-    FROM memory_embeddings me
-    WHERE 
-        (user_id_filter IS NULL OR me.user_id = user_id_filter)
-        AND 1 - (me.embedding <=> query_embedding) > match_threshold
-    ORDER BY me.embedding <=> query_embedding
+    WITH candidates AS (
+        -- 한 소스가 여러 청크로 top-k를 채우지 않도록 여유 있게 후보 조회
+        SELECT 
+            me.id,
+            me.source_type,
+            me.source_id,
+            me.content,
+            me.embedding <=> query_embedding AS distance,
+            me.created_at,
+            me.chunk_index,
+            me.embedding
+        FROM memory_embeddings me
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND me.source_type IN ('checkin', 'extraction')
+            AND c.id = me.source_id
+        WHERE 
+            (user_id_filter IS NULL OR me.user_id = user_id_filter)
+            AND (source_types IS NULL OR me.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND 1 - (me.embedding <=> query_embedding) > match_threshold
+        ORDER BY me.embedding <=> query_embedding
+        LIMIT match_count * 4
+    ),
+    best_per_source AS (
+        SELECT DISTINCT ON (cd.source_type, cd.source_id) cd.*
+        FROM candidates cd
+        ORDER BY cd.source_type, cd.source_id, cd.distance
+    )
+    SELECT
+        b.id,
+        b.source_type,
+        b.source_id,
+        b.content,
+        1 - b.distance AS similarity,
+        b.created_at,
+        b.chunk_index,
+        -- MMR(중복 제거) 선택용 벡터는 요청 시에만 반환
+        CASE WHEN include_embeddings THEN b.embedding END
+    FROM best_per_source b
+    ORDER BY b.distance
     LIMIT match_count;
 END;
 $$;
 
 
+-- ============================================
+-- 하이브리드 검색 함수 (RPC)
+-- vector(memory_embeddings) + lexical(memory_chunks 트라이그램) 순위를
+-- reciprocal-rank fusion(1 / (rrf_k + rank))으로 합산, 소스별 1행
+-- SECURITY INVOKER: memory_embeddings/memory_chunks/checkins RLS로 본인 기록만 검색
+-- ============================================
+DROP FUNCTION IF EXISTS search_memories_hybrid(TEXT, vector, INT, FLOAT, UUID, TEXT[], TEXT[], INT, INT);
+
+CREATE OR REPLACE FUNCTION search_memories_hybrid(
+    query_text TEXT,
+    query_embedding vector(1536),
+    match_count INT DEFAULT 5,
+    match_threshold FLOAT DEFAULT 0.5,
+    user_id_filter UUID DEFAULT NULL,
+    source_types TEXT[] DEFAULT NULL,
+    exclude_tags TEXT[] DEFAULT NULL,
+    candidate_count INT DEFAULT 20,
+    rrf_k INT DEFAULT 60,
+    include_embeddings BOOLEAN DEFAULT false
+)
+RETURNS TABLE (
+    id UUID,
+    source_type TEXT,
+    source_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    created_at TIMESTAMPTZ,
+    score FLOAT,
+    vector_rank INT,
+    lexical_rank INT,
+    embedding vector(1536)
+)
+LANGUAGE plpgsql
+SECURITY INVOKER
+AS $$
+DECLARE
+    cfg vector_index_settings;
+    like_pattern TEXT;
+BEGIN
+    SELECT * INTO cfg FROM vector_index_settings WHERE vector_index_settings.id = 1;
+    IF FOUND THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(cfg.ef_search, candidate_count)::TEXT, true);
+        PERFORM set_config('ivfflat.probes', cfg.probes::TEXT, true);
+    END IF;
+
+    -- 사용자/소스/태그 필터는 인덱스 후보를 뽑은 뒤 적용되므로, 공유 테이블에서 데이터가 적은 사용자는
+    -- ef_search 후보 안에 자기 행이 거의 없음 → 필터를 통과한 행이 충분할 때까지 인덱스를 계속 탐색
+    -- (pgvector 0.8+ iterative scan, 순서는 아래 ORDER BY가 다시 정렬 / 이전 버전은 설정 무시)
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+        PERFORM set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+    -- 한국어는 단어가 짧아 기본 임계값(0.6)이 너무 높음
+    PERFORM set_config('pg_trgm.word_similarity_threshold', '0.3', true);
+
+    like_pattern := '%' || replace(replace(replace(query_text, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+    RETURN QUERY
+    WITH vec_raw AS (
+        SELECT
+            me.id, me.source_type, me.source_id, me.content, me.created_at, me.embedding,
+            me.embedding <=> query_embedding AS distance
+        FROM memory_embeddings me
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND me.source_type IN ('checkin', 'extraction')
+            AND c.id = me.source_id
+        WHERE
+            (user_id_filter IS NULL OR me.user_id = user_id_filter)
+            AND (source_types IS NULL OR me.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND 1 - (me.embedding <=> query_embedding) > match_threshold
+        ORDER BY me.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    vec AS (
+        SELECT d.*, (row_number() OVER (ORDER BY d.distance))::INT AS rnk
+        FROM (
+            SELECT DISTINCT ON (v.source_type, v.source_id) v.*
+            FROM vec_raw v
+            ORDER BY v.source_type, v.source_id, v.distance
+        ) d
+    ),
+    lex_raw AS (
+        SELECT
+            mc.id, mc.source_type, mc.source_id, mc.content, mc.created_at,
+            (mc.content ILIKE like_pattern) AS exact_match,
+            word_similarity(query_text, mc.content) AS lex_score
+        FROM memory_chunks mc
+        LEFT JOIN checkins c
+            ON exclude_tags IS NOT NULL
+            AND mc.source_type IN ('checkin', 'extraction')
+            AND c.id = mc.source_id
+        WHERE
+            (user_id_filter IS NULL OR mc.user_id = user_id_filter)
+            AND (source_types IS NULL OR mc.source_type = ANY(source_types))
+            AND (exclude_tags IS NULL OR c.tags IS NULL OR NOT (c.tags && exclude_tags))
+            AND (query_text <% mc.content OR mc.content ILIKE like_pattern)
+        ORDER BY exact_match DESC, lex_score DESC
+        LIMIT candidate_count
+    ),
+    lex AS (
+        SELECT d.*, (row_number() OVER (ORDER BY d.exact_match DESC, d.lex_score DESC))::INT AS rnk
+        FROM (
+            SELECT DISTINCT ON (l.source_type, l.source_id) l.*
+            FROM lex_raw l
+            ORDER BY l.source_type, l.source_id, l.exact_match DESC, l.lex_score DESC
+        ) d
+    )
+    SELECT
+        COALESCE(v.id, l.id),
+        COALESCE(v.source_type, l.source_type),
+        COALESCE(v.source_id, l.source_id),
+        COALESCE(v.content, l.content),
+        COALESCE(1 - v.distance, 0)::FLOAT AS similarity,
+        COALESCE(v.created_at, l.created_at),
+        (COALESCE(1.0 / (rrf_k + v.rnk), 0) + COALESCE(1.0 / (rrf_k + l.rnk), 0))::FLOAT AS score,
+        v.rnk,
+        l.rnk,
+        CASE WHEN include_embeddings THEN v.embedding END
+    FROM vec v
+    FULL OUTER JOIN lex l
+        ON v.source_type = l.source_type AND v.source_id = l.source_id
+    ORDER BY 7 DESC  -- score
+    LIMIT match_count;
+END;
+$$;
+
+-- ============================================
+-- 작업 선점 함수 (워커 전용 RPC)
+-- 실행 가능한 pending 작업 + lock_timeout이 지난 running 작업(죽은 워커)을
+-- FOR UPDATE SKIP LOCKED로 선점 → 여러 워커가 같은 작업을 잡지 않음
+-- 재선점도 attempts < max_attempts일 때만 (초과한 stale 작업은 failed)
+-- ============================================
+CREATE OR REPLACE FUNCTION claim_jobs(
+    worker_id TEXT,
+    batch_size INT DEFAULT 5,
+    lock_timeout_seconds INT DEFAULT 600
+)
+RETURNS SETOF jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- 재시도 횟수를 다 쓴 채 멈춘 running 작업(매번 워커를 죽이는 작업)은 다시 잡지 않고 failed 처리
+    UPDATE jobs
+    SET status = 'failed',
+        last_error = COALESCE(last_error, 'lock timeout: max_attempts 초과'),
+        locked_at = NULL,
+        locked_by = NULL
+    WHERE status = 'running'
+    AND attempts >= max_attempts
+    AND locked_at < NOW() - make_interval(secs => lock_timeout_seconds);
+
+    RETURN QUERY
+    UPDATE jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_at = NOW(),
+        locked_by = worker_id
+    WHERE j.id IN (
+        SELECT c.id
+        FROM jobs c
+        WHERE (c.status = 'pending' AND c.run_after <= NOW())
+        OR (
+            c.status = 'running'
+            AND c.locked_at < NOW() - make_interval(secs => lock_timeout_seconds)
+            AND c.attempts < c.max_attempts
+        )
+        ORDER BY c.run_after
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION claim_jobs(TEXT, INT, INT) FROM PUBLIC, anon, authenticated;
+
+
+-- ============================================
+-- AI 호출 통계 (관리자 전용 RPC)
+-- action별 호출 수, p50/p95 지연시간, 토큰 사용량, 캐시 적중, 오류, 규칙 라우팅 건수
+-- ============================================
+CREATE OR REPLACE FUNCTION ai_log_stats(since TIMESTAMPTZ DEFAULT NOW() - INTERVAL '7 days')
+RETURNS TABLE (
+    action TEXT,
+    calls BIGINT,
+    errors BIGINT,
+    cache_hits BIGINT,
+    p50_ms DOUBLE PRECISION,
+    p95_ms DOUBLE PRECISION,
+    input_tokens BIGINT,
+    output_tokens BIGINT,
+    routed BIGINT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- 로그인 사용자는 admin만 허용
+    -- auth.uid()가 없으면 service role 또는 SQL Editor(postgres 직접 접속)만 허용 (anon 키 호출 차단)
+    -- SECURITY DEFINER 안에서 current_user는 함수 소유자이므로 JWT의 role(auth.role())로 판단
+    IF auth.uid() IS NULL THEN
+        IF COALESCE(auth.role(), '') <> 'service_role' AND session_user <> 'postgres' THEN
+            RAISE EXCEPTION 'ai_log_stats: admin only';
+        END IF;
+    ELSIF NOT EXISTS (
+        SELECT 1 FROM profiles
+        WHERE profiles.user_id = auth.uid()
+        AND profiles.role = 'admin'
+    ) THEN
+        RAISE EXCEPTION 'ai_log_stats: admin only';
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        l.action,
+        COUNT(*) AS calls,
+        COUNT(*) FILTER (WHERE l.status = 'error') AS errors,
+        COUNT(*) FILTER (WHERE l.cache_hit) AS cache_hits,
+        -- 지연시간 분위수는 실제 API 호출만 대상 (캐시 적중 제외)
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY l.latency_ms) FILTER (WHERE NOT l.cache_hit) AS p50_ms,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY l.latency_ms) FILTER (WHERE NOT l.cache_hit) AS p95_ms,
+        COALESCE(SUM(l.input_tokens), 0)::BIGINT AS input_tokens,
+        COALESCE(SUM(l.output_tokens), 0)::BIGINT AS output_tokens,
+        -- 규칙 우선 라우팅 결정(action='extract_route') 중 LLM 추출을 생략한 건수
+        COUNT(*) FILTER (WHERE (l.metadata->>'routed')::BOOLEAN) AS routed
+    FROM ai_logs l
+    WHERE l.created_at >= since
+    GROUP BY l.action
+    ORDER BY 2 DESC;  -- calls
+END;
+$$;
+
+-- 전체 사용자의 토큰/비용 합계를 읽는 함수이므로 anon 호출 차단
+-- (authenticated는 관리자 페이지용으로 유지, 함수 안에서 admin 여부 검사)
+REVOKE EXECUTE ON FUNCTION ai_log_stats(TIMESTAMPTZ) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION ai_log_stats(TIMESTAMPTZ) TO authenticated, service_role;
+
+
+
 -- ============================================
 -- 트리거: updated_at 자동 갱신
 -- ============================================
@@ -425,6 +995,16 @@ CREATE TRIGGER update_feedback_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_jobs_updated_at
+    BEFORE UPDATE ON jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_weekly_reports_updated_at
+    BEFORE UPDATE ON weekly_reports
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
 
 -- ============================================
 -- 프로필 자동 생성 트리거 (Auth 연동)